@@ -1,39 +1,226 @@
+import logging
+import os
+import re
+from collections import deque
+
 import gradio as gr
-from sheets_client import SheetsClient
+from datasource import make_data_source
+from events import origin
+from memo import LRUCache
+from metrics import serve_metrics
 from ops_agent import OpsAgent
+from snapshot import SnapshotCache
+from paging import PAGE_SIZE, Cursor, CursorStore
+from profiling import profile
+from scenario import scenario_frame
+from snapshot_store import SnapshotStore
 
 PILOT_SHEET_ID = "1BomCw1LpYq_12AE8b8ox04ZQyT2q-hB39baQn49kYh4"
 DRONE_SHEET_ID = "1yCnzT7Hdp8MHCIyUNSDClGw3XLsTyyy21NCQgSLIIYs"
 MISSIONS_SHEET_ID = "1Zyxh3jJfZ4gIvFvMtemiKRXR6c6ABhhu9OCJ2dkBVyU"
 
-sheets = SheetsClient(PILOT_SHEET_ID, DRONE_SHEET_ID, MISSIONS_SHEET_ID)
-agent = OpsAgent(sheets)
+# background threads (refresh, pre-warming, re-planning) report through logging
+logging.basicConfig(level=os.getenv("SKYLARK_LOG_LEVEL", "INFO"),
+                    format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+log = logging.getLogger("skylark")
+
+# SKYLARK_DATA_SOURCE=sheets|csv|parquet|sqlite picks the backend (default: Google Sheets)
+sheets = make_data_source(sheet_ids=(PILOT_SHEET_ID, DRONE_SHEET_ID, MISSIONS_SHEET_ID))
+
+# Prometheus text endpoint (GET /metrics); SKYLARK_METRICS_PORT=0 disables it.
+# Bound to localhost unless SKYLARK_METRICS_HOST says otherwise (e.g. 0.0.0.0
+# for a scraper on another machine).
+METRICS_HOST = os.getenv("SKYLARK_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("SKYLARK_METRICS_PORT", "9100"))
+if METRICS_PORT:
+    try:
+        serve_metrics(METRICS_PORT, METRICS_HOST)
+    except OSError as e:
+        log.warning("Metrics endpoint not started on %s:%s: %s", METRICS_HOST, METRICS_PORT, e)
+
+# Several app processes can share one copy of the sheets: start one loader
+# with SKYLARK_SNAPSHOT_ROLE=loader and every worker with the same
+# SKYLARK_SHARED_SNAPSHOT directory. Only the loader reads from the sheets.
+SHARED_SNAPSHOT = os.getenv("SKYLARK_SHARED_SNAPSHOT")
+
+# Last good copy of the sheets on disk: served at startup while fresh data
+# downloads, and when the Sheets API fails. SKYLARK_SNAPSHOT_DIR= disables it.
+SNAPSHOT_DIR = os.getenv("SKYLARK_SNAPSHOT_DIR", "snapshot_cache")
+store = SnapshotStore(SNAPSHOT_DIR) if SNAPSHOT_DIR else None
+
+if SHARED_SNAPSHOT:
+    from shared_snapshot import SharedSnapshotCache, run_loader
+
+    if os.getenv("SKYLARK_SNAPSHOT_ROLE") == "loader":
+        run_loader(sheets, SHARED_SNAPSHOT, store=store)
+        raise SystemExit(0)
+    agent = OpsAgent(sheets, cache=SharedSnapshotCache(SHARED_SNAPSHOT))
+else:
+    agent = OpsAgent(sheets, cache=SnapshotCache(sheets, store=store))
+    agent.cache.warm_start()
+
+# Conflicts and recommendations for missions starting in the next
+# SKYLARK_WARM_DAYS days are precomputed whenever new sheet data arrives (0 disables)
+WARM_DAYS = int(os.getenv("SKYLARK_WARM_DAYS", "7"))
+if WARM_DAYS:
+    agent.start_warmer(WARM_DAYS)
+
+
+# ---------------- REPLANNING ----------------
+# When a status write-back hits missions the pilot/drone is assigned to, the
+# replacement proposals are appended to the reply of the session that made
+# the change (waiting up to SKYLARK_REPLAN_WAIT seconds); later ones arrive
+# with that session's next reply.
+REPLAN_WAIT = float(os.getenv("SKYLARK_REPLAN_WAIT", "5"))
+INBOX = LRUCache(256)
+
+
+def format_proposal(event, proposal) -> str:
+    mission_id = proposal["project_id"]
+    lines = [f"Mission {mission_id} after {event.kind} {event.resource_id} -> {event.status}:"]
+    lines += [f"  conflict: {c}" for c in proposal["conflicts"]]
+    rec = proposal["replacement_recommendations"]
+    if isinstance(rec, dict):
+        pilots = ",".join(p["pilot_id"] for p in rec["recommended_pilots"])
+        drones = ",".join(d["drone_id"] for d in rec["recommended_drones"])
+        lines.append(f"  proposed: set mission {mission_id} pilots={pilots} drones={drones}")
+    else:
+        lines.append(f"  no replacement: {rec}")
+    return "\n".join(lines)
+
+
+def queue_proposal(event, proposal):
+    session = event.origin or "default"
+    inbox = INBOX.get(session)
+    if inbox is None:
+        inbox = deque(maxlen=50)
+        INBOX.put(session, inbox)
+    inbox.append(format_proposal(event, proposal))
+
+
+def take_proposals(session) -> list:
+    inbox = INBOX.get(session)
+    out = []
+    while inbox:
+        out.append(inbox.popleft())
+    return out
+
+
+agent.start_replanner(queue_proposal)
+
+
+# command prefixes handle_command() understands, used to validate a batch
+# before any of it runs
+COMMANDS = (
+    "show pilots", "update pilots", "update drone", "update pilot", "pilot cost", "show drones",
+    "check conflicts", "set mission", "assign mission", "plan missions", "urgent replacement",
+    "refresh", "show changes", "check data", "stats", "nearest pilots", "nearest drones", "what if",
+    "profile ",
+)
+
+
+# ---------------- PAGED QUERIES ----------------
+# Largest page a user can ask for with size=
+MAX_PAGE_SIZE = 500
+
+# last show pilots / show drones result per chat session, for "next"
+CURSORS = CursorStore()
 
+QUERY_FILTERS = {
+    "pilots": {"skill": "skill", "cert": "certification", "location": "location", "status": "status",
+               "start": "free_from", "end": "free_to"},
+    "drones": {"capability": "capability", "location": "location", "status": "status", "weather": "mission_weather",
+               "start": "free_from", "end": "free_to"},
+}
 
-def handle_message(message, history):
+
+def parse_query(msg):
+    # show pilots skill=mapping location=mumbai status=available cert=dgca page=2 size=50
+    # show drones capability=thermal location=bangalore status=available weather=rainy
+    # show pilots free start=2026-03-01 end=2026-03-05 skill=mapping
+    kind = "pilots" if msg.lower().startswith("show pilots") else "drones"
+    filters, page, size = {}, 1, PAGE_SIZE
+    for token in msg.split():
+        key, _, value = token.partition("=")
+        if key in QUERY_FILTERS[kind]:
+            filters[QUERY_FILTERS[kind][key]] = value
+        elif key == "page" and value.isdigit():
+            page = max(1, int(value))
+        elif key == "size" and value.isdigit():
+            size = min(max(1, int(value)), MAX_PAGE_SIZE)
+    return kind, filters, page, size
+
+
+def search(kind, filters, size):
+    if kind == "pilots":
+        return agent.search_pilots(page_size=size, **filters)
+    return agent.search_drones(page_size=size, **filters)
+
+
+def open_cursor(msg):
+    # (Cursor, ResultPages) for a show pilots / show drones command, or an
+    # error message
+    kind, filters, page, size = parse_query(msg)
+    results = search(kind, filters, size)
+    if isinstance(results, str):
+        return results
+    return Cursor(kind, filters, results, page), results
+
+
+def resume_cursor(cursor):
+    # the cursor's rows sliced from the cached sheet while it is still the
+    # version they were found in; after a change the query runs again
+    results = cursor.resume(agent.cache.entry(cursor.kind))
+    if results is None:
+        results = search(cursor.kind, cursor.filters, cursor.page_size)
+        if isinstance(results, str):
+            return results
+        cursor.update(results)
+    return results
+
+
+def format_page(cursor, results):
+    # only the current page is ever sliced out of the snapshot
+    text = f"{cursor.kind.capitalize()}: {results.total} match(es), page {cursor.page}/{results.pages}"
+    if cursor.page > results.pages:
+        return text + "\nNo more results."
+
+    text += "\n" + results.page(cursor.page).to_string(index=False)
+    if cursor.page < results.pages:
+        text += f"\n(type 'next' for page {cursor.page + 1})"
+    return text
+
+
+def handle_command(message):
     msg = message.strip()
 
+    # ---------------- PROFILING ----------------
+    if msg.lower().startswith("profile "):
+        # profile assign mission PRJ001  -> the command's reply plus where
+        # its time and memory went; stacks/allocations saved under profiles/
+        command = msg[len("profile "):].strip()
+        with profile(command) as report:
+            output = handle_command(command)
+        return output if report is None else f"{output}\n\n{report.summary()}"
+
     # ---------------- PILOT QUERY ----------------
     if msg.lower().startswith("show pilots"):
-        # Example:
-        # show pilots skill=mapping location=mumbai status=available cert=dgca
-        skill = None
-        location = None
-        status = None
-        cert = None
+        opened = open_cursor(msg)
+        return opened if isinstance(opened, str) else format_page(*opened)
 
-        for token in msg.split():
-            if token.startswith("skill="):
-                skill = token.split("=", 1)[1]
-            elif token.startswith("location="):
-                location = token.split("=", 1)[1]
-            elif token.startswith("status="):
-                status = token.split("=", 1)[1]
-            elif token.startswith("cert="):
-                cert = token.split("=", 1)[1]
-
-        result = agent.query_pilots(skill=skill, certification=cert, location=location, status=status)
-        return str(result)
+    # ---------------- BATCH STATUS UPDATES ----------------
+    if msg.lower().startswith("update pilots") or msg.lower().startswith("update drone"):
+        # update pilots P001,P002,P007 status=On Leave
+        # update drones D001,D004 status=Maintenance
+        parts = msg.split()
+        if len(parts) < 3 or "status=" not in msg.lower():
+            return "Format: update pilots P001,P002 status=On Leave  |  update drones D001,D002 status=Maintenance"
+
+        ids = [x.strip() for x in parts[2].split(",") if x.strip()]
+        new_status = msg.split("status=", 1)[1].strip()
+        if parts[1].lower().startswith("pilot"):
+            return str(agent.update_pilots_status(ids, new_status))
+        return str(agent.update_drones_status(ids, new_status))
 
     # ---------------- PILOT STATUS UPDATE ----------------
     if msg.lower().startswith("update pilot"):
@@ -72,45 +259,128 @@ def handle_message(message, history):
 
     # ---------------- DRONE QUERY ----------------
     if msg.lower().startswith("show drones"):
-        # show drones capability=thermal location=bangalore status=available weather=rainy
-        capability = None
-        location = None
-        status = None
-        weather = None
-
-        for token in msg.split():
-            if token.startswith("capability="):
-                capability = token.split("=", 1)[1]
-            elif token.startswith("location="):
-                location = token.split("=", 1)[1]
-            elif token.startswith("status="):
-                status = token.split("=", 1)[1]
-            elif token.startswith("weather="):
-                weather = token.split("=", 1)[1]
-
-        result = agent.query_drones(capability=capability, location=location, status=status, mission_weather=weather)
-        return str(result)
+        opened = open_cursor(msg)
+        return opened if isinstance(opened, str) else format_page(*opened)
 
     # ---------------- CONFLICTS ----------------
     if msg.lower().startswith("check conflicts"):
         # check conflicts mission=M001
+        # check conflicts all from=2026-02-01 to=2026-02-07
+        parts = msg.split()
         mission_id = None
-        for token in msg.split():
+        start = None
+        end = None
+        for token in parts:
             if token.startswith("mission="):
                 mission_id = token.split("=", 1)[1]
+            elif token.startswith("from="):
+                start = token.split("=", 1)[1]
+            elif token.startswith("to="):
+                end = token.split("=", 1)[1]
+
+        if len(parts) > 2 and parts[2].lower() == "all":
+            result = agent.check_all_conflicts(start, end)
+            if isinstance(result, str):
+                return result
+            return result.to_string(index=False)
+
         if not mission_id:
-            return "Format: check conflicts mission=M001"
+            return "Format: check conflicts mission=M001  (or: check conflicts all from=YYYY-MM-DD to=YYYY-MM-DD)"
         return str(agent.check_conflicts(mission_id))
 
+    # ---------------- MISSION ASSIGNMENT WRITE-BACK ----------------
+    if msg.lower().startswith("set mission"):
+        # set mission PRJ001 pilots=P001,P002 drones=D001
+        parts = msg.split()
+        if len(parts) < 4:
+            return "Format: set mission PRJ001 pilots=P001,P002 drones=D001"
+
+        mission_id = parts[2].strip()
+        pilots = None
+        drones = None
+        for token in parts[3:]:
+            if token.startswith("pilots="):
+                pilots = [x for x in token.split("=", 1)[1].split(",") if x]
+            elif token.startswith("drones="):
+                drones = [x for x in token.split("=", 1)[1].split(",") if x]
+        return str(agent.update_mission_assignment(mission_id, pilots, drones))
+
     # ---------------- ASSIGNMENT RECOMMENDATION ----------------
     if msg.lower().startswith("assign mission"):
         # assign mission M001
+        # assign mission M001 radius=50   (km around the mission city)
         parts = msg.split()
         if len(parts) < 3:
             return "Format: assign mission M001"
         mission_id = parts[2].strip()
+        radius = [t.split("=", 1)[1] for t in parts[3:] if t.startswith("radius=")]
+        if radius:
+            try:
+                return str(agent.recommend_assignment(mission_id, radius_km=float(radius[0])))
+            except ValueError:
+                return "Format: assign mission M001 radius=50"
         return str(agent.recommend_assignment(mission_id))
 
+    # ---------------- WHAT-IF ----------------
+    if msg.lower().startswith("what if"):
+        # what if P004 status=On Leave; D012 status=Maintenance
+        # what if P004 status=On Leave and PRJ003 assigned_pilots=P007
+        clauses = re.split(r";|\s+and\s+", msg[len("what if"):], flags=re.IGNORECASE)
+        changes = []
+        for clause in clauses:
+            parts = clause.strip().split(None, 1)
+            if len(parts) < 2 or "=" not in parts[1]:
+                if clause.strip():
+                    return "Format: what if P004 status=On Leave; D012 status=Maintenance"
+                continue
+            column, value = parts[1].split("=", 1)
+            changes.append((parts[0], column.strip(), value.strip()))
+        if not changes:
+            return "Format: what if P004 status=On Leave; D012 status=Maintenance"
+
+        result = agent.what_if(changes)
+        if isinstance(result, str):
+            return result
+        if not result["affected_missions"]:
+            return "No missions depend on these resources."
+        table = scenario_frame(result["impacted"])
+        lines = [f"Re-checked {len(result['affected_missions'])} mission(s): {', '.join(result['affected_missions'])}"]
+        lines.append("No changes in conflicts or recommendations." if table.empty else table.to_string(index=False))
+        return "\n".join(lines)
+
+    # ---------------- NEAREST RESOURCES ----------------
+    if msg.lower().startswith("nearest pilots") or msg.lower().startswith("nearest drones"):
+        # nearest pilots location=pune k=5 radius=100 skill=mapping cert=dgca
+        # nearest drones location=thane k=3 capability=thermal weather=rainy
+        opts = dict(t.split("=", 1) for t in msg.split()[2:] if "=" in t)
+        if not opts.get("location"):
+            return "Format: nearest pilots location=pune [k=5] [radius=100] [skill=..] [cert=..]"
+        try:
+            k = int(opts.get("k", 5))
+            radius = float(opts["radius"]) if "radius" in opts else None
+        except ValueError:
+            return "k must be a whole number and radius a number of km."
+
+        if msg.lower().startswith("nearest pilots"):
+            result = agent.nearest_pilots(opts["location"], k=k, radius_km=radius,
+                                          skill=opts.get("skill"), certification=opts.get("cert"))
+        else:
+            result = agent.nearest_drones(opts["location"], k=k, radius_km=radius,
+                                          capability=opts.get("capability"), mission_weather=opts.get("weather"))
+        return result if isinstance(result, str) else result.to_string(index=False)
+
+    # ---------------- MULTI-MISSION PLANNING ----------------
+    if msg.lower().startswith("plan missions"):
+        # plan missions from=2026-02-01 to=2026-02-07
+        start = None
+        end = None
+        for token in msg.split():
+            if token.startswith("from="):
+                start = token.split("=", 1)[1]
+            elif token.startswith("to="):
+                end = token.split("=", 1)[1]
+        return str(agent.plan_missions(start, end))
+
     # ---------------- URGENT REASSIGNMENT ----------------
     if msg.lower().startswith("urgent replacement"):
         # urgent replacement mission=M001
@@ -122,18 +392,163 @@ def handle_message(message, history):
             return "Format: urgent replacement mission=M001"
         return str(agent.urgent_reassignment(mission_id))
 
+    # ---------------- CACHE REFRESH ----------------
+    if msg.lower().startswith("refresh"):
+        # refresh            -> drop every cached sheet
+        # refresh pilots     -> drop only the pilot roster
+        names = [t.lower() for t in msg.split()[1:] if t.lower() in ("pilots", "drones", "missions")]
+        return str(agent.refresh(*names))
+
+    # ---------------- SYNC CHANGE LOG ----------------
+    if msg.lower().startswith("show changes"):
+        return str(agent.recent_changes())
+
+    # ---------------- METRICS ----------------
+    if msg.lower().startswith("stats"):
+        return agent.stats()
+
+    # ---------------- DATA QUALITY ----------------
+    if msg.lower().startswith("check data"):
+        issues = agent.data_issues()
+        if isinstance(issues, str):
+            return issues
+        return issues.to_string(index=False)
+
     # ---------------- HELP ----------------
     return (
         "Commands:\n"
-        "1) show pilots skill=mapping location=mumbai status=available cert=dgca\n"
+        "1) show pilots skill=mapping location=mumbai status=available cert=dgca [page=2] [size=50]\n"
         "2) update pilot P001 status=On Leave\n"
         "3) pilot cost P001 start=2026-02-05 end=2026-02-07\n"
-        "4) show drones capability=thermal location=bangalore status=available weather=rainy\n"
-        "5) check conflicts mission=M001\n"
-        "6) assign mission M001\n"
+        "4) show drones capability=thermal location=bangalore status=available weather=rainy [page=2]\n"
+        "5) check conflicts mission=M001  |  check conflicts all from=2026-02-01 to=2026-02-07\n"
+        "6) assign mission M001 [radius=50]\n"
         "7) urgent replacement mission=M001\n"
+        "8) refresh [pilots|drones|missions]\n"
+        "9) plan missions from=2026-02-01 to=2026-02-07\n"
+        "10) update pilots P001,P002 status=On Leave  |  update drones D001 status=Maintenance\n"
+        "11) set mission M001 pilots=P001,P002 drones=D001\n"
+        "12) show changes\n"
+        "13) check data\n"
+        "14) stats\n"
+        "15) next   (next page of the last show pilots / show drones)\n"
+        "16) nearest pilots location=pune k=5 radius=100 skill=mapping  |  nearest drones location=thane k=3\n"
+        "17) show pilots free start=2026-03-01 end=2026-03-05 skill=mapping  |  show drones free start=.. end=..\n"
+        "18) what if P004 status=On Leave; D012 status=Maintenance   (nothing is written)\n"
+        "19) profile <any command>   (CPU samples + allocations, saved under profiles/)\n"
+        "Paste several commands (one per line) or upload a .txt file to run them as one batch.\n"
     )
 
 
-demo = gr.ChatInterface(handle_message, title="Skylark Drone Ops Agent (Google Sheets Synced)")
+# ---------------- BATCH ----------------
+def parse_batch(text):
+    # one command per line; blank lines and # comments are ignored
+    lines = [line.strip() for line in text.splitlines()]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def run_batch(lines):
+    unknown = [f"  line {i}: {line}" for i, line in enumerate(lines, 1) if not line.lower().startswith(COMMANDS)]
+    if unknown:
+        return "Batch not run, unknown commands:\n" + "\n".join(unknown)
+
+    # reads share one snapshot; status/assignment updates are written at the end
+    with agent.batch() as writes:
+        outputs = [handle_command(line) for line in lines]
+
+    report = [f"Batch: {len(lines)} commands"]
+    for i, (line, out) in enumerate(zip(lines, outputs), 1):
+        report.append(f"\n[{i}] {line}\n{out}")
+
+    if writes.results:
+        report.append("\nWrite-back:")
+        for sheet, result in writes.results.items():
+            updated = len(result.get("updated", []))
+            errors = result.get("errors") or ([result["error"]] if result.get("error") else [])
+            line = f"  {sheet}: {updated} cell(s) updated"
+            if errors:
+                line += " | errors: " + "; ".join(errors)
+            report.append(line)
+
+    return "\n".join(report)
+
+
+def _message_text(message):
+    # multimodal messages arrive as {"text": ..., "files": [...]}; uploaded
+    # command files are appended to the typed text
+    if not isinstance(message, dict):
+        return message or ""
+
+    parts = [message.get("text") or ""]
+    for f in message.get("files") or []:
+        path = f.get("path") if isinstance(f, dict) else getattr(f, "path", f)
+        with open(path, encoding="utf-8") as fh:
+            parts.append(fh.read())
+    return "\n".join(parts)
+
+
+def handle_message(message, history, request: gr.Request = None):
+    # generator: Gradio streams every yielded version of the reply; replies
+    # end with re-planning proposals for this session, and with the data's
+    # age when answered from a saved copy of the sheets
+    session = getattr(request, "session_hash", None) or "default"
+    reply = ""
+    for reply in _replies(_message_text(message), session):
+        yield reply
+
+    if not agent.replanner.wait(session, 0):
+        yield f"{reply}\n\nRe-planning affected missions..."
+        agent.replanner.wait(session, REPLAN_WAIT)
+    proposals = take_proposals(session)
+    if proposals:
+        reply = f"{reply}\n\nReplanning proposals:\n" + "\n".join(proposals)
+        yield reply
+
+    note = agent.data_age_note()
+    if note:
+        yield f"{reply}\n\n{note}"
+
+
+def _replies(text, session):
+    lines = parse_batch(text)
+    if len(lines) > 1:
+        with origin(session):
+            reply = run_batch(lines)
+        yield reply
+        return
+
+    msg = text.strip()
+
+    if msg.lower().startswith(("show pilots", "show drones")):
+        opened = open_cursor(msg)
+        if isinstance(opened, str):
+            yield opened
+            return
+        CURSORS.put(session, opened[0])
+        yield format_page(*opened)
+        return
+
+    if msg.lower() in ("next", "more"):
+        cursor = CURSORS.get(session)
+        if cursor is None:
+            yield "Nothing to page through yet. Run show pilots or show drones first."
+            return
+        if cursor.page >= cursor.pages:
+            yield f"No more results ({cursor.total} match(es), {cursor.pages} page(s))."
+            return
+        results = resume_cursor(cursor)
+        if isinstance(results, str):
+            yield results
+            return
+        cursor.page += 1
+        yield format_page(cursor, results)
+        return
+
+    # status changes made by this command are tagged with the session
+    with origin(session):
+        reply = handle_command(text)
+    yield reply
+
+
+demo = gr.ChatInterface(handle_message, multimodal=True, title="Skylark Drone Ops Agent (Google Sheets Synced)")
 demo.launch()
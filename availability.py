@@ -0,0 +1,130 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+# Days before / after today the dense calendar covers. Its size is
+# resources x days, so it must not follow the data: one mistyped year or a
+# long history would otherwise allocate years of columns. Queries reaching
+# outside the window are answered from the BookingIndex instead.
+WINDOW_PAST_DAYS = 90
+WINDOW_FUTURE_DAYS = 366
+
+
+class AvailabilityCalendar:
+    # Day-granular busy calendar built from a BookingIndex. For every booked
+    # resource it keeps a prefix sum of busy days over a fixed window around
+    # today, so "how many days of [start, end] is this resource booked" is
+    # two array reads whatever the length of the range.
+    def __init__(self, bookings, today=None, past_days=WINDOW_PAST_DAYS, future_days=WINDOW_FUTURE_DAYS):
+        self.bookings = bookings
+        today = today or date.today()
+        self.first = today - timedelta(days=past_days)
+        self.last = today + timedelta(days=future_days)
+        self.origin = None
+        self.days = 0
+        self.ids = {kind: [] for kind in bookings.kinds}
+        self.rows = {kind: {} for kind in bookings.kinds}
+        self.prefix = {kind: np.zeros((0, 1), dtype=np.int32) for kind in bookings.kinds}
+
+        # bookings clipped to the window; days of the window outside the
+        # span of these have no bookings
+        spans = [(max(b[0], self.first), min(b[1], self.last))
+                 for resources in bookings.by_resource.values()
+                 for _, _, items in resources.values() for b in items
+                 if b[0] <= self.last and b[1] >= self.first]
+        if not spans:
+            return
+
+        self.origin = min(s for s, _ in spans)
+        self.days = (max(e for _, e in spans) - self.origin).days + 1
+        dtype = np.uint16 if self.days < np.iinfo(np.uint16).max else np.int32
+
+        for kind, resources in bookings.by_resource.items():
+            ids = list(resources)
+            rows, starts, ends = [], [], []
+            for row, rid in enumerate(ids):
+                for s, e, *_ in resources[rid][2]:
+                    if s > self.last or e < self.first:
+                        continue
+                    rows.append(row)
+                    starts.append((max(s, self.first) - self.origin).days)
+                    ends.append((min(e, self.last) - self.origin).days + 1)
+
+            # +1/-1 at booking edges, running sum = bookings covering each day
+            cover = np.zeros((len(ids), self.days + 1), dtype=np.int32)
+            np.add.at(cover, (rows, starts), 1)
+            np.add.at(cover, (rows, ends), -1)
+            np.cumsum(cover, axis=1, out=cover)
+            busy = cover[:, :self.days] > 0
+            del cover
+
+            prefix = np.zeros((len(ids), self.days + 1), dtype=dtype)
+            np.cumsum(busy, axis=1, out=prefix[:, 1:])
+
+            self.ids[kind] = ids
+            self.rows[kind] = {rid: row for row, rid in enumerate(ids)}
+            self.prefix[kind] = prefix
+
+    def covers(self, start, end) -> bool:
+        return self.first <= start and end <= self.last
+
+    def _window(self, start, end):
+        # [start, end] clipped to the calendar as day offsets, or None
+        if self.origin is None or not start or not end or end < start:
+            return None
+        s = max(0, (start - self.origin).days)
+        e = min(self.days - 1, (end - self.origin).days)
+        return (s, e) if s <= e else None
+
+    def busy_days(self, kind, rid, start, end) -> int:
+        if start and end and not self.covers(start, end):
+            return self._busy_days_outside(kind, rid, start, end)
+        window = self._window(start, end)
+        row = self.rows[kind].get(str(rid).strip().lower())
+        if window is None or row is None:
+            return 0
+        s, e = window
+        prefix = self.prefix[kind]
+        return int(prefix[row, e + 1]) - int(prefix[row, s])
+
+    def _busy_days_outside(self, kind, rid, start, end) -> int:
+        # union of the resource's bookings within [start, end], from the index
+        entry = self.bookings.by_resource[kind].get(str(rid).strip().lower())
+        if entry is None or end < start:
+            return 0
+        days, reached = 0, start
+        for s, e, *_ in entry[2]:
+            s, e = max(s, reached), min(e, end)
+            if s <= e:
+                days += (e - s).days + 1
+                reached = e + timedelta(days=1)
+        return days
+
+    def is_free(self, kind, rid, start, end, exclude=None) -> bool:
+        if not self.busy_days(kind, rid, start, end):
+            return True
+        return exclude is not None and not self.bookings.booked(kind, rid, start, end, exclude=exclude)
+
+    def busy(self, kind, start, end, exclude=None) -> set:
+        # lower-case ids of every resource booked on some day of [start, end];
+        # with `exclude`, bookings for that mission do not count
+        if start and end and start <= end and not self.covers(start, end):
+            booked = self.bookings.booked
+            return {rid for rid in self.bookings.by_resource[kind]
+                    if booked(kind, rid, start, end, exclude=exclude)}
+
+        window = self._window(start, end)
+        if window is None or not self.ids[kind]:
+            return set()
+
+        s, e = window
+        prefix = self.prefix[kind]
+        counts = prefix[:, e + 1].astype(np.int32) - prefix[:, s]
+        busy = {self.ids[kind][row] for row in np.flatnonzero(counts > 0)}
+
+        if exclude is not None:
+            exclude = str(exclude).strip()
+            for rid in [r for r in busy if exclude in map(str.strip, map(str, self.bookings.missions[kind][r]))]:
+                if not self.bookings.booked(kind, rid, start, end, exclude=exclude):
+                    busy.discard(rid)
+        return busy
@@ -0,0 +1,249 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from datasource import InMemoryDataSource
+from ops_agent import OpsAgent
+
+CITIES = ["Bangalore", "Mumbai", "Pune", "Delhi", "Chennai", "Hyderabad", "Kolkata", "Ahmedabad"]
+SKILLS = ["Mapping", "Survey", "Inspection", "Thermal", "LiDAR", "Photogrammetry"]
+CERTS = ["DGCA", "Night Ops", "BVLOS", "Agri Spraying"]
+PILOT_STATUS = (["Available", "Assigned", "On Leave", "Unavailable"], [0.55, 0.3, 0.1, 0.05])
+DRONE_STATUS = (["Available", "Assigned", "Maintenance"], [0.6, 0.3, 0.1])
+CAPABILITIES = ["RGB", "Thermal", "LiDAR", "Multispectral"]
+RESISTANCE = ["None", "IP43 (Rain)", "IP54", "IP67"]
+WEATHER = (["Clear", "Sunny", "Windy", "Cloudy", "Rainy"], [0.35, 0.2, 0.15, 0.15, 0.15])
+PRIORITY = ["Standard", "High", "Urgent"]
+
+
+# ---------------- SYNTHETIC DATA ----------------
+def _pick_lists(rng, values, n, low=1, high=3, always=None):
+    out = []
+    for k in rng.integers(low, high + 1, size=n):
+        picked = list(rng.choice(values, size=min(k, len(values)), replace=False))
+        if always and always not in picked:
+            picked.insert(0, always)
+        out.append(", ".join(picked))
+    return out
+
+
+def generate_dataset(n_pilots: int, n_drones: int = None, n_missions: int = None, seed: int = 0,
+                     start: date = date(2026, 3, 1), days: int = 60) -> dict:
+    # Realistic-looking roster/fleet/missions with the column names the
+    # sheets use. Drones default to half the pilots, missions to a fifth.
+    rng = np.random.default_rng(seed)
+    n_drones = n_pilots // 2 if n_drones is None else n_drones
+    n_missions = max(1, n_pilots // 5) if n_missions is None else n_missions
+
+    pilot_ids = [f"P{i:06d}" for i in range(1, n_pilots + 1)]
+    pilot_loc = rng.choice(CITIES, size=n_pilots)
+    pilots = pd.DataFrame({
+        "pilot_id": pilot_ids,
+        "name": [f"Pilot {i}" for i in range(1, n_pilots + 1)],
+        "skills": _pick_lists(rng, SKILLS, n_pilots),
+        "certifications": _pick_lists(rng, CERTS[1:], n_pilots, 0, 2, always="DGCA"),
+        "location": pilot_loc,
+        "status": rng.choice(PILOT_STATUS[0], size=n_pilots, p=PILOT_STATUS[1]),
+        "current_assignment": "-",
+        "available_from": [str(start + timedelta(int(d))) for d in rng.integers(0, 14, size=n_pilots)],
+        "daily_rate_inr": rng.choice([1500, 2000, 2500, 3000, 3500, 4000, 5000, 6000], size=n_pilots),
+    })
+
+    drone_ids = [f"D{i:06d}" for i in range(1, n_drones + 1)]
+    drone_loc = rng.choice(CITIES, size=n_drones)
+    drones = pd.DataFrame({
+        "drone_id": drone_ids,
+        "model": rng.choice(["DJI M300", "DJI Mavic 3", "DJI Mavic 3T", "Autel EVO II", "ideaForge Q6"], size=n_drones),
+        "capabilities": _pick_lists(rng, CAPABILITIES, n_drones, 1, 2),
+        "status": rng.choice(DRONE_STATUS[0], size=n_drones, p=DRONE_STATUS[1]),
+        "location": drone_loc,
+        "current_assignment": "-",
+        "maintenance_due": [str(start + timedelta(int(d))) for d in rng.integers(0, 120, size=n_drones)],
+        "weather_resistance": rng.choice(RESISTANCE, size=n_drones),
+    })
+
+    # missions mostly staffed from their own city, with some double bookings
+    by_city_p = {c: [pid for pid, loc in zip(pilot_ids, pilot_loc) if loc == c] for c in CITIES}
+    by_city_d = {c: [did for did, loc in zip(drone_ids, drone_loc) if loc == c] for c in CITIES}
+    m_loc = rng.choice(CITIES, size=n_missions)
+    m_start = rng.integers(0, days, size=n_missions)
+    m_len = rng.integers(0, 6, size=n_missions)
+    req_p = rng.integers(1, 4, size=n_missions)
+    req_d = rng.integers(1, 3, size=n_missions)
+
+    assigned_p, assigned_d = [], []
+    for loc, rp, rd in zip(m_loc, req_p, req_d):
+        if rng.random() < 0.3 or not by_city_p[loc]:
+            assigned_p.append("")
+            assigned_d.append("")
+            continue
+        assigned_p.append(", ".join(rng.choice(by_city_p[loc], size=min(rp, len(by_city_p[loc])), replace=False)))
+        assigned_d.append(", ".join(rng.choice(by_city_d[loc], size=min(rd, len(by_city_d[loc])), replace=False))
+                          if by_city_d[loc] else "")
+
+    missions = pd.DataFrame({
+        "project_id": [f"PRJ{i:06d}" for i in range(1, n_missions + 1)],
+        "client": [f"Client {i % 97}" for i in range(n_missions)],
+        "location": m_loc,
+        "required_skills": _pick_lists(rng, SKILLS, n_missions, 1, 2),
+        "required_certs": _pick_lists(rng, CERTS[1:], n_missions, 0, 1, always="DGCA"),
+        "start_date": [str(start + timedelta(int(d))) for d in m_start],
+        "end_date": [str(start + timedelta(int(d + l))) for d, l in zip(m_start, m_len)],
+        "priority": rng.choice(PRIORITY, size=n_missions),
+        "mission_budget_inr": rng.choice([20000, 50000, 100000, 250000], size=n_missions),
+        "weather_forecast": rng.choice(WEATHER[0], size=n_missions, p=WEATHER[1]),
+        "required_pilots": req_p,
+        "required_drones": req_d,
+        "assigned_pilots": assigned_p,
+        "assigned_drones": assigned_d,
+    })
+
+    return {"pilots": pilots, "drones": drones, "missions": missions}
+
+
+# ---------------- BENCHMARK RUNNER ----------------
+def _commands(data, rng):
+    mission_ids = data["missions"]["project_id"].tolist()
+
+    def mission():
+        return mission_ids[int(rng.integers(0, len(mission_ids)))]
+
+    def city():
+        return CITIES[int(rng.integers(0, len(CITIES)))]
+
+    return {
+        "query_pilots": lambda a: a.query_pilots(skill="mapping", location=city(), status="available"),
+        "query_drones": lambda a: a.query_drones(capability="thermal", location=city(), mission_weather="rainy"),
+        "check_conflicts": lambda a: a.check_conflicts(mission()),
+        "check_all_conflicts": lambda a: a.check_all_conflicts(),
+        "recommend_assignment": lambda a: a.recommend_assignment(mission()),
+        "urgent_reassignment": lambda a: a.urgent_reassignment(mission()),
+    }
+
+
+def _percentile(values, q) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def run_command(agent, fn, iterations: int, cold: bool, make_agent=None) -> dict:
+    # cold: every call gets a new agent from make_agent(), so nothing is
+    # cached (refresh() only marks sheets stale; an unchanged re-fetch keeps
+    # the indexes and memoized results)
+    timings = []
+    for _ in range(iterations):
+        if cold:
+            agent = make_agent()
+        t0 = time.perf_counter()
+        fn(agent)
+        timings.append((time.perf_counter() - t0) * 1000)
+
+    # separate pass for memory: tracemalloc slows the timed runs down
+    if cold:
+        agent = make_agent()
+    tracemalloc.start()
+    fn(agent)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "mean_ms": round(float(np.mean(timings)), 3),
+        "p50_ms": round(_percentile(timings, 50), 3),
+        "p90_ms": round(_percentile(timings, 90), 3),
+        "p99_ms": round(_percentile(timings, 99), 3),
+        "max_ms": round(max(timings), 3),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def run(sizes, iterations: int = 20, cold: bool = False, commands=None, seed: int = 0) -> dict:
+    results = []
+    for n in sizes:
+        data = generate_dataset(n, seed=seed)
+        make_agent = lambda: OpsAgent(InMemoryDataSource(**data))
+        agent = make_agent()
+        rng = np.random.default_rng(seed)
+        for name, fn in _commands(data, rng).items():
+            if commands and name not in commands:
+                continue
+            agent.refresh()
+            fn(agent)  # warm-up (and first load when not cold)
+            stats = run_command(agent, fn, iterations, cold, make_agent)
+            results.append({"size": n, "command": name, "cold": cold, **stats})
+            print(f"{n:>8} {name:<22} p50={stats['p50_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms "
+                  f"peak={stats['peak_kb']:.0f}KB", file=sys.stderr)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.2) -> list:
+    # rows whose p50 or peak memory grew by more than `threshold` (fraction)
+    key = lambda r: (r["size"], r["command"], r.get("cold", False))
+    old = {key(r): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in current.get("results", []):
+        base = old.get(key(r))
+        if not base:
+            continue
+        for metric in ("p50_ms", "peak_kb"):
+            if base[metric] and r[metric] > base[metric] * (1 + threshold):
+                regressions.append({
+                    "size": r["size"],
+                    "command": r["command"],
+                    "metric": metric,
+                    "baseline": base[metric],
+                    "current": r[metric],
+                    "change": round(r[metric] / base[metric] - 1, 3),
+                })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark OpsAgent commands on synthetic data")
+    parser.add_argument("--sizes", default="1000,10000", help="comma-separated pilot counts, e.g. 1000,10000,100000")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--commands", default="", help="comma-separated subset of commands")
+    parser.add_argument("--cold", action="store_true", help="use a new agent (no cached sheets, indexes or results) for every call")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="", help="write JSON results here (default: stdout)")
+    parser.add_argument("--compare", default="", help="baseline JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+    commands = [x.strip() for x in args.commands.split(",") if x.strip()]
+    report = run(sizes, args.iterations, args.cold, commands, args.seed)
+
+    if args.compare:
+        with open(args.compare) as f:
+            report["regressions"] = compare(json.load(f), report, args.threshold)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
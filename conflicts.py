@@ -1,7 +1,71 @@
-from utils import normalize_list, safe_date, overlaps, weather_ok
+import pandas as pd
 
+from geo import GAZETTEER, NEARBY_KM
+from utils import normalize_list, safe_date, safe_float, overlaps, weather_ok
+from indexes import BookingIndex
 
-def detect_conflicts_for_mission(mission_row, pilots_df, drones_df, missions_df):
+CONFLICT_COLUMNS = ["mission", "resource", "conflict_type", "detail"]
+
+
+def _row_finder(df, id_col):
+    def find(rid):
+        rows = df[df[id_col].astype(str).str.lower() == rid.lower()]
+        return None if rows.empty else rows.iloc[0]
+
+    return find
+
+
+def _row_lookup(df, id_col):
+    # id (lower-case) -> first matching row, built in one pass for batch scans
+    lookup = {}
+    if not df.empty and id_col in df.columns:
+        for row in df.to_dict(orient="records"):
+            lookup.setdefault(str(row.get(id_col, "")).lower(), row)
+    return lambda rid: lookup.get(rid.lower())
+
+
+def detect_conflicts_for_mission(mission_row, pilots_df, drones_df, missions_df, bookings=None):
+    # Build once per snapshot and pass in; building here is the slow path
+    if bookings is None:
+        bookings = BookingIndex(missions_df)
+
+    records = _mission_conflicts(
+        mission_row, _row_finder(pilots_df, "pilot_id"), _row_finder(drones_df, "drone_id"), bookings
+    )
+    return [detail for _, conflict_type, detail in records]
+
+
+def detect_conflicts_all(pilots_df, drones_df, missions_df, bookings=None, start=None, end=None):
+    # Single pass over every mission (optionally only those overlapping
+    # [start, end]); returns one row per (mission, resource, conflict type).
+    if bookings is None:
+        bookings = BookingIndex(missions_df)
+
+    find_pilot = _row_lookup(pilots_df, "pilot_id")
+    find_drone = _row_lookup(drones_df, "drone_id")
+
+    rows = []
+    for mission in missions_df.to_dict(orient="records"):
+        if start or end:
+            m_start = safe_date(mission.get("start_date"))
+            m_end = safe_date(mission.get("end_date"))
+            if not overlaps(m_start, m_end, start or m_start, end or m_end):
+                continue
+
+        mission_id = str(mission.get("project_id", "")).strip()
+        for resource, conflict_type, detail in _mission_conflicts(mission, find_pilot, find_drone, bookings):
+            if conflict_type == "note":
+                continue
+            rows.append((mission_id, resource, conflict_type, detail))
+
+    return pd.DataFrame(rows, columns=CONFLICT_COLUMNS)
+
+
+def _distance_note(km) -> str:
+    return "" if km is None else f" (~{km:.0f} km away)"
+
+
+def _mission_conflicts(mission_row, find_pilot, find_drone, bookings):
     issues = []
 
     # Your missions use project_id
@@ -23,22 +87,27 @@ def detect_conflicts_for_mission(mission_row, pilots_df, drones_df, missions_df)
 
     # ---------- PILOT CHECKS ----------
     for pid in assigned_pilots:
-        p = pilots_df[pilots_df["pilot_id"].astype(str).str.lower() == pid.lower()]
-        if p.empty:
-            issues.append(f"Pilot {pid} not found in roster.")
+        p = find_pilot(pid)
+        if p is None:
+            issues.append((pid, "not_found", f"Pilot {pid} not found in roster."))
             continue
 
-        p = p.iloc[0]
         p_loc = str(p.get("location", "")).strip().lower()
         p_status = str(p.get("status", "")).strip().lower()
 
         if p_status in ["on leave", "unavailable"]:
-            issues.append(f"Pilot {pid} is {p.get('status')} but assigned to mission {mission_id}.")
+            issues.append((pid, "status", f"Pilot {pid} is {p.get('status')} but assigned to mission {mission_id}."))
 
         if p_loc != m_loc:
-            issues.append(
-                f"Location mismatch: Pilot {pid} is in {p.get('location')} but mission is in {mission_row.get('location')}."
-            )
+            # a neighbouring city within NEARBY_KM is not a mismatch
+            km = GAZETTEER.distance_km(p_loc, m_loc)
+            if km is None or km > NEARBY_KM:
+                issues.append((
+                    pid,
+                    "location",
+                    f"Location mismatch: Pilot {pid} is in {p.get('location')} but mission is in "
+                    f"{mission_row.get('location')}{_distance_note(km)}.",
+                ))
 
         p_skills = normalize_list(p.get("skills", ""))
         p_certs = normalize_list(p.get("certifications", ""))
@@ -47,89 +116,78 @@ def detect_conflicts_for_mission(mission_row, pilots_df, drones_df, missions_df)
         missing_certs = [c for c in required_certs if c not in p_certs]
 
         if missing_skills:
-            issues.append(f"Skill mismatch: Pilot {pid} missing skills: {', '.join(missing_skills)}")
+            issues.append((pid, "skills", f"Skill mismatch: Pilot {pid} missing skills: {', '.join(missing_skills)}"))
 
         if missing_certs:
-            issues.append(f"Certification mismatch: Pilot {pid} missing certs: {', '.join(missing_certs)}")
+            issues.append((pid, "certs", f"Certification mismatch: Pilot {pid} missing certs: {', '.join(missing_certs)}"))
 
         # Double booking (pilot)
-        if assigned_pilots and not missions_df.empty:
-            for _, other in missions_df.iterrows():
-                if str(other.get("project_id", "")).strip() == mission_id:
-                    continue
-                other_pilots = normalize_list(other.get("assigned_pilots", ""))
-                if pid.lower() in [x.lower() for x in other_pilots]:
-                    o_start = safe_date(other.get("start_date"))
-                    o_end = safe_date(other.get("end_date"))
-                    if overlaps(m_start, m_end, o_start, o_end):
-                        issues.append(f"Double booking: Pilot {pid} overlaps with mission {other.get('project_id')}.")
+        for other_id in bookings.booked("pilot", pid, m_start, m_end, exclude=mission_id):
+            issues.append((pid, "double_booking", f"Double booking: Pilot {pid} overlaps with mission {other_id}."))
 
     # ---------- DRONE CHECKS ----------
     for did in assigned_drones:
-        d = drones_df[drones_df["drone_id"].astype(str).str.lower() == did.lower()]
-        if d.empty:
-            issues.append(f"Drone {did} not found in fleet.")
+        d = find_drone(did)
+        if d is None:
+            issues.append((did, "not_found", f"Drone {did} not found in fleet."))
             continue
 
-        d = d.iloc[0]
         d_loc = str(d.get("location", "")).strip().lower()
         d_status = str(d.get("status", "")).strip().lower()
 
         if d_status == "maintenance":
-            issues.append(f"Drone {did} is in Maintenance but assigned to mission {mission_id}.")
+            issues.append((did, "maintenance", f"Drone {did} is in Maintenance but assigned to mission {mission_id}."))
 
         if d_loc != m_loc:
-            issues.append(
-                f"Location mismatch: Drone {did} is in {d.get('location')} but mission is in {mission_row.get('location')}."
-            )
+            km = GAZETTEER.distance_km(d_loc, m_loc)
+            if km is None or km > NEARBY_KM:
+                issues.append((
+                    did,
+                    "location",
+                    f"Location mismatch: Drone {did} is in {d.get('location')} but mission is in "
+                    f"{mission_row.get('location')}{_distance_note(km)}.",
+                ))
 
         resistance = d.get("weather_resistance", "")
         if not weather_ok(resistance, mission_weather):
-            issues.append(
-                f"Weather risk: Drone {did} resistance={resistance} not safe for {mission_weather} mission."
-            )
+            issues.append((
+                did,
+                "weather",
+                f"Weather risk: Drone {did} resistance={resistance} not safe for {mission_weather} mission.",
+            ))
 
         # Double booking (drone)
-        if assigned_drones and not missions_df.empty:
-            for _, other in missions_df.iterrows():
-                if str(other.get("project_id", "")).strip() == mission_id:
-                    continue
-                other_drones = normalize_list(other.get("assigned_drones", ""))
-                if did.lower() in [x.lower() for x in other_drones]:
-                    o_start = safe_date(other.get("start_date"))
-                    o_end = safe_date(other.get("end_date"))
-                    if overlaps(m_start, m_end, o_start, o_end):
-                        issues.append(f"Double booking: Drone {did} overlaps with mission {other.get('project_id')}.")
+        for other_id in bookings.booked("drone", did, m_start, m_end, exclude=mission_id):
+            issues.append((did, "double_booking", f"Double booking: Drone {did} overlaps with mission {other_id}."))
 
     # ---------- BUDGET OVERRUN ----------
-    try:
-        budget_val = float(budget) if budget not in [None, ""] else None
-    except:
-        budget_val = None
+    budget_val = safe_float(budget)
 
     if budget_val is not None and assigned_pilots:
         total_days = (m_end - m_start).days + 1 if m_start and m_end else 0
         total_cost = 0
 
         for pid in assigned_pilots:
-            p = pilots_df[pilots_df["pilot_id"].astype(str).str.lower() == pid.lower()]
-            if p.empty:
+            p = find_pilot(pid)
+            if p is None:
                 continue
-            try:
-                rate = float(p.iloc[0].get("daily_rate_inr", 0))
+            rate = safe_float(p.get("daily_rate_inr", 0))
+            if rate is not None:
                 total_cost += rate * total_days
-            except:
-                pass
 
         if total_cost > budget_val:
-            issues.append(
-                f"Budget warning: Pilot cost ₹{total_cost:.0f} exceeds mission budget ₹{budget_val:.0f}."
-            )
+            issues.append((
+                "",
+                "budget",
+                f"Budget warning: Pilot cost ₹{total_cost:.0f} exceeds mission budget ₹{budget_val:.0f}.",
+            ))
 
     # If missions sheet has no assignments, we still return something helpful
     if not assigned_pilots and not assigned_drones:
-        issues.append(
-            "Note: Missions sheet has no assigned_pilots/assigned_drones columns, so double-booking checks are skipped."
-        )
+        issues.append((
+            "",
+            "note",
+            "Note: Missions sheet has no assigned_pilots/assigned_drones columns, so double-booking checks are skipped.",
+        ))
 
     return issues
\ No newline at end of file
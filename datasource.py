@@ -0,0 +1,376 @@
+import os
+import sqlite3
+import threading
+from contextlib import closing
+
+import pandas as pd
+
+from utils import safe_date
+
+SHEETS = ("pilots", "drones", "missions")
+
+# id column per sheet, used to address rows for write-back
+SHEET_KEYS = {
+    "pilots": "pilot_id",
+    "drones": "drone_id",
+    "missions": "project_id",
+}
+
+
+def _iso(x) -> str:
+    d = safe_date(x)
+    return d.isoformat() if d else ""
+
+
+def _match(col: pd.Series, value) -> pd.Series:
+    return col.astype(str).str.strip().str.lower() == str(value).strip().lower()
+
+
+class DataSource:
+    # The surface OpsAgent reads and writes through. SheetsClient is the
+    # Google Sheets implementation; the classes below are local stand-ins.
+    #
+    # Sources with pushdown = True answer query_*_df filters natively
+    # instead of filtering a full read in pandas.
+    pushdown = False
+
+    def read_df(self, name) -> pd.DataFrame:
+        return getattr(self, f"read_{name}_df")()
+
+    def read_pilots_df(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def read_drones_df(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def read_missions_df(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def update_cells(self, name: str, changes) -> dict:
+        # changes: iterable of (row id, column, value)
+        raise NotImplementedError
+
+    # ---------------- FILTERED READS ----------------
+    def query_pilots_df(self, status=None, location=None) -> pd.DataFrame:
+        return self._filter(self.read_pilots_df(), status, location)
+
+    def query_drones_df(self, status=None, location=None) -> pd.DataFrame:
+        return self._filter(self.read_drones_df(), status, location)
+
+    def query_missions_df(self, start=None, end=None) -> pd.DataFrame:
+        df = self.read_missions_df()
+        if df.empty or not (start or end):
+            return df
+        starts = df["start_date"].map(safe_date)
+        ends = df["end_date"].map(safe_date)
+        keep = starts.notna() & ends.notna()
+        if start:
+            keep &= ends.map(lambda d: d is not None and d >= start)
+        if end:
+            keep &= starts.map(lambda d: d is not None and d <= end)
+        return df[keep]
+
+    @staticmethod
+    def _filter(df, status=None, location=None):
+        if df.empty:
+            return df
+        if status:
+            df = df[_match(df["status"], status)]
+        if location:
+            df = df[_match(df["location"], location)]
+        return df
+
+    # ---------------- WRITE-BACK ----------------
+    def update_pilot_status(self, pilot_id: str, new_status: str) -> dict:
+        result = self.update_cells("pilots", [(pilot_id, "status", new_status)])
+        if result["success"]:
+            return {"success": True, "pilot_id": pilot_id, "new_status": new_status}
+        if result.get("error") or any(e.startswith("Unknown column") for e in result["errors"]):
+            return {"success": False, "error": "Pilot sheet must contain pilot_id and status columns"}
+        return {"success": False, "error": f"Pilot not found: {pilot_id}"}
+
+    def update_pilots_status(self, pilot_ids, new_status: str) -> dict:
+        return self.update_cells("pilots", [(pid, "status", new_status) for pid in pilot_ids])
+
+    def update_drones_status(self, drone_ids, new_status: str) -> dict:
+        return self.update_cells("drones", [(did, "status", new_status) for did in drone_ids])
+
+    def update_mission_assignment(self, project_id: str, assigned_pilots=None, assigned_drones=None) -> dict:
+        changes = []
+        if assigned_pilots is not None:
+            changes.append((project_id, "assigned_pilots", ", ".join(assigned_pilots)))
+        if assigned_drones is not None:
+            changes.append((project_id, "assigned_drones", ", ".join(assigned_drones)))
+        return self.update_cells("missions", changes)
+
+
+def _apply_changes(df, name, changes):
+    # applies (id, column, value) changes to a frame in place
+    key = SHEET_KEYS[name]
+    if key not in df.columns:
+        return {"success": False, "error": f"{name} sheet must contain a {key} column"}
+
+    ids = df[key].astype(str).str.strip()
+    first_row = {}
+    for label, rid in zip(df.index, ids):
+        first_row.setdefault(rid, label)
+
+    updated, errors = [], []
+    for rid, field, value in changes:
+        rid, field = str(rid).strip(), str(field).strip()
+        if field not in df.columns:
+            errors.append(f"Unknown column: {field}")
+        elif rid not in first_row:
+            errors.append(f"Not found: {rid}")
+        else:
+            if df[field].dtype != object:
+                df[field] = df[field].astype(object)
+            df.at[first_row[rid], field] = value
+            updated.append({key: rid, field: value})
+
+    return {"success": bool(updated) and not errors, "updated": updated, "errors": errors}
+
+
+# ---------------- IN-MEMORY ----------------
+class InMemoryDataSource(DataSource):
+    # Holds the three frames in memory; every read returns a fresh copy, like
+    # a real fetch would. Used for tests, benchmarks and offline runs.
+    def __init__(self, pilots=None, drones=None, missions=None):
+        self.frames = {
+            "pilots": pilots if pilots is not None else pd.DataFrame(),
+            "drones": drones if drones is not None else pd.DataFrame(),
+            "missions": missions if missions is not None else pd.DataFrame(),
+        }
+        self._lock = threading.Lock()
+
+    def read_pilots_df(self) -> pd.DataFrame:
+        return self.frames["pilots"].copy()
+
+    def read_drones_df(self) -> pd.DataFrame:
+        return self.frames["drones"].copy()
+
+    def read_missions_df(self) -> pd.DataFrame:
+        return self.frames["missions"].copy()
+
+    def update_cells(self, name: str, changes) -> dict:
+        with self._lock:
+            df = self.frames[name].copy()
+            result = _apply_changes(df, name, changes)
+            if result.get("updated"):
+                self.frames[name] = df
+        return result
+
+
+# ---------------- CSV / PARQUET ----------------
+class FileDataSource(DataSource):
+    # One file per sheet in `directory`: pilots.csv, drones.csv, missions.csv
+    # (or .parquet). Writes rewrite the affected file.
+    def __init__(self, directory: str, fmt: str = "csv"):
+        if fmt not in ("csv", "parquet"):
+            raise ValueError(f"Unsupported file format: {fmt}")
+        self.directory = directory
+        self.fmt = fmt
+        self._lock = threading.Lock()
+
+    def path(self, name) -> str:
+        return os.path.join(self.directory, f"{name}.{self.fmt}")
+
+    def _read(self, name) -> pd.DataFrame:
+        path = self.path(name)
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        if self.fmt == "parquet":
+            df = pd.read_parquet(path)
+        else:
+            # empty cells stay "" like get_all_records() returns them
+            df = pd.read_csv(path, keep_default_na=False)
+        df.columns = [str(c).strip() for c in df.columns]
+        return df
+
+    def _write(self, name, df):
+        path = self.path(name)
+        tmp = path + ".tmp"
+        if self.fmt == "parquet":
+            df.to_parquet(tmp, index=False)
+        else:
+            df.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+
+    def read_pilots_df(self) -> pd.DataFrame:
+        return self._read("pilots")
+
+    def read_drones_df(self) -> pd.DataFrame:
+        return self._read("drones")
+
+    def read_missions_df(self) -> pd.DataFrame:
+        return self._read("missions")
+
+    def update_cells(self, name: str, changes) -> dict:
+        with self._lock:
+            df = self._read(name)
+            result = _apply_changes(df, name, changes)
+            if result.get("updated"):
+                self._write(name, df)
+        return result
+
+    @classmethod
+    def export(cls, source, directory: str, fmt: str = "csv"):
+        # snapshot any data source into files
+        os.makedirs(directory, exist_ok=True)
+        target = cls(directory, fmt)
+        for name in SHEETS:
+            target._write(name, getattr(source, f"read_{name}_df")())
+        return target
+
+
+# ---------------- SQLITE ----------------
+def _quote(name) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class SQLiteDataSource(DataSource):
+    # One table per sheet. status/location are indexed on their normalized
+    # (trimmed, lower-case) value and missions on start/end date, so the
+    # query_*_df filters run as indexed SQL instead of pandas scans.
+    # Dates are stored as ISO text (normalized by import_frames).
+    pushdown = True
+
+    indexed = {
+        "pilots": ("status", "location"),
+        "drones": ("status", "location"),
+        "missions": (),
+    }
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # closes on exit; use as "with self._connect() as conn, conn:" to
+        # also commit (or roll back) the transaction
+        return closing(sqlite3.connect(self.path))
+
+    def _columns(self, conn, name) -> list:
+        return [row[1] for row in conn.execute(f"PRAGMA table_info({_quote(name)})")]
+
+    def _query(self, name, where="", params=()) -> pd.DataFrame:
+        # filtered rows keep their row number in the table (rowid - 1) as
+        # label, like rows filtered out of the full frame do
+        with self._connect() as conn:
+            if not self._columns(conn, name):
+                return pd.DataFrame()
+            if not where:
+                return pd.read_sql_query(f"SELECT * FROM {_quote(name)}", conn)
+            df = pd.read_sql_query(f'SELECT rowid - 1 AS "_row", * FROM {_quote(name)} {where}', conn,
+                                   params=params, index_col="_row")
+            df.index.name = None
+            return df
+
+    def read_pilots_df(self) -> pd.DataFrame:
+        return self._query("pilots")
+
+    def read_drones_df(self) -> pd.DataFrame:
+        return self._query("drones")
+
+    def read_missions_df(self) -> pd.DataFrame:
+        return self._query("missions")
+
+    def _filtered(self, name, status=None, location=None) -> pd.DataFrame:
+        clauses, params = [], []
+        for col, value in (("status", status), ("location", location)):
+            if value:
+                clauses.append(f"lower(trim({_quote(col)})) = ?")
+                params.append(str(value).strip().lower())
+        where = "WHERE " + " AND ".join(clauses) if clauses else ""
+        return self._query(name, where, params)
+
+    def query_pilots_df(self, status=None, location=None) -> pd.DataFrame:
+        return self._filtered("pilots", status, location)
+
+    def query_drones_df(self, status=None, location=None) -> pd.DataFrame:
+        return self._filtered("drones", status, location)
+
+    def query_missions_df(self, start=None, end=None) -> pd.DataFrame:
+        clauses, params = [], []
+        if start:
+            clauses.append("end_date >= ?")
+            params.append(start.isoformat())
+        if end:
+            clauses.append("start_date <= ?")
+            params.append(end.isoformat())
+        where = "WHERE start_date != '' AND end_date != '' AND " + " AND ".join(clauses) if clauses else ""
+        return self._query("missions", where, params)
+
+    def update_cells(self, name: str, changes) -> dict:
+        key = SHEET_KEYS[name]
+        with self._lock, self._connect() as conn, conn:
+            columns = self._columns(conn, name)
+            if key not in columns:
+                return {"success": False, "error": f"{name} sheet must contain a {key} column"}
+
+            updated, errors = [], []
+            for rid, field, value in changes:
+                rid, field = str(rid).strip(), str(field).strip()
+                if field not in columns:
+                    errors.append(f"Unknown column: {field}")
+                    continue
+                cur = conn.execute(
+                    f"UPDATE {_quote(name)} SET {_quote(field)} = ? WHERE rowid = "
+                    f"(SELECT rowid FROM {_quote(name)} WHERE {_quote(key)} = ? LIMIT 1)",
+                    (value, rid),
+                )
+                if cur.rowcount:
+                    updated.append({key: rid, field: value})
+                else:
+                    errors.append(f"Not found: {rid}")
+
+        return {"success": bool(updated) and not errors, "updated": updated, "errors": errors}
+
+    def import_frames(self, frames: dict):
+        # (re)build tables from DataFrames, e.g. a Google Sheets snapshot
+        with self._lock, self._connect() as conn, conn:
+            for name, df in frames.items():
+                df = df.copy()
+                key = SHEET_KEYS[name]
+                if key in df.columns:
+                    df[key] = df[key].astype(str).str.strip()
+                if name == "missions":
+                    for col in ("start_date", "end_date"):
+                        if col in df.columns:
+                            df[col] = df[col].map(_iso)
+                df.to_sql(name, conn, if_exists="replace", index=False)
+
+                table = _quote(name)
+                if key in df.columns:
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS {_quote(f'ix_{name}_{key}')} ON {table}({_quote(key)})")
+                for col in self.indexed[name]:
+                    if col in df.columns:
+                        conn.execute(
+                            f"CREATE INDEX IF NOT EXISTS {_quote(f'ix_{name}_{col}')} "
+                            f"ON {table}(lower(trim({_quote(col)})))"
+                        )
+                if name == "missions" and {"start_date", "end_date"} <= set(df.columns):
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS ix_missions_dates ON {table}(start_date, end_date)")
+        return self
+
+    @classmethod
+    def export(cls, source, path: str):
+        return cls(path).import_frames({name: getattr(source, f"read_{name}_df")() for name in SHEETS})
+
+
+# ---------------- CONFIG ----------------
+def make_data_source(kind: str = None, path: str = None, sheet_ids=None) -> DataSource:
+    # SKYLARK_DATA_SOURCE = sheets (default) | csv | parquet | sqlite
+    # SKYLARK_DATA_PATH   = directory (csv/parquet) or database file (sqlite)
+    kind = (kind or os.getenv("SKYLARK_DATA_SOURCE", "sheets")).strip().lower()
+    path = path or os.getenv("SKYLARK_DATA_PATH", "data")
+
+    if kind == "sheets":
+        from sheets_client import SheetsClient
+
+        return SheetsClient(*sheet_ids)
+    if kind in ("csv", "parquet"):
+        return FileDataSource(path, fmt=kind)
+    if kind == "sqlite":
+        return SQLiteDataSource(path)
+    raise ValueError(f"Unknown data source: {kind}")
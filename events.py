@@ -0,0 +1,64 @@
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+_origin = threading.local()
+
+
+@contextmanager
+def origin(name):
+    # events published inside the block are tagged with `name` (a chat
+    # session), so results derived from them can be routed back to it
+    previous = getattr(_origin, "name", None)
+    _origin.name = name
+    try:
+        yield
+    finally:
+        _origin.name = previous
+
+
+class StatusChanged:
+    # A pilot/drone status written back to the sheets
+    def __init__(self, kind, resource_id, status):
+        self.kind = kind
+        self.resource_id = str(resource_id).strip()
+        self.status = status
+        self.origin = getattr(_origin, "name", None)
+        self.at = time.time()
+
+    def __repr__(self):
+        return f"StatusChanged({self.kind} {self.resource_id} -> {self.status})"
+
+
+class EventBus:
+    # Bounded history of published events plus subscriber callbacks, called
+    # synchronously in the publishing thread; a failing subscriber is logged
+    # and does not stop the others. sync.ChangeLog is one for ChangeSets.
+    def __init__(self, maxlen=500):
+        self.entries = deque(maxlen=maxlen)
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        with self._lock:
+            self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, event):
+        with self._lock:
+            self.entries.append(event)
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception:
+                log.exception("Subscriber %r failed on %r", callback, event)
@@ -0,0 +1,205 @@
+import csv
+import math
+import os
+from collections import defaultdict
+
+EARTH_RADIUS_KM = 6371.0
+
+# Grid cell size in degrees (~111 km north-south)
+CELL_DEG = 1.0
+
+# Resources closer than this are not reported as a location conflict
+NEARBY_KM = 50
+
+# Distance at which the location score term falls all the way to the
+# "different city" value; closer resources get a proportional share
+TRAVEL_SCALE_KM = 100
+
+# Default radius for recommendation candidates, and the search cap for k-nearest
+SEARCH_RADIUS_KM = 100
+MAX_SEARCH_KM = 3000
+
+# city (lower-case) -> (lat, lon). Extend or override with a CSV of
+# city,lat,lon rows pointed to by SKYLARK_GAZETTEER.
+CITIES = {
+    "mumbai": (19.0760, 72.8777),
+    "bombay": (19.0760, 72.8777),
+    "navi mumbai": (19.0330, 73.0297),
+    "thane": (19.2183, 72.9781),
+    "pune": (18.5204, 73.8567),
+    "nashik": (19.9975, 73.7898),
+    "nagpur": (21.1458, 79.0882),
+    "aurangabad": (19.8762, 75.3433),
+    "bangalore": (12.9716, 77.5946),
+    "bengaluru": (12.9716, 77.5946),
+    "mysore": (12.2958, 76.6394),
+    "mysuru": (12.2958, 76.6394),
+    "mangalore": (12.9141, 74.8560),
+    "hubli": (15.3647, 75.1240),
+    "chennai": (13.0827, 80.2707),
+    "coimbatore": (11.0168, 76.9558),
+    "madurai": (9.9252, 78.1198),
+    "hyderabad": (17.3850, 78.4867),
+    "secunderabad": (17.4399, 78.4983),
+    "visakhapatnam": (17.6868, 83.2185),
+    "vijayawada": (16.5062, 80.6480),
+    "kolkata": (22.5726, 88.3639),
+    "howrah": (22.5958, 88.2636),
+    "bhubaneswar": (20.2961, 85.8245),
+    "patna": (25.5941, 85.1376),
+    "ranchi": (23.3441, 85.3096),
+    "delhi": (28.6139, 77.2090),
+    "new delhi": (28.6139, 77.2090),
+    "gurgaon": (28.4595, 77.0266),
+    "gurugram": (28.4595, 77.0266),
+    "noida": (28.5355, 77.3910),
+    "ghaziabad": (28.6692, 77.4538),
+    "faridabad": (28.4089, 77.3178),
+    "jaipur": (26.9124, 75.7873),
+    "lucknow": (26.8467, 80.9462),
+    "kanpur": (26.4499, 80.3319),
+    "agra": (27.1767, 78.0081),
+    "varanasi": (25.3176, 82.9739),
+    "chandigarh": (30.7333, 76.7794),
+    "ludhiana": (30.9010, 75.8573),
+    "amritsar": (31.6340, 74.8723),
+    "dehradun": (30.3165, 78.0322),
+    "shimla": (31.1048, 77.1734),
+    "jammu": (32.7266, 74.8570),
+    "srinagar": (34.0837, 74.7973),
+    "ahmedabad": (23.0225, 72.5714),
+    "gandhinagar": (23.2156, 72.6369),
+    "surat": (21.1702, 72.8311),
+    "vadodara": (22.3072, 73.1812),
+    "rajkot": (22.3039, 70.8022),
+    "indore": (22.7196, 75.8577),
+    "bhopal": (23.2599, 77.4126),
+    "raipur": (21.2514, 81.6296),
+    "kochi": (9.9312, 76.2673),
+    "thiruvananthapuram": (8.5241, 76.9366),
+    "trivandrum": (8.5241, 76.9366),
+    "goa": (15.4909, 73.8278),
+    "panaji": (15.4909, 73.8278),
+    "guwahati": (26.1445, 91.7362),
+}
+
+
+def _key(x) -> str:
+    return str(x).strip().lower()
+
+
+def haversine_km(a, b) -> float:
+    lat1, lon1 = map(math.radians, a)
+    lat2, lon2 = map(math.radians, b)
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(h)))
+
+
+class Gazetteer:
+    # Known places on a lat/lon grid, so radius searches only look at the
+    # cells around the query point instead of every place.
+    def __init__(self, coords):
+        self.coords = {}
+        self.grid = defaultdict(list)
+        for name, (lat, lon) in coords.items():
+            self.add(name, lat, lon)
+
+    @staticmethod
+    def _cell(lat, lon):
+        return int(math.floor(lat / CELL_DEG)), int(math.floor(lon / CELL_DEG))
+
+    def add(self, name, lat, lon):
+        name = _key(name)
+        old = self.coords.get(name)
+        if old is not None:
+            self.grid[self._cell(*old)].remove(name)
+        self.coords[name] = (float(lat), float(lon))
+        self.grid[self._cell(lat, lon)].append(name)
+
+    def locate(self, place):
+        return self.coords.get(_key(place))
+
+    def distance_km(self, a, b):
+        # None when either place is unknown
+        if _key(a) == _key(b):
+            return 0.0
+        pa, pb = self.locate(a), self.locate(b)
+        if pa is None or pb is None:
+            return None
+        return haversine_km(pa, pb)
+
+    def within(self, place, radius_km) -> list:
+        # [(place, km)] sorted by distance; an unknown place only matches itself
+        origin = self.locate(place)
+        if origin is None:
+            return [(_key(place), 0.0)]
+
+        lat, lon = origin
+        dlat = radius_km / 111.0
+        dlon = radius_km / (111.0 * max(0.1, math.cos(math.radians(lat))))
+        (r0, c0), (r1, c1) = self._cell(lat - dlat, lon - dlon), self._cell(lat + dlat, lon + dlon)
+
+        out = []
+        for r in range(r0, r1 + 1):
+            for c in range(c0, c1 + 1):
+                for name in self.grid.get((r, c), ()):
+                    d = haversine_km(origin, self.coords[name])
+                    if d <= radius_km:
+                        out.append((name, d))
+        out.sort(key=lambda x: x[1])
+        return out
+
+
+def _load_gazetteer() -> Gazetteer:
+    gazetteer = Gazetteer(CITIES)
+    path = os.getenv("SKYLARK_GAZETTEER")
+    if path and os.path.exists(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    gazetteer.add(row["city"], float(row["lat"]), float(row["lon"]))
+                except (KeyError, TypeError, ValueError):
+                    continue
+    return gazetteer
+
+
+GAZETTEER = _load_gazetteer()
+
+
+# ---------------- SCORING ----------------
+def location_term(resource_loc, mission_loc, match, miss) -> int:
+    # `match` for the same place, `miss` when far away or unknown, and a
+    # distance-proportional value in between for nearby places
+    if _key(resource_loc) == _key(mission_loc):
+        return match
+    d = GAZETTEER.distance_km(resource_loc, mission_loc)
+    if d is None:
+        return miss
+    return int(round(match - (match - miss) * min(1.0, d / TRAVEL_SCALE_KM)))
+
+
+# ---------------- RESOURCE SEARCH ----------------
+def ids_within(index, place, radius_km) -> dict:
+    # resource id -> km for every resource of a ResourceIndex whose
+    # location is within radius_km of `place`
+    out = {}
+    for name, d in GAZETTEER.within(place, radius_km):
+        for rid in index.lookup("location", name):
+            out[rid] = d
+    return out
+
+
+def k_nearest(index, place, k, eligible=None, max_km=MAX_SEARCH_KM) -> list:
+    # [(resource id, km)] for the k closest resources (optionally only ids in
+    # `eligible`), widening the search radius until enough are found
+    radius = min(SEARCH_RADIUS_KM, max_km)
+    while True:
+        found = ids_within(index, place, radius)
+        if eligible is not None:
+            found = {rid: d for rid, d in found.items() if rid in eligible}
+        if len(found) >= k or radius >= max_km:
+            break
+        radius = min(radius * 2, max_km)
+
+    ranked = sorted(found.items(), key=lambda x: (x[1], x[0]))
+    return ranked[:k]
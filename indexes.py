@@ -0,0 +1,214 @@
+from bisect import bisect_right
+from collections import defaultdict
+
+import numpy as np
+
+from utils import normalize_list, safe_date
+
+
+def _key(x) -> str:
+    return str(x).strip().lower()
+
+
+class ResourceIndex:
+    # Subclasses name the id column, the comma-separated list columns that are
+    # parsed into frozensets, and the scalar columns that get an inverted index.
+    id_col = None
+    list_cols = ()
+    key_cols = ("location", "status")
+
+    def __init__(self, df):
+        self.df = df
+        self.ids = self._ids(df)
+        self.sets = {col: {} for col in self.list_cols}
+        self.keys = {col: {} for col in self.key_cols}
+        self.inverted = {col: defaultdict(set) for col in self.list_cols + self.key_cols}
+
+        if not df.empty and self.id_col in df.columns:
+            self._index_rows(df, self.ids, lambda col, value: self.inverted[col][value])
+
+    def _ids(self, df):
+        if df.empty or self.id_col not in df.columns:
+            return df.index.to_series().astype(str)
+        return df[self.id_col].astype(str).str.strip()
+
+    def _index_rows(self, df, ids, bucket):
+        for col in self.list_cols:
+            if col not in df.columns:
+                continue
+            parsed = self.sets[col]
+            for rid, raw in zip(ids, df[col]):
+                values = frozenset(normalize_list(raw))
+                parsed[rid] = values
+                for v in values:
+                    bucket(col, v).add(rid)
+
+        for col in self.key_cols:
+            if col not in df.columns:
+                continue
+            keys = self.keys[col]
+            # typed snapshots carry the lowered value in "<col>_key" already
+            lowered = f"{col}_key" in df.columns
+            for rid, raw in zip(ids, df[f"{col}_key"] if lowered else df[col]):
+                keys[rid] = str(raw) if lowered else _key(raw)
+                bucket(col, keys[rid]).add(rid)
+
+    def apply_changes(self, df, changes):
+        # New index for `df` built from this one plus a sync ChangeSet: only
+        # the inserted/updated/deleted rows are re-parsed. Buckets are copied
+        # before they are modified, so snapshots holding this index still
+        # see a consistent view.
+        new = object.__new__(type(self))
+        new.df = df
+        new.ids = new._ids(df)
+        new.sets = {col: dict(values) for col, values in self.sets.items()}
+        new.keys = {col: dict(values) for col, values in self.keys.items()}
+        new.inverted = {col: defaultdict(set, buckets) for col, buckets in self.inverted.items()}
+
+        copied = set()
+
+        def bucket(col, value):
+            if (col, value) not in copied:
+                new.inverted[col][value] = set(new.inverted[col].get(value, ()))
+                copied.add((col, value))
+            return new.inverted[col][value]
+
+        for rid in changes.updated + changes.deleted:
+            for col in self.list_cols:
+                for v in new.sets[col].pop(rid, ()):
+                    bucket(col, v).discard(rid)
+            for col in self.key_cols:
+                if rid in new.keys[col]:
+                    bucket(col, new.keys[col].pop(rid)).discard(rid)
+
+        changed = new.ids.isin(changes.inserted + changes.updated)
+        new._index_rows(df[changed], new.ids[changed], bucket)
+        return new
+
+    def __len__(self):
+        return len(self.ids)
+
+    def values(self, col, rid) -> frozenset:
+        return self.sets[col].get(str(rid).strip(), frozenset())
+
+    def lookup(self, col, value) -> set:
+        return self.inverted[col].get(_key(value), set())
+
+    def matching(self, col, predicate) -> set:
+        # evaluates the predicate once per distinct value, not once per row
+        out = set()
+        for value, rids in self.inverted[col].items():
+            if predicate(value):
+                out |= rids
+        return out
+
+    def candidates(self, **terms) -> set:
+        # terms: key column -> single value, list column -> iterable of values
+        # that must all be present. None / empty terms are ignored.
+        groups = []
+        for col, value in terms.items():
+            if value is None:
+                continue
+            if col in self.list_cols:
+                values = [value] if isinstance(value, str) else list(value)
+                groups.extend(self.lookup(col, v) for v in values if str(v).strip())
+            elif str(value).strip():
+                groups.append(self.lookup(col, value))
+
+        if not groups:
+            return set(self.ids)
+
+        groups.sort(key=len)
+        out = set(groups[0])
+        for g in groups[1:]:
+            out &= g
+            if not out:
+                break
+        return out
+
+    def frame(self, ids):
+        # rows for the given ids, in sheet order
+        return self.df[self.ids.isin(ids)]
+
+    def positions(self, ids) -> np.ndarray:
+        # row positions for the given ids, in sheet order
+        return np.flatnonzero(self.ids.isin(ids).to_numpy())
+
+
+class RosterIndex(ResourceIndex):
+    id_col = "pilot_id"
+    list_cols = ("skills", "certifications")
+
+
+class FleetIndex(ResourceIndex):
+    id_col = "drone_id"
+    list_cols = ("capabilities",)
+    key_cols = ("location", "status", "weather_resistance")
+
+
+class BookingIndex:
+    # resource kind ("pilot"/"drone") -> resource id (lower-case) -> bookings
+    # sorted by start date. Each list keeps a running max of end dates so an
+    # overlap query can stop as soon as no earlier booking can reach the window.
+    kinds = {"pilot": "assigned_pilots", "drone": "assigned_drones"}
+
+    def __init__(self, missions_df):
+        self.df = missions_df
+        self.by_resource = {kind: {} for kind in self.kinds}
+        self.missions = {kind: defaultdict(list) for kind in self.kinds}
+
+        if missions_df.empty or "project_id" not in missions_df.columns:
+            return
+
+        cols = {c: missions_df[c] if c in missions_df.columns else [""] * len(missions_df)
+                for c in ("project_id", "start_date", "end_date", *self.kinds.values())}
+
+        raw = defaultdict(lambda: defaultdict(list))
+        for pos, (project_id, start, end, pilots, drones) in enumerate(
+            zip(cols["project_id"], cols["start_date"], cols["end_date"],
+                cols["assigned_pilots"], cols["assigned_drones"])
+        ):
+            key = str(project_id).strip()
+            s, e = safe_date(start), safe_date(end)
+
+            for kind, assigned in (("pilot", pilots), ("drone", drones)):
+                for rid in dict.fromkeys(normalize_list(assigned)):
+                    self.missions[kind][rid].append(project_id)
+                    # bookings without both dates can never overlap anything
+                    if s and e:
+                        raw[kind][rid].append((s, e, pos, key, project_id))
+
+        for kind, resources in raw.items():
+            for rid, bookings in resources.items():
+                bookings.sort()
+                max_end, running = [], None
+                for b in bookings:
+                    running = b[1] if running is None or b[1] > running else running
+                    max_end.append(running)
+                self.by_resource[kind][rid] = ([b[0] for b in bookings], max_end, bookings)
+
+    def missions_for(self, kind, rid) -> list:
+        return list(self.missions[kind].get(str(rid).strip().lower(), []))
+
+    def booked(self, kind, rid, start, end, exclude=None) -> list:
+        # project ids (as written in the sheet, in sheet order) of bookings
+        # for this resource that overlap [start, end]
+        if not start or not end:
+            return []
+
+        entry = self.by_resource[kind].get(str(rid).strip().lower())
+        if entry is None:
+            return []
+
+        starts, max_end, bookings = entry
+        exclude = str(exclude).strip() if exclude is not None else None
+
+        hits = []
+        i = bisect_right(starts, end) - 1
+        while i >= 0 and max_end[i] >= start:
+            s, e, pos, key, project_id = bookings[i]
+            if e >= start and key != exclude:
+                hits.append((pos, project_id))
+            i -= 1
+
+        return [project_id for _, project_id in sorted(hits)]
@@ -1,16 +1,15 @@
-from utils import normalize_list, weather_ok
+import numpy as np
+import pandas as pd
+
+from geo import location_term
+from utils import normalize_list, safe_float, weather_ok, weather_ok_series
 
 
 def score_pilot(pilot_row, mission_row):
     score = 0
 
-    mission_loc = str(mission_row.get("location", "")).strip().lower()
-    pilot_loc = str(pilot_row.get("location", "")).strip().lower()
-
-    if pilot_loc == mission_loc:
-        score += 25
-    else:
-        score -= 10
+    # same city +25, far away -10, nearby cities in between
+    score += location_term(pilot_row.get("location", ""), mission_row.get("location", ""), 25, -10)
 
     required_skills = normalize_list(mission_row.get("required_skills", ""))
     required_certs = normalize_list(mission_row.get("required_certs", ""))
@@ -32,17 +31,15 @@ def score_pilot(pilot_row, mission_row):
         else:
             score -= 80
 
-    # Cost preference
-    try:
-        cost = float(pilot_row.get("daily_rate_inr", 0))
+    # Cost preference (blank or invalid rates are neutral)
+    cost = safe_float(pilot_row.get("daily_rate_inr", 0))
+    if cost is not None:
         if cost <= 2000:
             score += 10
         elif cost <= 4000:
             score += 5
         else:
             score -= 5
-    except:
-        pass
 
     return score
 
@@ -50,13 +47,7 @@ def score_pilot(pilot_row, mission_row):
 def score_drone(drone_row, mission_row):
     score = 0
 
-    mission_loc = str(mission_row.get("location", "")).strip().lower()
-    drone_loc = str(drone_row.get("location", "")).strip().lower()
-
-    if drone_loc == mission_loc:
-        score += 20
-    else:
-        score -= 10
+    score += location_term(drone_row.get("location", ""), mission_row.get("location", ""), 20, -10)
 
     mission_weather = mission_row.get("weather_forecast", "")
     resistance = drone_row.get("weather_resistance", "")
@@ -67,3 +58,100 @@ def score_drone(drone_row, mission_row):
         score -= 100
 
     return score
+
+
+# ---------------- COLUMNAR SCORING ----------------
+# Same weights as score_pilot / score_drone (which stay the reference
+# implementation), computed over a whole candidate frame at once.
+
+def _lower(df, col) -> pd.Series:
+    # typed snapshots carry a pre-lowered "<col>_key" categorical
+    if f"{col}_key" in df.columns:
+        return df[f"{col}_key"]
+    return df[col].astype(str).str.strip().str.lower()
+
+
+def _has_term(df, col, term, index=None) -> pd.Series:
+    # True where `term` is in the row's comma-separated list
+    if col not in df.columns:
+        return pd.Series(False, index=df.index)
+
+    if index is not None:
+        # probe the bucket once per candidate row; isin() would hash the
+        # whole bucket, often most of the roster, for every term
+        bucket = index.lookup(col, term)
+        ids = index.ids.loc[df.index]
+        return pd.Series(np.fromiter((rid in bucket for rid in ids), bool, len(ids)), index=df.index)
+
+    values = df[col].reset_index(drop=True)
+    empty = values.isna() | (values.astype(str).str.strip() == "-")
+    tokens = values.astype(str).str.lower().str.split(",").explode().str.strip()
+    hit = (tokens == term).groupby(level=0).any() & ~empty
+    return pd.Series(hit.to_numpy(), index=df.index)
+
+
+def _location_terms(df, mission_row, match, miss) -> np.ndarray:
+    mission_loc = str(mission_row.get("location", "")).strip().lower()
+    if "location" not in df.columns:
+        return np.full(len(df), match if mission_loc == "" else miss)
+
+    # one distance lookup per distinct place, not per row
+    codes, places = pd.factorize(_lower(df, "location"), use_na_sentinel=False)
+    terms = np.array([location_term(p, mission_loc, match, miss) for p in places], dtype="int64")
+    return terms[codes]
+
+
+def _cost_terms(col: pd.Series) -> np.ndarray:
+    cost = pd.to_numeric(col, errors="coerce").to_numpy(dtype=float, copy=True)
+    parsed = ~np.isnan(cost)
+
+    # typed columns are already numeric; raw text falls back to float() for
+    # whatever to_numeric rejected. Blank/invalid rates score 0 like score_pilot
+    if not parsed.all() and col.dtype == object:
+        rows = np.flatnonzero(~parsed)
+        fallback = [safe_float(x) for x in col.iloc[rows]]
+        parsed[rows] = [v is not None for v in fallback]
+        cost[rows] = [np.nan if v is None else v for v in fallback]
+
+    terms = np.select([cost <= 2000, cost <= 4000], [10, 5], -5)
+    return np.where(parsed, terms, 0)
+
+
+def score_pilots_frame(pilots_df, mission_row, index=None, qualified=False) -> pd.Series:
+    # `index` is an optional RosterIndex over the frame's source rows; when
+    # given, skill/cert membership comes from its inverted lists.
+    # qualified=True: every row already holds all required skills and certs
+    # (the frame came from candidates(skills=..., certifications=...)), so
+    # those terms are the same for every row and are not looked up.
+    score = _location_terms(pilots_df, mission_row, 25, -10)
+
+    for s in normalize_list(mission_row.get("required_skills", "")):
+        hit = True if qualified else _has_term(pilots_df, "skills", s, index).to_numpy()
+        score = score + np.where(hit, 10, -30)
+
+    for c in normalize_list(mission_row.get("required_certs", "")):
+        hit = True if qualified else _has_term(pilots_df, "certifications", c, index).to_numpy()
+        score = score + np.where(hit, 20, -80)
+
+    if "daily_rate_inr" in pilots_df.columns:
+        score = score + _cost_terms(pilots_df["daily_rate_inr"])
+    else:
+        score = score + 10
+
+    return pd.Series(score, index=pilots_df.index, dtype="int64")
+
+
+def score_drones_frame(drones_df, mission_row) -> pd.Series:
+    score = _location_terms(drones_df, mission_row, 20, -10)
+
+    resistance = _lower(drones_df, "weather_resistance") if "weather_resistance" in drones_df.columns \
+        else pd.Series("", index=drones_df.index)
+    ok = weather_ok_series(resistance, mission_row.get("weather_forecast", "")).to_numpy()
+    score = score + np.where(ok, 25, -100)
+
+    return pd.Series(score, index=drones_df.index, dtype="int64")
+
+
+def top_k(df, k: int, column: str = "score"):
+    # partial selection of the k best rows; no full sort of the frame
+    return df.nlargest(k, column, keep="first")
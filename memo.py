@@ -0,0 +1,72 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+# Memoized results kept per agent (least recently used dropped)
+MEMO_SIZE = 4096
+
+# Missions starting within this many days are pre-warmed
+WARM_DAYS = 7
+
+# Wait after a change before warming, so the refreshes of several sheets
+# arriving together cause one run
+WARM_DELAY = 0.5
+
+
+class LRUCache:
+    def __init__(self, maxlen=MEMO_SIZE):
+        self.maxlen = maxlen
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxlen:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class Prewarmer:
+    # Runs `warm` on a daemon thread each time trigger() is called; triggers
+    # that arrive while a run is in progress collapse into one more run.
+    def __init__(self, warm, delay=WARM_DELAY, name="prewarm"):
+        self.warm = warm
+        self.delay = delay
+        self.runs = 0
+        self.last_result = None
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    def trigger(self, *_):
+        # usable directly as a ChangeLog subscriber
+        self._wake.set()
+
+    def _loop(self):
+        while True:
+            self._wake.wait()
+            time.sleep(self.delay)
+            self._wake.clear()
+            try:
+                self.last_result = self.warm()
+            except Exception:
+                log.exception("Pre-warming failed")
+            self.runs += 1
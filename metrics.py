@@ -0,0 +1,192 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket bounds in seconds (cumulative on export, Prometheus style)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Recent samples kept per series for the rolling percentiles in `stats`
+WINDOW = 1024
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS, window=WINDOW):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def percentiles(self, *qs) -> list:
+        values = sorted(self.recent)
+        if not values:
+            return [0.0 for _ in qs]
+        return [values[min(len(values) - 1, int(q / 100 * len(values)))] for q in qs]
+
+
+def _labels(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(labels: tuple, extra=()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{v}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+class Metrics:
+    # Process-wide counters and latency histograms. Recording is a dict
+    # lookup plus an append under one lock, cheap enough to leave on;
+    # SKYLARK_METRICS=0 turns it into a no-op.
+    def __init__(self, enabled=None):
+        if enabled is None:
+            enabled = os.getenv("SKYLARK_METRICS", "1") != "0"
+        self.enabled = enabled
+        self.started = time.time()
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started = time.time()
+
+    # ---------------- EXPORT ----------------
+    def summary(self) -> list:
+        # one row per histogram series, latencies in milliseconds
+        with self._lock:
+            items = [(k, h.count, h.sum, h.percentiles(50, 90, 99)) for k, h in self.histograms.items()]
+        rows = []
+        for (name, labels), count, total, (p50, p90, p99) in sorted(items):
+            rows.append({
+                "metric": name,
+                "labels": ",".join(f"{k}={v}" for k, v in labels),
+                "count": count,
+                "mean_ms": round(total / count * 1000, 2) if count else 0.0,
+                "p50_ms": round(p50 * 1000, 2),
+                "p90_ms": round(p90 * 1000, 2),
+                "p99_ms": round(p99 * 1000, 2),
+            })
+        return rows
+
+    def report(self) -> str:
+        if not self.enabled:
+            return "Metrics are disabled (SKYLARK_METRICS=0)."
+        lines = [f"Metrics since {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started))}"]
+
+        rows = self.summary()
+        if rows:
+            lines.append("")
+            lines.append(f"{'metric':<24} {'labels':<48} {'count':>7} {'p50ms':>8} {'p90ms':>8} {'p99ms':>8}")
+            for r in rows:
+                lines.append(f"{r['metric']:<24} {r['labels']:<48} {r['count']:>7} "
+                             f"{r['p50_ms']:>8} {r['p90_ms']:>8} {r['p99_ms']:>8}")
+
+        with self._lock:
+            counters = sorted(self.counters.items())
+        if counters:
+            lines.append("")
+            for (name, labels), value in counters:
+                lines.append(f"{name}{_fmt_labels(labels)} {value:g}")
+
+        if len(lines) == 1:
+            lines.append("No activity recorded yet.")
+        return "\n".join(lines)
+
+    def prometheus(self) -> str:
+        # text exposition format, version 0.0.4
+        with self._lock:
+            counters = sorted(self.counters.items())
+            hists = sorted((k, list(h.counts), h.count, h.sum, h.buckets) for k, h in self.histograms.items())
+
+        lines = []
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                lines.append(f"# TYPE skylark_{name} counter")
+                seen.add(name)
+            lines.append(f"skylark_{name}{_fmt_labels(labels)} {value:g}")
+
+        for (name, labels), counts, count, total, buckets in hists:
+            if name not in seen:
+                lines.append(f"# TYPE skylark_{name} histogram")
+                seen.add(name)
+            cumulative = 0
+            for bound, n in zip(buckets, counts):
+                cumulative += n
+                lines.append(f"skylark_{name}_bucket{_fmt_labels(labels, [('le', f'{bound:g}')])} {cumulative}")
+            lines.append(f"skylark_{name}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"skylark_{name}_sum{_fmt_labels(labels)} {total:.6f}")
+            lines.append(f"skylark_{name}_count{_fmt_labels(labels)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+# ---------------- HTTP ENDPOINT ----------------
+class _Handler(BaseHTTPRequestHandler):
+    metrics = METRICS
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.metrics.prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_metrics(port: int = 9100, host: str = "127.0.0.1", metrics=None):
+    # GET /metrics on a daemon thread next to the Gradio server; local only
+    # unless a host such as 0.0.0.0 is given
+    handler = type("Handler", (_Handler,), {"metrics": metrics or METRICS})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -1,55 +1,413 @@
+import copy
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
 import pandas as pd
-from utils import normalize_list, safe_date, weather_ok
-from matcher import score_pilot, score_drone
-from conflicts import detect_conflicts_for_mission
+from utils import normalize_list, safe_date, safe_float, safe_int, weather_ok
+from matcher import score_pilots_frame, score_drones_frame, top_k
+from conflicts import detect_conflicts_for_mission, detect_conflicts_all
+from planner import plan_missions
+from snapshot import SHEETS, SnapshotCache
+from indexes import RosterIndex, FleetIndex, BookingIndex
+from availability import AvailabilityCalendar
+from schema import enforce_schema
+from scenario import ScenarioSnapshot, affected_missions, changed, diff_mission
+from geo import GAZETTEER, SEARCH_RADIUS_KM, ids_within, k_nearest
+from metrics import METRICS
+from paging import PAGE_SIZE, ResultPages
+from memo import MEMO_SIZE, WARM_DAYS, LRUCache, Prewarmer
+from profiling import maybe_profile
+from events import EventBus, StatusChanged
+from replanner import REPLAN_WORKERS, Replanner
+
+
+def uses_snapshot(method):
+    # Runs the method under the command's pinned snapshot (or pins a new one).
+    # The outermost call is timed as the command (also inside a batch), and
+    # profiled when SKYLARK_PROFILE=1; nested calls are not.
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if getattr(self._local, "command_name", None) is not None:
+            return method(self, *args, **kwargs)
+
+        with self.command() as snap:
+            self._local.command_name = method.__name__
+            loaded = snap.load_seconds
+            t0 = time.perf_counter()
+            try:
+                with maybe_profile(method.__name__):
+                    return method(self, *args, **kwargs)
+            finally:
+                METRICS.observe("ops_command_seconds", time.perf_counter() - t0, command=method.__name__)
+                METRICS.observe("ops_stage_seconds", snap.load_seconds - loaded,
+                                command=method.__name__, stage="load")
+                self._local.command_name = None
+
+    return wrapper
+
+
+def _distances(ids, km) -> list:
+    return [round(km.get(str(rid).strip(), 0.0), 1) for rid in ids]
+
+
+class PendingWrites:
+    # Cell updates queued by a batch, per sheet. A later update to the same
+    # cell replaces the earlier one. `results` is filled when it is flushed.
+    def __init__(self):
+        self.changes = {}
+        self.results = {}
+
+    def add(self, sheet, changes):
+        cells = self.changes.setdefault(sheet, {})
+        for rid, field, value in changes:
+            key = (str(rid).strip(), str(field).strip())
+            cells.pop(key, None)
+            cells[key] = value
+
+    def count(self) -> int:
+        return sum(len(cells) for cells in self.changes.values())
 
 
 class OpsAgent:
-    def __init__(self, sheets_client):
+    def __init__(self, sheets_client, cache_ttl=None, cache=None):
+        # `cache` replaces the per-process SnapshotCache, e.g. with a
+        # SharedSnapshotCache reading what a loader process published
         self.sheets = sheets_client
+        self.cache = cache if cache is not None else SnapshotCache(sheets_client, ttl=cache_ttl)
+        self._local = threading.local()
+        # (sheet versions, command, args) -> result, see _memoized()
+        self.memo = LRUCache(MEMO_SIZE)
+        self.warmer = None
+        # StatusChanged events for every pilot/drone status written back
+        self.events = EventBus()
+        self.replanner = None
+
+    @contextmanager
+    def command(self):
+        # Nested calls (urgent_reassignment -> check_conflicts -> get_mission)
+        # share the snapshot pinned by the outermost call.
+        snap = getattr(self._local, "snapshot", None)
+        if snap is not None:
+            yield snap
+            return
+
+        self._local.snapshot = self.cache.snapshot()
+        try:
+            yield self._local.snapshot
+        finally:
+            self._local.snapshot = None
+
+    def snapshot(self):
+        snap = getattr(self._local, "snapshot", None)
+        if snap is None:
+            snap = self.cache.snapshot()
+        return snap
+
+    # statuses that make a resource unavailable whatever its bookings say
+    OFF_STATUSES = {"pilot": {"on leave", "unavailable"}, "drone": {"maintenance"}}
+
+    def stage(self, name):
+        # times one phase (filter/score/conflicts/...) of the running command
+        command = getattr(self._local, "command_name", None) or "-"
+        return METRICS.timer("ops_stage_seconds", command=command, stage=name)
 
     def load_all(self):
-        pilots = self.sheets.read_pilots_df()
-        drones = self.sheets.read_drones_df()
-        missions = self.sheets.read_missions_df()
-        return pilots, drones, missions
-
-    # ---------------- PILOTS ----------------
-    def query_pilots(self, skill=None, certification=None, location=None, status=None):
-        pilots, _, _ = self.load_all()
-
-        if pilots.empty:
-            return "No pilot roster data found."
-
-        df = pilots.copy()
-
-        if status:
-            df = df[df["status"].astype(str).str.lower() == status.lower()]
-
-        if location:
-            df = df[df["location"].astype(str).str.lower() == location.lower()]
-
-        if skill:
-            df = df[df["skills"].apply(lambda x: skill.lower() in normalize_list(x))]
+        snap = self.snapshot().load("pilots", "drones", "missions")
+        return snap.pilots, snap.drones, snap.missions
+
+    def roster_index(self) -> RosterIndex:
+        snap = self.snapshot()
+        snap.entry("pilots")
+        with self.stage("index"):
+            return snap.derive("pilots", "roster_index", RosterIndex)
+
+    def fleet_index(self) -> FleetIndex:
+        snap = self.snapshot()
+        snap.entry("drones")
+        with self.stage("index"):
+            return snap.derive("drones", "fleet_index", FleetIndex)
+
+    def booking_index(self) -> BookingIndex:
+        snap = self.snapshot()
+        snap.entry("missions")
+        with self.stage("index"):
+            return snap.derive("missions", "booking_index", BookingIndex)
+
+    def availability(self) -> AvailabilityCalendar:
+        snap = self.snapshot()
+        bookings = self.booking_index()
+        with self.stage("index"):
+            return snap.derive("missions", "availability", lambda df: AvailabilityCalendar(bookings))
+
+    def _pushdown(self, name) -> bool:
+        # Filtered reads go to the backend's indexed queries only while the
+        # sheet is neither pinned by this command nor cached: then they save
+        # loading the whole sheet. Once it is, the snapshot's index answers,
+        # which is faster and consistent with the rest of the command.
+        # Scenarios always read their overlay.
+        if not getattr(self.sheets, "pushdown", False):
+            return False
+        snap = self.snapshot()
+        if isinstance(snap, ScenarioSnapshot):
+            return False
+        return not snap.pinned(name) and not self.cache.cached(name)
+
+    def _query(self, name, **filters):
+        # a backend query, typed like the cached sheets so pushdown answers
+        # have the same dtypes as the snapshot's
+        df = getattr(self.sheets, f"query_{name}_df")(**filters)
+        if self.cache.typed:
+            df, _ = enforce_schema(name, df)
+        return df
+
+    def _busy(self, kind, start, end, exclude=None) -> set:
+        # lower-case ids booked on some day of [start, end]
+        if self._pushdown("missions"):
+            # only missions overlapping the window can make anything busy
+            with self.stage("pushdown"):
+                bookings = BookingIndex(self._query("missions", start=start, end=end))
+            return {rid for rid in bookings.by_resource[kind]
+                    if bookings.booked(kind, rid, start, end, exclude=exclude)}
+        return self.availability().busy(kind, start, end, exclude=exclude)
+
+    def _free(self, idx, kind, ids, free_from, free_to, exclude=None):
+        # ids not booked on any day of [free_from, free_to] and not on leave /
+        # in maintenance; pilots must also be available_from the start date
+        start, end = safe_date(free_from), safe_date(free_to or free_from)
+        if not start or not end or end < start:
+            return "Invalid start/end dates. Use YYYY-MM-DD (start <= end)."
+
+        with self.stage("calendar"):
+            busy = self._busy(kind, start, end, exclude=exclude)
+            off = set()
+            for status in self.OFF_STATUSES[kind]:
+                off |= idx.lookup("status", status)
+            ids = {rid for rid in ids if rid.lower() not in busy and rid not in off}
+
+            if kind == "pilot" and ids and "available_from" in idx.df.columns:
+                available = idx.df["available_from"]
+                if not pd.api.types.is_datetime64_any_dtype(available):
+                    available = pd.to_datetime(available.map(safe_date), errors="coerce")
+                late = idx.ids[available > pd.Timestamp(start)]
+                ids -= set(late)
+        return ids
+
+    def _memoized(self, command, compute, *args):
+        # Results that only depend on the sheets are reused while the pinned
+        # versions of all three sheets are unchanged. Scenario overlays keep
+        # their base versions, so they always recompute. Callers get a copy:
+        # the stored result is shared by every session.
+        snap = self.snapshot()
+        if isinstance(snap, ScenarioSnapshot):
+            return compute()
+        snap.load(*SHEETS)
+        key = (tuple(snap.versions[name] for name in SHEETS), command, *args)
+        result = self.memo.get(key)
+        if result is not None:
+            METRICS.inc("ops_memo_hits_total", command=command)
+            return copy.deepcopy(result)
+        METRICS.inc("ops_memo_misses_total", command=command)
+        result = compute()
+        self.memo.put(key, result)
+        return copy.deepcopy(result)
+
+    def start_warmer(self, days=WARM_DAYS) -> Prewarmer:
+        # precompute for missions starting in the next `days` days, now and
+        # whenever a new version of a sheet is loaded
+        if self.warmer is None:
+            self.warmer = Prewarmer(lambda: self.warm(days))
+            self.cache.changelog.subscribe(self.warmer.trigger)
+        self.warmer.trigger()
+        return self.warmer
+
+    @uses_snapshot
+    def warm(self, days=WARM_DAYS) -> int:
+        # fills the memo with conflicts and recommendations of upcoming missions
+        missions = self.snapshot().load(*SHEETS).missions
+        if missions.empty or "start_date" not in missions.columns:
+            return 0
+        starts = missions["start_date"]
+        if not pd.api.types.is_datetime64_any_dtype(starts):
+            starts = pd.to_datetime(starts.map(safe_date), errors="coerce")
+        today = pd.Timestamp.today().normalize()
+        upcoming = missions.loc[(starts >= today) & (starts <= today + pd.Timedelta(days=days)), "project_id"]
+
+        with self.stage("warm"):
+            for mission_id in upcoming.astype(str).str.strip():
+                self.check_conflicts(mission_id)
+                self.recommend_assignment(mission_id)
+        return len(upcoming)
+
+    def refresh(self, *sheets):
+        self.cache.invalidate(*sheets)
+        return {"success": True, "cache_version": self.cache.version}
+
+    @uses_snapshot
+    def data_issues(self):
+        # invalid cells found when the sheets were loaded
+        issues = self.snapshot().load("pilots", "drones", "missions").issues()
+        if issues.empty:
+            return "No invalid cells found."
+        return issues
 
-        if certification:
-            df = df[df["certifications"].apply(lambda x: certification.lower() in normalize_list(x))]
+    def stats(self) -> str:
+        return METRICS.report()
+
+    def data_age_note(self) -> str:
+        # "" while every loaded sheet comes from a successful fetch; otherwise
+        # a note saying which sheets are served from a saved copy and how old
+        degraded = self.cache.degraded() if hasattr(self.cache, "degraded") else {}
+        if not degraded:
+            return ""
+        lines = []
+        for name, (fetched_wall, source, error) in sorted(degraded.items()):
+            if fetched_wall:
+                minutes = max(0, int((time.time() - fetched_wall) // 60))
+                age = f"data from {time.strftime('%Y-%m-%d %H:%M', time.localtime(fetched_wall))} ({minutes} min old)"
+            else:
+                age = "data of unknown age"
+            reason = f"refresh failed: {error}" if error else "loaded from local copy, refreshing"
+            lines.append(f"  {name}: {age}, {reason}")
+        return "Stale data:\n" + "\n".join(lines)
+
+    # ---------------- BATCH ----------------
+    @contextmanager
+    def batch(self):
+        # Every command inside shares one snapshot, and writes are queued and
+        # sent per sheet in a single update_cells call when the block exits.
+        # Reads in the batch therefore see the sheets as of the first read.
+        if self._pending() is not None:
+            yield self._local.pending
+            return
+
+        pending = PendingWrites()
+        self._local.pending = pending
+        try:
+            with self.command():
+                yield pending
+        finally:
+            self._local.pending = None
+
+        for sheet, cells in pending.changes.items():
+            changes = [(rid, field, value) for (rid, field), value in cells.items()]
+            pending.results[sheet] = self.update_cells(sheet, changes)
+
+    def _pending(self):
+        return getattr(self._local, "pending", None)
+
+    # ---------------- STATUS EVENTS ----------------
+    STATUS_KINDS = {"pilots": ("pilot", "pilot_id"), "drones": ("drone", "drone_id")}
+
+    def _publish_status(self, sheet, updated):
+        # after the cache is invalidated, so subscribers read the new data
+        if sheet not in self.STATUS_KINDS:
+            return
+        kind, key = self.STATUS_KINDS[sheet]
+        for row in updated:
+            if "status" in row:
+                self.events.publish(StatusChanged(kind, row[key], row["status"]))
+
+    def start_replanner(self, notify, workers=REPLAN_WORKERS) -> Replanner:
+        # re-plan the missions of every pilot/drone whose status is written back
+        if self.replanner is None:
+            self.replanner = Replanner(self, notify, workers)
+            self.events.subscribe(self.replanner.on_event)
+        return self.replanner
+
+    @uses_snapshot
+    def open_missions_for(self, kind, resource_id) -> list:
+        # missions listing this pilot/drone that have not ended before today
+        today = pd.Timestamp.today().date()
+        out = []
+        for mission_id in self.booking_index().missions_for(kind, resource_id):
+            mission = self.get_mission(mission_id)
+            if not mission:
+                continue
+            end = safe_date(mission.get("end_date"))
+            if end is None or end >= today:
+                out.append(str(mission_id).strip())
+        return list(dict.fromkeys(out))
+
+    def recent_changes(self, limit: int = 10):
+        changes = list(self.cache.changelog.entries)[-limit:]
+        if not changes:
+            return "No sheet changes recorded yet."
+        return [c.as_dict() for c in reversed(changes)]
 
-        if df.empty:
+    # ---------------- PILOTS ----------------
+    PILOT_COLUMNS = ["pilot_id", "name", "location", "status", "skills", "certifications", "daily_rate_inr"]
+    DRONE_COLUMNS = ["drone_id", "model", "location", "status", "weather_resistance", "capabilities", "maintenance_due"]
+
+    @uses_snapshot
+    def query_pilots(self, skill=None, certification=None, location=None, status=None, page=1, page_size=PAGE_SIZE,
+                     free_from=None, free_to=None):
+        results = self.search_pilots(skill, certification, location, status, page_size,
+                                     free_from=free_from, free_to=free_to)
+        return self._page(results, page, "pilots")
+
+    def _pages(self, name, idx, positions, columns, page_size) -> ResultPages:
+        # records the sheet version when the positions index the cached frame
+        # (not a pushdown result or a scenario overlay), so a stored cursor
+        # can slice them out of it again later
+        snap = self.snapshot()
+        version = None
+        if not isinstance(snap, ScenarioSnapshot) and snap.pinned(name) and idx.df is snap.frame(name):
+            version = snap.versions[name]
+        return ResultPages(idx.df, positions, columns, page_size, version=version)
+
+    @staticmethod
+    def _page(results, page, what):
+        if isinstance(results, str):
+            return results
+        if page < 1 or page > results.pages:
+            return f"Page {page} is out of range: {results.total} matching {what}, {results.pages} page(s)."
+        return results.page(page)
+
+    @uses_snapshot
+    def search_pilots(self, skill=None, certification=None, location=None, status=None, page_size=PAGE_SIZE,
+                      free_from=None, free_to=None):
+        # matching pilots as a ResultPages over the snapshot (pages built lazily);
+        # free_from/free_to keep only pilots with no booking in that window
+        if (status or location) and self._pushdown("pilots"):
+            # let the backend's indexes do the status/location filtering; the
+            # index covers the matching rows only
+            with self.stage("pushdown"):
+                idx = RosterIndex(self._query("pilots", status=status, location=location))
+            ids = idx.candidates(skills=skill, certifications=certification)
+        else:
+            if self.snapshot().pilots.empty:
+                return "No pilot roster data found."
+            idx = self.roster_index()
+            with self.stage("filter"):
+                ids = idx.candidates(status=status, location=location, skills=skill, certifications=certification)
+
+        if free_from or free_to:
+            ids = self._free(idx, "pilot", ids, free_from, free_to)
+            if isinstance(ids, str):
+                return ids
+        positions = idx.positions(ids)
+
+        if not len(positions):
             return "No matching pilots found."
 
-        cols = ["pilot_id", "name", "location", "status", "skills", "certifications", "daily_rate_inr"]
-        return df[cols].head(20)
+        return self._pages("pilots", idx, positions, self.PILOT_COLUMNS, page_size)
 
+    @uses_snapshot
     def calc_pilot_cost(self, pilot_id: str, start_date: str, end_date: str):
-        pilots, _, _ = self.load_all()
+        pilots = self.snapshot().pilots
         p = pilots[pilots["pilot_id"].astype(str).str.strip() == str(pilot_id).strip()]
 
         if p.empty:
             return f"Pilot {pilot_id} not found."
 
         p = p.iloc[0]
-        rate = float(p.get("daily_rate_inr", 0))
+        rate = safe_float(p.get("daily_rate_inr", 0))
+        if rate is None:
+            return f"Pilot {pilot_id} has no valid daily_rate_inr."
+        if rate.is_integer():
+            rate = int(rate)
 
         s = safe_date(start_date)
         e = safe_date(end_date)
@@ -68,38 +426,76 @@ class OpsAgent:
         }
 
     def update_pilot_status(self, pilot_id: str, new_status: str):
-        return self.sheets.update_pilot_status(pilot_id, new_status)
+        if self._pending() is not None:
+            return self.update_cells("pilots", [(pilot_id, "status", new_status)])
+
+        result = self.sheets.update_pilot_status(pilot_id, new_status)
+        if result.get("success"):
+            self.cache.invalidate("pilots")
+            self.events.publish(StatusChanged("pilot", pilot_id, new_status))
+        return result
+
+    def update_pilots_status(self, pilot_ids, new_status: str):
+        return self.update_cells("pilots", [(pid, "status", new_status) for pid in pilot_ids])
+
+    def update_cells(self, sheet: str, changes):
+        # changes: list of (row id, column, value), written in one batch
+        pending = self._pending()
+        if pending is not None:
+            changes = list(changes)
+            pending.add(sheet, changes)
+            return {"success": True, "queued": len(changes)}
+
+        result = self.sheets.update_cells(sheet, changes)
+        if result.get("updated"):
+            self.cache.invalidate(sheet)
+            self._publish_status(sheet, result["updated"])
+        return result
 
     # ---------------- DRONES ----------------
-    def query_drones(self, capability=None, location=None, status=None, mission_weather=None):
-        _, drones, _ = self.load_all()
-
-        if drones.empty:
-            return "No drone fleet data found."
-
-        df = drones.copy()
-
-        if status:
-            df = df[df["status"].astype(str).str.lower() == status.lower()]
-
-        if location:
-            df = df[df["location"].astype(str).str.lower() == location.lower()]
-
-        if capability:
-            df = df[df["capabilities"].apply(lambda x: capability.lower() in normalize_list(x))]
+    @uses_snapshot
+    def query_drones(self, capability=None, location=None, status=None, mission_weather=None,
+                     page=1, page_size=PAGE_SIZE, free_from=None, free_to=None):
+        results = self.search_drones(capability, location, status, mission_weather, page_size,
+                                     free_from=free_from, free_to=free_to)
+        return self._page(results, page, "drones")
+
+    @uses_snapshot
+    def search_drones(self, capability=None, location=None, status=None, mission_weather=None, page_size=PAGE_SIZE,
+                      free_from=None, free_to=None):
+        if (status or location) and self._pushdown("drones"):
+            with self.stage("pushdown"):
+                idx = FleetIndex(self._query("drones", status=status, location=location))
+            ids = idx.candidates(capabilities=capability)
+        else:
+            if self.snapshot().drones.empty:
+                return "No drone fleet data found."
+            idx = self.fleet_index()
+            with self.stage("filter"):
+                ids = idx.candidates(status=status, location=location, capabilities=capability)
 
         if mission_weather:
-            df = df[df.apply(lambda r: weather_ok(r.get("weather_resistance", ""), mission_weather), axis=1)]
+            with self.stage("filter"):
+                ids &= idx.matching("weather_resistance", lambda r: weather_ok(r, mission_weather))
+
+        if free_from or free_to:
+            ids = self._free(idx, "drone", ids, free_from, free_to)
+            if isinstance(ids, str):
+                return ids
+        positions = idx.positions(ids)
 
-        if df.empty:
+        if not len(positions):
             return "No matching drones found."
 
-        cols = ["drone_id", "model", "location", "status", "weather_resistance", "capabilities", "maintenance_due"]
-        return df[cols].head(20)
+        return self._pages("drones", idx, positions, self.DRONE_COLUMNS, page_size)
+
+    def update_drones_status(self, drone_ids, new_status: str):
+        return self.update_cells("drones", [(did, "status", new_status) for did in drone_ids])
 
     # ---------------- MISSIONS ----------------
+    @uses_snapshot
     def get_mission(self, mission_id: str):
-        _, _, missions = self.load_all()
+        missions = self.snapshot().missions
         if missions.empty:
             return None
 
@@ -109,22 +505,70 @@ class OpsAgent:
             return None
         return m.iloc[0].to_dict()
 
+    def update_mission_assignment(self, mission_id: str, assigned_pilots=None, assigned_drones=None):
+        if self._pending() is not None:
+            changes = []
+            if assigned_pilots is not None:
+                changes.append((mission_id, "assigned_pilots", ", ".join(assigned_pilots)))
+            if assigned_drones is not None:
+                changes.append((mission_id, "assigned_drones", ", ".join(assigned_drones)))
+            return self.update_cells("missions", changes)
+
+        result = self.sheets.update_mission_assignment(mission_id, assigned_pilots, assigned_drones)
+        if result.get("updated"):
+            self.cache.invalidate("missions")
+        return result
+
+    @uses_snapshot
     def check_conflicts(self, mission_id: str):
+        mission_id = str(mission_id).strip()
+        return self._memoized("check_conflicts", lambda: self._check_conflicts(mission_id), mission_id)
+
+    def _check_conflicts(self, mission_id):
         pilots, drones, missions = self.load_all()
         mission = self.get_mission(mission_id)
         if not mission:
             return f"Mission {mission_id} not found."
 
-        issues = detect_conflicts_for_mission(mission, pilots, drones, missions)
+        bookings = self.booking_index()
+        with self.stage("conflicts"):
+            issues = detect_conflicts_for_mission(mission, pilots, drones, missions, bookings=bookings)
 
         if not issues:
             return f"No conflicts detected for mission {mission_id}."
 
         return issues
 
-    # ---------------- ASSIGNMENT SUGGESTION ----------------
-    def recommend_assignment(self, mission_id: str):
+    @uses_snapshot
+    def check_all_conflicts(self, start_date: str = None, end_date: str = None):
+        start = safe_date(start_date)
+        end = safe_date(end_date)
+        if (start_date and not start) or (end_date and not end):
+            return "Invalid from/to dates. Use YYYY-MM-DD."
+
         pilots, drones, missions = self.load_all()
+        if missions.empty:
+            return "No missions data found."
+
+        bookings = self.booking_index()
+        with self.stage("conflicts"):
+            table = detect_conflicts_all(pilots, drones, missions, bookings=bookings, start=start, end=end)
+        if table.empty:
+            return "No conflicts detected."
+
+        return table
+
+    # ---------------- ASSIGNMENT SUGGESTION ----------------
+    @uses_snapshot
+    def recommend_assignment(self, mission_id: str, radius_km: float = SEARCH_RADIUS_KM):
+        mission_id = str(mission_id).strip()
+        return self._memoized("recommend_assignment",
+                              lambda: self._recommend_assignment(mission_id, radius_km), mission_id, radius_km)
+
+    def _recommend_assignment(self, mission_id, radius_km):
+        # candidates come from every known place within radius_km of the
+        # mission city; travel distance is part of the score
+        self.snapshot().load("pilots", "drones", "missions")
         mission = self.get_mission(mission_id)
 
         if not mission:
@@ -134,45 +578,48 @@ class OpsAgent:
         m_weather = str(mission.get("weather_forecast", "")).strip()
 
         # --- filter eligible pilots ---
-        p_df = pilots.copy()
-        p_df = p_df[p_df["status"].astype(str).str.lower() == "available"]
-        p_df = p_df[p_df["location"].astype(str).str.lower() == m_loc]
-
         required_skills = normalize_list(mission.get("required_skills", ""))
         required_certs = normalize_list(mission.get("required_certs", ""))
 
-        for s in required_skills:
-            p_df = p_df[p_df["skills"].apply(lambda x: s in normalize_list(x))]
-
-        for c in required_certs:
-            p_df = p_df[p_df["certifications"].apply(lambda x: c in normalize_list(x))]
+        roster = self.roster_index()
+        with self.stage("filter"):
+            # a mission without a location takes pilots from anywhere
+            p_near = ids_within(roster, m_loc, radius_km) if m_loc else {}
+            p_ids = roster.candidates(status="available", skills=required_skills, certifications=required_certs)
+            if m_loc:
+                p_ids &= p_near.keys()
+            p_ids = self._unbooked("pilot", p_ids, mission)
+            p_df = roster.frame(p_ids)
 
         if p_df.empty:
             return "No eligible pilots found for this mission (availability/location/skills/certs)."
 
         # --- filter eligible drones ---
-        d_df = drones.copy()
-        d_df = d_df[d_df["status"].astype(str).str.lower() == "available"]
-        d_df = d_df[d_df["location"].astype(str).str.lower() == m_loc]
-        d_df = d_df[d_df.apply(lambda r: weather_ok(r.get("weather_resistance", ""), m_weather), axis=1)]
+        fleet = self.fleet_index()
+        with self.stage("filter"):
+            d_near = ids_within(fleet, m_loc, radius_km) if m_loc else {}
+            d_ids = fleet.candidates(status="available")
+            if m_loc:
+                d_ids &= d_near.keys()
+            d_ids &= fleet.matching("weather_resistance", lambda r: weather_ok(r, m_weather))
+            d_ids = self._unbooked("drone", d_ids, mission)
+            d_df = fleet.frame(d_ids)
 
         if d_df.empty:
             return "No eligible drones found for this mission (availability/location/weather)."
 
-        # scoring
-        p_df = p_df.copy()
-        p_df["score"] = p_df.apply(lambda r: score_pilot(r, mission), axis=1)
-        p_df = p_df.sort_values("score", ascending=False)
-
-        d_df = d_df.copy()
-        d_df["score"] = d_df.apply(lambda r: score_drone(r, mission), axis=1)
-        d_df = d_df.sort_values("score", ascending=False)
+        required_pilots = safe_int(mission.get("required_pilots", 1))
+        required_drones = safe_int(mission.get("required_drones", 1))
 
-        required_pilots = int(mission.get("required_pilots", 1) or 1)
-        required_drones = int(mission.get("required_drones", 1) or 1)
+        # scoring
+        with self.stage("score"):
+            p_df = p_df.assign(score=score_pilots_frame(p_df, mission, roster, qualified=True))
+            d_df = d_df.assign(score=score_drones_frame(d_df, mission))
 
-        best_pilots = p_df.head(required_pilots)[["pilot_id", "name", "daily_rate_inr", "score"]]
-        best_drones = d_df.head(required_drones)[["drone_id", "model", "weather_resistance", "score"]]
+            best_pilots = top_k(p_df, required_pilots)[["pilot_id", "name", "daily_rate_inr", "score"]]
+            best_drones = top_k(d_df, required_drones)[["drone_id", "model", "weather_resistance", "score"]]
+            best_pilots = best_pilots.assign(distance_km=_distances(best_pilots["pilot_id"], p_near))
+            best_drones = best_drones.assign(distance_km=_distances(best_drones["drone_id"], d_near))
 
         return {
             "project_id": mission_id,
@@ -180,8 +627,153 @@ class OpsAgent:
             "recommended_drones": best_drones.to_dict(orient="records"),
         }
 
+    def _unbooked(self, kind, ids, mission):
+        # drops resources booked on another mission overlapping this one
+        start, end = safe_date(mission.get("start_date")), safe_date(mission.get("end_date"))
+        if not start or not end:
+            return ids
+        busy = self.availability().busy(kind, start, end, exclude=mission.get("project_id"))
+        return {rid for rid in ids if rid.lower() not in busy}
+
+    # ---------------- WHAT-IF SCENARIOS ----------------
+    @contextmanager
+    def scenario(self, changes):
+        # Runs the block against the current snapshot with hypothetical
+        # (sheet, id, column, value) changes applied in memory only
+        with self.command() as base:
+            overlay = ScenarioSnapshot(base, changes)
+            self._local.snapshot = overlay
+            try:
+                yield overlay
+            finally:
+                self._local.snapshot = base
+
+    def resolve_ids(self, ids) -> dict:
+        # id -> sheet it belongs to (pilots / drones / missions), or None
+        snap = self.snapshot().load("pilots", "drones", "missions")
+        known = {
+            "pilots": set(self.roster_index().ids),
+            "drones": set(self.fleet_index().ids),
+            "missions": set(snap.missions["project_id"].astype(str).str.strip()) if "project_id" in snap.missions else set(),
+        }
+        out = {}
+        for rid in ids:
+            rid = str(rid).strip()
+            out[rid] = next((sheet for sheet, values in known.items() if rid in values), None)
+        return out
+
+    @uses_snapshot
+    def recommended_in(self, kind, resource_id, radius_km=SEARCH_RADIUS_KM) -> list:
+        # missions whose current recommendation picks this pilot/drone. Only
+        # missions within radius_km of it (or without a location) can pick
+        # it, so only their (memoized) recommendations are looked at
+        index = self.roster_index() if kind == "pilot" else self.fleet_index()
+        rid = str(resource_id).strip()
+        place = index.keys["location"].get(rid)
+        missions = self.snapshot().load(*SHEETS).missions
+        if place is None or missions.empty or "project_id" not in missions.columns:
+            return []
+
+        near = {name for name, _ in GAZETTEER.within(place, radius_km)} | {""}
+        locations = missions.get("location", pd.Series("", index=missions.index))
+        locations = locations.astype(object).fillna("").astype(str).str.strip().str.lower()
+        column = f"{kind}_id"
+        out = []
+        for mission_id in dict.fromkeys(missions.loc[locations.isin(near), "project_id"].astype(str).str.strip()):
+            rec = self.recommend_assignment(mission_id, radius_km)
+            if isinstance(rec, dict) and any(str(r[column]) == rid for r in rec[f"recommended_{kind}s"]):
+                out.append(mission_id)
+        return out
+
+    @uses_snapshot
+    def what_if(self, changes, missions=()):
+        # changes: (id, column, value) or (sheet, id, column, value). Only the
+        # missions that depend on a changed resource (plus `missions`) are
+        # re-checked and re-recommended; returns their diff against the baseline.
+        changes = [tuple(c) for c in changes]
+        sheets = self.resolve_ids([c[0] for c in changes if len(c) == 3])
+        unknown = [c[0] for c in changes if len(c) == 3 and sheets[str(c[0]).strip()] is None]
+        if unknown:
+            return f"Unknown id(s): {', '.join(unknown)}"
+        changes = [c if len(c) == 4 else (sheets[str(c[0]).strip()], *c) for c in changes]
+
+        affected = affected_missions(self.booking_index(), changes, self.recommended_in)
+        affected += [str(m).strip() for m in missions if str(m).strip() not in affected]
+
+        def evaluate():
+            return {mid: (self.check_conflicts(mid), self.recommend_assignment(mid)) for mid in affected}
+
+        with self.stage("scenario"):
+            before = evaluate()
+            with self.scenario(changes):
+                after = evaluate()
+
+        diffs = [diff_mission(mid, before[mid], after[mid]) for mid in affected]
+        return {
+            "changes": [{"sheet": s, "id": rid, "column": col, "value": value} for s, rid, col, value in changes],
+            "affected_missions": affected,
+            "impacted": [d for d in diffs if changed(d)],
+            "unchanged": [d["project_id"] for d in diffs if not changed(d)],
+        }
+
+    # ---------------- NEAREST RESOURCES ----------------
+    @uses_snapshot
+    def nearest_pilots(self, location, k=5, radius_km=None, skill=None, certification=None, status="available"):
+        # k closest matching pilots to `location` (optionally only within radius_km)
+        if self.snapshot().pilots.empty:
+            return "No pilot roster data found."
+        roster = self.roster_index()
+        eligible = roster.candidates(status=status, skills=skill, certifications=certification)
+        return self._nearest(roster, location, k, radius_km, eligible, self.PILOT_COLUMNS, "pilots")
+
+    @uses_snapshot
+    def nearest_drones(self, location, k=5, radius_km=None, capability=None, status="available", mission_weather=None):
+        if self.snapshot().drones.empty:
+            return "No drone fleet data found."
+        fleet = self.fleet_index()
+        eligible = fleet.candidates(status=status, capabilities=capability)
+        if mission_weather:
+            eligible &= fleet.matching("weather_resistance", lambda r: weather_ok(r, mission_weather))
+        return self._nearest(fleet, location, k, radius_km, eligible, self.DRONE_COLUMNS, "drones")
+
+    def _nearest(self, index, location, k, radius_km, eligible, columns, what):
+        with self.stage("geo"):
+            if radius_km is not None:
+                found = sorted(((rid, d) for rid, d in ids_within(index, location, radius_km).items()
+                                if rid in eligible), key=lambda x: (x[1], x[0]))[:k]
+            else:
+                found = k_nearest(index, location, k, eligible)
+
+        if not found:
+            return f"No matching {what} found near {location}."
+
+        km = dict(found)
+        rank = {rid: i for i, (rid, _) in enumerate(found)}
+        df = index.frame(set(km))
+        ids = index.ids.loc[df.index]
+        df = df.assign(distance_km=_distances(ids, km), _rank=ids.map(rank).to_numpy())
+        return df.sort_values("_rank", kind="stable")[columns + ["distance_km"]]
+
+    # ---------------- MULTI-MISSION PLANNING ----------------
+    @uses_snapshot
+    def plan_missions(self, start_date: str = None, end_date: str = None):
+        start = safe_date(start_date)
+        end = safe_date(end_date)
+        if (start_date and not start) or (end_date and not end):
+            return "Invalid from/to dates. Use YYYY-MM-DD."
+
+        pilots, drones, missions = self.load_all()
+        if missions.empty:
+            return "No missions data found."
+
+        roster, fleet, bookings = self.roster_index(), self.fleet_index(), self.booking_index()
+        with self.stage("plan"):
+            return plan_missions(pilots, drones, missions, roster, fleet, bookings, start=start, end=end)
+
     # ---------------- URGENT REASSIGNMENT ----------------
+    @uses_snapshot
     def urgent_reassignment(self, mission_id: str):
+        self.snapshot().load("pilots", "drones", "missions")
         mission = self.get_mission(mission_id)
         if not mission:
             return f"Mission {mission_id} not found."
@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict
+
+# Rows per page for show pilots / show drones
+PAGE_SIZE = 20
+
+
+class ResultPages:
+    # Paged view over the matching rows of one snapshot frame. Only the row
+    # positions of the matches are kept; each page is sliced out on demand,
+    # so the first page of a large result costs the same as a small one.
+    # `version` is the cached sheet version `df` is, when it is one.
+    def __init__(self, df, positions, columns, page_size=PAGE_SIZE, version=None):
+        self.df = df
+        self.positions = positions
+        self.columns = [c for c in columns if c in df.columns]
+        self.page_size = max(1, int(page_size))
+        self.version = version
+
+    @property
+    def total(self) -> int:
+        return len(self.positions)
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-self.total // self.page_size))
+
+    def page(self, n: int):
+        start = (n - 1) * self.page_size
+        return self.df.iloc[self.positions[start:start + self.page_size]][self.columns]
+
+    def iter_pages(self, start: int = 1):
+        for n in range(max(1, start), self.pages + 1):
+            yield n, self.page(n)
+
+
+class Cursor:
+    # Where a user is in a paged result; "next" moves it forward. It keeps
+    # the query, the matching row positions and the sheet version they
+    # index, not the frame, so stored cursors never keep old copies of a
+    # sheet alive.
+    def __init__(self, kind, filters, results: ResultPages, page: int = 1):
+        self.kind = kind
+        self.filters = filters
+        self.page = page
+        self.update(results)
+
+    def update(self, results: ResultPages):
+        self.positions = results.positions
+        self.columns = results.columns
+        self.page_size = results.page_size
+        self.version = results.version
+        self.total = results.total
+        self.pages = results.pages
+
+    def resume(self, entry):
+        # the same rows from a SheetEntry of the sheet, or None when the
+        # entry is another version (the query has to run again)
+        if self.version is None or entry.version != self.version:
+            return None
+        return ResultPages(entry.df, self.positions, self.columns, self.page_size, version=self.version)
+
+
+class CursorStore:
+    # Last cursor per chat session, bounded (least recently used dropped)
+    def __init__(self, maxlen=256):
+        self.maxlen = maxlen
+        self._cursors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session):
+        with self._lock:
+            cursor = self._cursors.get(session)
+            if cursor is not None:
+                self._cursors.move_to_end(session)
+            return cursor
+
+    def put(self, session, cursor):
+        with self._lock:
+            self._cursors[session] = cursor
+            self._cursors.move_to_end(session)
+            while len(self._cursors) > self.maxlen:
+                self._cursors.popitem(last=False)
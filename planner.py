@@ -0,0 +1,311 @@
+import heapq
+from collections import defaultdict
+
+import pandas as pd
+
+from utils import normalize_list, safe_date, safe_float, safe_int, overlaps, weather_ok
+from matcher import score_pilots_frame, score_drones_frame
+
+
+# ---------------- MIN-COST FLOW ----------------
+class MinCostFlow:
+    # Primal-dual min-cost flow: Dijkstra on reduced costs sets the node
+    # potentials, then every augmenting path of zero reduced cost is pushed
+    # (depth-first) before the next Dijkstra. Edge costs must be integers and
+    # non-negative when added.
+    def __init__(self, n):
+        self.n = n
+        self.graph = [[] for _ in range(n)]  # node -> [edge ids]
+        self.to, self.cap, self.cost = [], [], []
+
+    def add_edge(self, u, v, cap, cost) -> int:
+        eid = len(self.to)
+        self.to += [v, u]
+        self.cap += [cap, 0]
+        self.cost += [cost, -cost]
+        self.graph[u].append(eid)
+        self.graph[v].append(eid + 1)
+        return eid
+
+    def flow(self, s, t):
+        n, to, cap, cost, graph = self.n, self.to, self.cap, self.cost, self.graph
+        potential = [0] * n
+        total_flow = total_cost = 0
+
+        while True:
+            dist = [None] * n
+            prev_edge = [-1] * n
+            dist[s] = 0
+            heap = [(0, s)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                for eid in graph[u]:
+                    if cap[eid] <= 0:
+                        continue
+                    v = to[eid]
+                    nd = d + cost[eid] + potential[u] - potential[v]
+                    if dist[v] is None or nd < dist[v]:
+                        dist[v] = nd
+                        prev_edge[v] = eid
+                        heapq.heappush(heap, (nd, v))
+
+            if dist[t] is None:
+                return total_flow, total_cost
+
+            # capped at dist[t] (unreached nodes included), which keeps every
+            # reduced cost non-negative
+            for v in range(n):
+                potential[v] += dist[t] if dist[v] is None else min(dist[v], dist[t])
+
+            while True:
+                pushed = self._augment(s, t, potential)
+                if not pushed:
+                    break
+                total_flow += pushed
+                total_cost += pushed * (potential[t] - potential[s])
+
+    def _augment(self, s, t, potential) -> int:
+        # one path from s to t over edges with spare capacity and zero
+        # reduced cost; pushes its bottleneck and returns it (0: none left)
+        to, cap, cost, graph = self.to, self.cap, self.cost, self.graph
+        visited = [False] * self.n
+        visited[s] = True
+        path, stack = [], [iter(graph[s])]
+        while stack:
+            u = to[path[-1]] if path else s
+            for eid in stack[-1]:
+                v = to[eid]
+                if cap[eid] > 0 and not visited[v] and cost[eid] + potential[u] - potential[v] == 0:
+                    visited[v] = True
+                    path.append(eid)
+                    if v == t:
+                        push = min(cap[e] for e in path)
+                        for e in path:
+                            cap[e] -= push
+                            cap[e ^ 1] += push
+                        return push
+                    stack.append(iter(graph[v]))
+                    break
+            else:
+                stack.pop()
+                if path:
+                    path.pop()
+        return 0
+
+
+# ---------------- MISSION PLANNING ----------------
+def _required(mission, col) -> int:
+    return safe_int(mission.get(col, 1))
+
+
+def _rates(df) -> pd.Series:
+    if "daily_rate_inr" not in df.columns:
+        return pd.Series(0.0, index=df.index)
+    return pd.to_numeric(df["daily_rate_inr"], errors="coerce").fillna(0.0)
+
+
+def _groups(missions):
+    # Missions only compete for resources if they share a location (eligibility
+    # requires it) and their dates overlap. Groups are the connected components
+    # of that overlap graph: within a location, in start order, a new group
+    # starts at the first mission beginning after every earlier one has ended.
+    # A (days 1-5), B (4-10), C (6-8) form one group although A and C do not
+    # overlap.
+    by_loc = defaultdict(list)
+    for m in missions:
+        by_loc[m["_loc"]].append(m)
+
+    groups = []
+    for ms in by_loc.values():
+        ms.sort(key=lambda m: (m["_start"], m["_end"]))
+        current, last_end = [], None
+        for m in ms:
+            if current and m["_start"] > last_end:
+                groups.append(current)
+                current, last_end = [], None
+            current.append(m)
+            last_end = m["_end"] if last_end is None else max(last_end, m["_end"])
+        if current:
+            groups.append(current)
+
+    groups.sort(key=lambda g: g[0]["_start"])
+    return groups
+
+
+def _solve(group, candidates, slots_col):
+    # candidates: mission key -> [(resource id, score)] best first.
+    # Each resource goes to at most one mission of the group, which can never
+    # double-book it; _top_up() then lets it take further missions it does
+    # not overlap.
+    resources = sorted({rid for cands in candidates.values() for rid, _ in cands})
+    if not resources:
+        return defaultdict(list)
+
+    r_node = {rid: 1 + len(group) + i for i, rid in enumerate(resources)}
+    source, sink = 0, 1 + len(group) + len(resources)
+    net = MinCostFlow(sink + 1)
+
+    best = max(score for cands in candidates.values() for _, score in cands)
+    edges = []
+    for i, m in enumerate(group, start=1):
+        net.add_edge(source, i, m[slots_col], 0)
+        for rid, score in candidates.get(m["_key"], []):
+            # shift so costs stay positive: max flow first, then max score
+            eid = net.add_edge(i, r_node[rid], 1, best - score + 1)
+            edges.append((eid, m["_key"], rid, score))
+
+    for rid in resources:
+        net.add_edge(r_node[rid], sink, 1, 0)
+
+    net.flow(source, sink)
+
+    chosen = defaultdict(list)
+    for eid, key, rid, score in edges:
+        if net.cap[eid] == 0:
+            chosen[key].append((rid, score))
+    return chosen
+
+
+def _top_up(group, candidates, chosen, slots_col):
+    # Fills slots the flow left open, in start order, with candidates already
+    # given to missions of the group that do not overlap this one
+    taken = defaultdict(list)
+    for m in group:
+        for rid, _ in chosen.get(m["_key"], []):
+            taken[rid].append((m["_start"], m["_end"]))
+
+    for m in group:
+        picks = chosen[m["_key"]]
+        have = {rid for rid, _ in picks}
+        for rid, score in candidates.get(m["_key"], []):
+            if len(picks) >= m[slots_col]:
+                break
+            if rid in have or any(overlaps(m["_start"], m["_end"], s, e) for s, e in taken[rid]):
+                continue
+            picks.append((rid, score))
+            taken[rid].append((m["_start"], m["_end"]))
+    return chosen
+
+
+def _candidates(index, eligible, k, score_fn, mask=None):
+    # top-k (resource id, score) among the eligible rows, best first
+    if not eligible:
+        return []
+    frame = index.frame(eligible)
+    if mask is not None:
+        frame = frame[mask.loc[frame.index]]
+    if frame.empty:
+        return []
+    scores = score_fn(frame).nlargest(k, keep="first")
+    return list(zip(index.ids.loc[scores.index], scores.astype(int).tolist()))
+
+
+def plan_missions(pilots_df, drones_df, missions_df, roster, fleet, bookings, start=None, end=None):
+    # A heuristic, not a global optimum (assigning intervals to resources
+    # with eligibility is NP-hard): each group of overlapping missions is
+    # solved as one flow that gives a resource at most one of its missions,
+    # then open slots are topped up with resources free on those dates.
+    # No resource is ever booked on two overlapping missions.
+    # Eligibility is exact-city on purpose, unlike assign mission's radius
+    # search: groups are then per city, so missions in different cities never
+    # compete for a resource and each flow stays small.
+    missions = []
+    skipped = []
+    for m in missions_df.to_dict(orient="records"):
+        m_start = safe_date(m.get("start_date"))
+        m_end = safe_date(m.get("end_date"))
+        key = str(m.get("project_id", "")).strip()
+        if (start or end) and not overlaps(m_start, m_end, start or m_start, end or m_end):
+            continue
+        if not m_start or not m_end:
+            skipped.append(key)
+            continue
+        m.update(
+            _key=key,
+            _start=m_start,
+            _end=m_end,
+            _loc=str(m.get("location", "")).strip().lower(),
+            _pilots=_required(m, "required_pilots"),
+            _drones=_required(m, "required_drones"),
+        )
+        missions.append(m)
+
+    # Existing assignments on missions outside the plan still block resources.
+    # Only resources that have such a booking need the interval lookup.
+    planned = {m["_key"] for m in missions}
+    external = {"pilot": set(), "drone": set()}
+    for m in missions_df.to_dict(orient="records"):
+        if str(m.get("project_id", "")).strip() not in planned:
+            external["pilot"].update(normalize_list(m.get("assigned_pilots", "")))
+            external["drone"].update(normalize_list(m.get("assigned_drones", "")))
+
+    # intervals already handed out by this plan, per resource
+    used = {"pilot": defaultdict(list), "drone": defaultdict(list)}
+
+    def blocked(kind, rid, m):
+        if any(overlaps(m["_start"], m["_end"], s, e) for s, e in used[kind].get(rid, ())):
+            return True
+        if rid.lower() in external[kind]:
+            booked = bookings.booked(kind, rid, m["_start"], m["_end"])
+            return any(str(x).strip() not in planned for x in booked)
+        return False
+
+    rates = _rates(pilots_df)
+    plan = {m["_key"]: {"pilots": [], "drones": [], "score": 0} for m in missions}
+    unfilled = []
+
+    for group in _groups(missions):
+        pilot_slots = sum(m["_pilots"] for m in group)
+        drone_slots = sum(m["_drones"] for m in group)
+
+        # Keeping each mission's top-S candidates (S = slots in the group) loses
+        # nothing in the flow: the other missions can take at most S - required
+        # of them.
+        p_cands, d_cands = {}, {}
+        for m in group:
+            p_ids = roster.candidates(
+                status="available",
+                location=m["_loc"],
+                skills=normalize_list(m.get("required_skills", "")),
+                certifications=normalize_list(m.get("required_certs", "")),
+            )
+            p_ids = {rid for rid in p_ids if not blocked("pilot", rid, m)}
+
+            # budget: each pilot slot gets an equal share of the mission budget
+            mask = None
+            budget = safe_float(m.get("mission_budget_inr"))
+            if budget is not None and m["_pilots"]:
+                days = (m["_end"] - m["_start"]).days + 1
+                mask = rates * days <= budget / m["_pilots"]
+
+            p_cands[m["_key"]] = _candidates(
+                roster, p_ids, pilot_slots, lambda f: score_pilots_frame(f, m, roster, qualified=True), mask
+            )
+
+            d_ids = fleet.candidates(status="available", location=m["_loc"])
+            d_ids &= fleet.matching("weather_resistance", lambda r: weather_ok(r, m.get("weather_forecast", "")))
+            d_ids = {rid for rid in d_ids if not blocked("drone", rid, m)}
+            d_cands[m["_key"]] = _candidates(fleet, d_ids, drone_slots, lambda f: score_drones_frame(f, m))
+
+        for kind, cands, slots_col in (("pilots", p_cands, "_pilots"), ("drones", d_cands, "_drones")):
+            chosen = _top_up(group, cands, _solve(group, cands, slots_col), slots_col)
+            for m in group:
+                picks = chosen.get(m["_key"], [])
+                picks.sort(key=lambda p: -p[1])
+                for rid, _ in picks:
+                    used[kind[:-1]][rid].append((m["_start"], m["_end"]))
+                plan[m["_key"]][kind] = [rid for rid, _ in picks]
+                plan[m["_key"]]["score"] += sum(score for _, score in picks)
+                missing = m[slots_col] - len(picks)
+                if missing > 0:
+                    unfilled.append({"project_id": m["_key"], "resource": kind[:-1], "missing": missing})
+
+    return {
+        "missions_planned": len(plan),
+        "total_score": sum(p["score"] for p in plan.values()),
+        "assignments": [{"project_id": key, **value} for key, value in plan.items()],
+        "unfilled": unfilled,
+        "skipped_no_dates": skipped,
+    }
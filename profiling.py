@@ -0,0 +1,235 @@
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+from metrics import METRICS
+
+# SKYLARK_PROFILE=1 profiles every OpsAgent command; otherwise only commands
+# sent as "profile <command>" are profiled
+PROFILE_ALL = os.getenv("SKYLARK_PROFILE", "0") == "1"
+
+# Where profiles go, and how many invocations are kept (oldest removed)
+PROFILE_DIR = os.getenv("SKYLARK_PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("SKYLARK_PROFILE_KEEP", "20"))
+
+# Seconds between stack samples, and lines in the allocation report
+SAMPLE_INTERVAL = 0.001
+TOP_ALLOCATIONS = 25
+
+_active = threading.local()
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+_tracing_starts = 0
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Sampler:
+    # Records the stack of one thread every `interval` seconds from a helper
+    # thread, as root-first "a;b;c" strings (the collapsed-stack format
+    # flamegraph.pl and speedscope read) with a sample count each.
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+class ProfileReport:
+    def __init__(self, label):
+        self.label = label
+        self.seconds = 0.0
+        self.stacks = Counter()
+        self.allocations = []
+        self.peak_bytes = 0
+        # another profile ran at the same time, and the peak covers both
+        self.peak_shared = False
+        self.paths = {}
+        self.error = None
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def self_time(self) -> Counter:
+        # samples where the function was on top of the stack
+        out = Counter()
+        for stack, count in self.stacks.items():
+            out[stack.rsplit(";", 1)[-1]] += count
+        return out
+
+    @property
+    def peak(self) -> str:
+        shared = " (shared with a concurrent profile)" if self.peak_shared else ""
+        return f"{self.peak_bytes / 1e6:.1f} MB{shared}"
+
+    def summary(self, top=10) -> str:
+        lines = [f"Profile of '{self.label}': {self.seconds * 1000:.1f} ms, {self.samples} samples, "
+                 f"peak traced memory {self.peak}"]
+        if self.samples:
+            lines.append("Top functions (self samples):")
+            for name, count in self.self_time().most_common(top):
+                lines.append(f"  {count / self.samples:6.1%}  {name}")
+        if self.allocations:
+            lines.append("Top allocations:")
+            lines.extend(f"  {line}" for line in self.allocations[:5])
+        if self.paths:
+            lines.append("Saved: " + ", ".join(self.paths.values()))
+        if self.error:
+            lines.append(f"Profile not saved: {self.error}")
+        return "\n".join(lines)
+
+
+def _start_tracing() -> tuple:
+    # tracemalloc is process-wide: started by the first profile and stopped
+    # by the last, unless something else had already started it. So is its
+    # peak, which is only reset when no other profile is running.
+    global _tracing_users, _tracing_owned, _tracing_starts
+    with _tracing_lock:
+        alone = _tracing_users == 0
+        if alone:
+            _tracing_owned = not tracemalloc.is_tracing()
+            if _tracing_owned:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        _tracing_users += 1
+        _tracing_starts += 1
+        return _tracing_starts, alone
+
+
+def _stop_tracing(started) -> bool:
+    # True when another profile was running at some point during this one
+    global _tracing_users
+    number, alone = started
+    with _tracing_lock:
+        shared = not alone or _tracing_starts != number
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+    return shared
+
+
+def _top_allocations(before, after, limit=TOP_ALLOCATIONS) -> list:
+    # net allocations by source line made while the block ran
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__),
+              tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")]
+    stats = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), "lineno")
+    lines = []
+    for stat in [s for s in stats if s.size_diff > 0][:limit]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size_diff / 1024:10.1f} KiB  {stat.count_diff:+8d} blocks  "
+                     f"{os.path.basename(frame.filename)}:{frame.lineno}")
+    return lines
+
+
+def _slug(label) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_")[:40] or "command"
+
+
+def _save(report, directory, keep) -> dict:
+    os.makedirs(directory, exist_ok=True)
+    # names sort oldest first: local time plus microseconds
+    now = time.time_ns()
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now // 1_000_000_000))
+    base = f"{stamp}-{now // 1000 % 1_000_000:06d}-{_slug(report.label)}"
+    paths = {
+        "stacks": os.path.join(directory, f"{base}.collapsed"),
+        "allocations": os.path.join(directory, f"{base}.alloc.txt"),
+    }
+    with open(paths["stacks"], "w", encoding="utf-8") as f:
+        for stack, count in report.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    with open(paths["allocations"], "w", encoding="utf-8") as f:
+        f.write(f"# {report.label}: {report.seconds * 1000:.1f} ms, peak {report.peak}\n")
+        f.write("# allocations of every thread while the command ran, by source line\n")
+        f.write("\n".join(report.allocations) + "\n")
+
+    # ring: keep the newest `keep` invocations
+    runs = sorted({name.split(".", 1)[0] for name in os.listdir(directory)
+                   if name.endswith((".collapsed", ".alloc.txt"))})
+    for old in runs[:-keep] if keep > 0 else []:
+        for suffix in (".collapsed", ".alloc.txt"):
+            try:
+                os.remove(os.path.join(directory, old + suffix))
+            except OSError:
+                pass
+    return paths
+
+
+@contextmanager
+def profile(label, directory=None, keep=None):
+    # Samples the calling thread and traces allocations while the block
+    # runs; yields a ProfileReport that is filled in and saved on exit.
+    # Yields None when this thread is already being profiled.
+    if getattr(_active, "on", False):
+        yield None
+        return
+
+    _active.on = True
+    try:
+        report = ProfileReport(label)
+        started = _start_tracing()
+        try:
+            before = tracemalloc.take_snapshot()
+            sampler = Sampler(threading.get_ident())
+            sampler.start()
+        except BaseException:
+            _stop_tracing(started)
+            raise
+        t0 = time.perf_counter()
+        try:
+            yield report
+        finally:
+            _finish(report, sampler, before, t0, started, directory, keep)
+    finally:
+        # even when the report could not be built or saved; otherwise this
+        # thread could never be profiled again
+        _active.on = False
+
+
+def _finish(report, sampler, before, t0, started, directory, keep):
+    report.seconds = time.perf_counter() - t0
+    try:
+        sampler.stop()
+        report.stacks = sampler.stacks
+        report.peak_bytes = tracemalloc.get_traced_memory()[1]
+        after = tracemalloc.take_snapshot()
+    finally:
+        report.peak_shared = _stop_tracing(started)
+    report.allocations = _top_allocations(before, after)
+    try:
+        report.paths = _save(report, directory or PROFILE_DIR, PROFILE_KEEP if keep is None else keep)
+        METRICS.inc("profiles_saved_total")
+    except OSError as e:
+        report.error = str(e)
+
+
+def maybe_profile(label):
+    # profile() when SKYLARK_PROFILE=1, otherwise a no-op
+    return profile(label) if PROFILE_ALL else nullcontext()
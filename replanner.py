@@ -0,0 +1,66 @@
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import METRICS
+
+log = logging.getLogger(__name__)
+
+# Missions re-planned in parallel after a status change
+REPLAN_WORKERS = 4
+
+
+class Replanner:
+    # Reacts to StatusChanged events: every unfinished mission the pilot or
+    # drone is assigned to (BookingIndex, resource -> missions) gets its
+    # conflicts re-checked and replacements recommended on a worker pool.
+    # Proposals for missions that now have conflicts go to `notify(event,
+    # proposal)`; other missions are left alone.
+    def __init__(self, agent, notify, workers=REPLAN_WORKERS):
+        self.agent = agent
+        self.notify = notify
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="replan")
+        # origin -> events/missions still being processed, for wait()
+        self._pending = Counter()
+        self._cond = threading.Condition()
+
+    def _track(self, origin, n):
+        with self._cond:
+            self._pending[origin] += n
+            if self._pending[origin] <= 0:
+                del self._pending[origin]
+                self._cond.notify_all()
+
+    def on_event(self, event):
+        self._track(event.origin, 1)
+        self.pool.submit(self._expand, event)
+
+    def _expand(self, event):
+        # one task per affected mission; this task does not wait for them
+        try:
+            missions = self.agent.open_missions_for(event.kind, event.resource_id)
+            METRICS.inc("replan_missions_total", len(missions), kind=event.kind)
+            for mission_id in missions:
+                self._track(event.origin, 1)
+                self.pool.submit(self._replan, event, mission_id)
+        except Exception:
+            log.exception("Replanning after %r failed", event)
+        finally:
+            self._track(event.origin, -1)
+
+    def _replan(self, event, mission_id):
+        try:
+            with METRICS.timer("replan_seconds", kind=event.kind):
+                proposal = self.agent.urgent_reassignment(mission_id)
+            if isinstance(proposal, dict) and isinstance(proposal["conflicts"], list):
+                self.notify(event, proposal)
+        except Exception:
+            log.exception("Replanning %s after %r failed", mission_id, event)
+        finally:
+            self._track(event.origin, -1)
+
+    def wait(self, origin, timeout) -> bool:
+        # True once nothing triggered from `origin` is still running
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending[origin] <= 0, timeout)
@@ -0,0 +1,141 @@
+import time
+
+import pandas as pd
+
+from datasource import SHEET_KEYS
+from utils import normalize_list
+from snapshot import SheetEntry, Snapshot
+from sync import ChangeSet
+
+
+def _set_cells(df, key, cells):
+    # applies {(id, column): value} to a copy of df; categorical and
+    # "<col>_key" columns are widened to object so any value fits
+    df = df.copy()
+    ids = df[key].astype(str).str.strip()
+    applied = []
+    for (rid, col), value in cells.items():
+        mask = (ids == rid).to_numpy()
+        if col not in df.columns or not mask.any():
+            continue
+        if df[col].dtype != object:
+            df[col] = df[col].astype(object)
+        df.loc[mask, col] = value
+        if f"{col}_key" in df.columns:
+            df[f"{col}_key"] = df[f"{col}_key"].astype(object)
+            df.loc[mask, f"{col}_key"] = str(value).strip().lower()
+        applied.append(rid)
+    return df, applied
+
+
+class ScenarioSnapshot(Snapshot):
+    # A pinned snapshot with hypothetical cell changes layered on top. Only
+    # the changed sheets are copied; their indexes are carried over from the
+    # base entry through apply_changes() where supported. Nothing is written
+    # back and the shared cache is not touched.
+    def __init__(self, base: Snapshot, changes):
+        super().__init__(base.cache)
+        self.base = base
+        self.changes = {}
+        for sheet, rid, col, value in changes:
+            self.changes.setdefault(sheet, {})[(str(rid).strip(), str(col).strip())] = value
+
+    def entry(self, name) -> SheetEntry:
+        entry = self._entries.get(name)
+        if entry is not None:
+            return entry
+
+        base = self.base.entry(name)
+        if name not in self.changes or base.df.empty or SHEET_KEYS[name] not in base.df.columns:
+            self._entries[name] = base
+            return base
+
+        df, touched = _set_cells(base.df, SHEET_KEYS[name], self.changes[name])
+        entry = SheetEntry(name, df, base.version, time.monotonic(), base.issues)
+        delta = ChangeSet(name, updated=list(dict.fromkeys(touched)))
+        for key, value in list(base.derived.items()):
+            if hasattr(value, "apply_changes"):
+                entry.derived[key] = value.apply_changes(df, delta)
+
+        self._entries[name] = entry
+        return entry
+
+    def load(self, *names):
+        for name in names or ("pilots", "drones", "missions"):
+            self.entry(name)
+        return self
+
+
+def affected_missions(bookings, changes, recommending=None) -> list:
+    # reverse dependencies: missions a changed pilot/drone is assigned to or
+    # recommended for (recommending(kind, id) -> missions whose baseline
+    # recommendation picks it), plus missions changed directly (and, for a
+    # changed assignment, the other missions of the newly assigned
+    # resources); in first-seen order
+    out = {}
+    kinds = {"pilots": "pilot", "drones": "drone"}
+    columns = {col: kind for kind, col in bookings.kinds.items()}
+    for sheet, rid, col, value in changes:
+        if sheet == "missions":
+            out.setdefault(str(rid).strip(), None)
+            resources = [(columns[col], r) for r in normalize_list(value)] if col in columns else []
+        elif sheet in kinds:
+            resources = [(kinds[sheet], rid)]
+        else:
+            resources = []
+        for kind, resource in resources:
+            for mission in bookings.missions_for(kind, resource):
+                out.setdefault(str(mission).strip(), None)
+            for mission in recommending(kind, resource) if recommending else ():
+                out.setdefault(str(mission).strip(), None)
+    return list(out)
+
+
+def _conflict_list(result) -> list:
+    return list(result) if isinstance(result, list) else []
+
+
+def _picks(rec, kind) -> list:
+    if not isinstance(rec, dict):
+        return []
+    col = "pilot_id" if kind == "pilots" else "drone_id"
+    return [r[col] for r in rec.get(f"recommended_{kind}", [])]
+
+
+def diff_mission(mission_id, before, after) -> dict:
+    # before/after: (check_conflicts result, recommend_assignment result)
+    old_c, new_c = _conflict_list(before[0]), _conflict_list(after[0])
+    out = {
+        "project_id": mission_id,
+        "new_conflicts": [c for c in new_c if c not in old_c],
+        "resolved_conflicts": [c for c in old_c if c not in new_c],
+    }
+    for kind in ("pilots", "drones"):
+        old_p, new_p = _picks(before[1], kind), _picks(after[1], kind)
+        if old_p != new_p:
+            out[f"recommended_{kind}"] = {"before": old_p, "after": new_p}
+    if not isinstance(after[1], dict) and after[1] != before[1]:
+        out["recommendation"] = after[1]
+    return out
+
+
+def changed(diff) -> bool:
+    return any(v for k, v in diff.items() if k != "project_id")
+
+
+def scenario_frame(diffs) -> pd.DataFrame:
+    # one row per changed item, for display
+    rows = []
+    for d in diffs:
+        for c in d["new_conflicts"]:
+            rows.append((d["project_id"], "new conflict", c))
+        for c in d["resolved_conflicts"]:
+            rows.append((d["project_id"], "resolved", c))
+        for kind in ("pilots", "drones"):
+            if f"recommended_{kind}" in d:
+                r = d[f"recommended_{kind}"]
+                rows.append((d["project_id"], f"{kind} pick",
+                             f"{', '.join(r['before']) or '-'} -> {', '.join(r['after']) or '-'}"))
+        if "recommendation" in d:
+            rows.append((d["project_id"], "recommendation", d["recommendation"]))
+    return pd.DataFrame(rows, columns=["mission", "change", "detail"])
@@ -0,0 +1,159 @@
+import os
+import random
+import threading
+import time
+
+import requests
+
+from metrics import METRICS
+
+# Google's default Sheets quota is 60 read requests per minute per user;
+# SKYLARK_SHEETS_RATE (requests/minute) and SKYLARK_SHEETS_BURST size the bucket
+DEFAULT_RATE_PER_MINUTE = 60
+DEFAULT_BURST = 10
+
+# Retries after the first attempt, and the backoff range in seconds
+MAX_RETRIES = 5
+BASE_DELAY = 1.0
+MAX_DELAY = 32.0
+
+# HTTP codes worth retrying: quota (429) and transient server errors
+RETRY_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    # `rate` tokens per second up to `burst`; acquire() blocks until one is free
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        # takes a token and returns 0, or returns how long until one is free
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self) -> float:
+        # returns the seconds spent waiting
+        waited = 0.0
+        while True:
+            delay = self._take()
+            if not delay:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    # Concurrent calls with the same key share the first caller's result
+    # (or exception) instead of each making the request.
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            METRICS.inc("sheets_api_coalesced_total")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn(*args, **kwargs)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+
+def error_code(error):
+    # HTTP status of a gspread APIError / requests error, or None
+    code = getattr(error, "code", None)
+    if code is None:
+        code = getattr(getattr(error, "response", None), "status_code", None)
+    try:
+        return int(code)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error) -> bool:
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    return error_code(error) in RETRY_CODES
+
+
+def _retry_after(error):
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestScheduler:
+    # Every Sheets request goes through here: keyed requests are coalesced,
+    # each attempt waits for a token, and retryable failures back off with
+    # full jitter (a random delay up to base * 2^attempt, capped), honouring
+    # Retry-After when the API sends it.
+    def __init__(self, rate_per_minute=None, burst=None, retries=MAX_RETRIES,
+                 base_delay=BASE_DELAY, max_delay=MAX_DELAY, retryable=None):
+        if rate_per_minute is None:
+            rate_per_minute = float(os.getenv("SKYLARK_SHEETS_RATE", DEFAULT_RATE_PER_MINUTE))
+        if burst is None:
+            burst = int(os.getenv("SKYLARK_SHEETS_BURST", DEFAULT_BURST))
+        self.bucket = TokenBucket(rate_per_minute / 60.0, burst)
+        self.flights = SingleFlight()
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retryable = retryable or is_retryable
+
+    def call(self, key, fn, *args, **kwargs):
+        # key=None: never coalesced (writes)
+        if key is None:
+            return self._with_retries(fn, *args, **kwargs)
+        return self.flights.do(key, self._with_retries, fn, *args, **kwargs)
+
+    def _with_retries(self, fn, *args, **kwargs):
+        attempt = 0
+        while True:
+            waited = self.bucket.acquire()
+            if waited:
+                METRICS.observe("sheets_throttle_seconds", waited)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.retries or not self.retryable(e):
+                    raise
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                delay = max(delay, _retry_after(e) or 0)
+                METRICS.inc("sheets_api_retries_total", code=error_code(e) or "error")
+                time.sleep(delay)
+                attempt += 1
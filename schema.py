@@ -0,0 +1,90 @@
+import pandas as pd
+
+# Column types enforced once when a sheet is loaded. Columns missing from a
+# sheet are skipped.
+DATE_COLS = {
+    "pilots": ["available_from"],
+    "drones": ["maintenance_due"],
+    "missions": ["start_date", "end_date"],
+}
+
+NUMERIC_COLS = {
+    "pilots": ["daily_rate_inr"],
+    "drones": [],
+    "missions": ["mission_budget_inr", "required_pilots", "required_drones"],
+}
+
+# Low-cardinality text columns: stored as categoricals, plus a "<col>_key"
+# categorical holding the trimmed, lower-cased value used for matching.
+CATEGORY_COLS = {
+    "pilots": ["location", "status"],
+    "drones": ["location", "status", "weather_resistance"],
+    "missions": ["location", "weather_forecast", "priority"],
+}
+
+# Dates outside this range are typos (a year of 2206, 1926), not plans;
+# they are treated as invalid rather than stretching every date range
+MIN_DATE = pd.Timestamp("2000-01-01")
+MAX_DATE = pd.Timestamp("2099-12-31")
+
+ISSUE_COLUMNS = ["sheet", "row", "id", "column", "value", "problem"]
+
+_ID_COLS = {"pilots": "pilot_id", "drones": "drone_id", "missions": "project_id"}
+
+
+def _blank(col: pd.Series) -> pd.Series:
+    return col.isna() | (col.astype(str).str.strip().isin(["", "-"]))
+
+
+def parse_dates(col: pd.Series) -> pd.Series:
+    # ISO dates take the fast path; anything else falls back to the same
+    # flexible parsing safe_date() does, one pass per column
+    text = col.astype(str).str.strip()
+    parsed = pd.to_datetime(text, format="%Y-%m-%d", errors="coerce")
+    retry = parsed.isna() & ~_blank(col)
+    if retry.any():
+        parsed[retry] = pd.to_datetime(text[retry], format="mixed", errors="coerce")
+    parsed = parsed.dt.normalize()
+    return parsed.where((parsed >= MIN_DATE) & (parsed <= MAX_DATE))
+
+
+def _report(sheet, df, col, bad, problem):
+    ids = df[_ID_COLS[sheet]] if _ID_COLS[sheet] in df.columns else pd.Series("", index=df.index)
+    rows = []
+    for pos in bad.to_numpy().nonzero()[0]:
+        rows.append((sheet, int(pos) + 2, str(ids.iloc[pos]).strip(), col, df[col].iloc[pos], problem))
+    return rows
+
+
+def enforce_schema(sheet, df):
+    # Returns a typed copy of the sheet and a frame of invalid cells
+    # (sheet row number, id, column, raw value, problem).
+    if df.empty:
+        return df, pd.DataFrame(columns=ISSUE_COLUMNS)
+
+    raw = df
+    df = df.copy()
+    issues = []
+
+    for col in DATE_COLS.get(sheet, []):
+        if col in df.columns:
+            parsed = parse_dates(raw[col])
+            issues += _report(sheet, raw, col, parsed.isna() & ~_blank(raw[col]), "invalid date")
+            df[col] = parsed
+
+    for col in NUMERIC_COLS.get(sheet, []):
+        if col in df.columns:
+            parsed = pd.to_numeric(raw[col], errors="coerce").astype(float)
+            issues += _report(sheet, raw, col, parsed.isna() & ~_blank(raw[col]), "not a number")
+            # whole numbers stay integers (nullable), so 6000 still prints as 6000
+            if (parsed.dropna() % 1 == 0).all():
+                parsed = parsed.astype("Int64")
+            df[col] = parsed
+
+    for col in CATEGORY_COLS.get(sheet, []):
+        if col in df.columns:
+            text = raw[col].astype(str)
+            df[col] = text.astype("category")
+            df[f"{col}_key"] = text.str.strip().str.lower().astype("category")
+
+    return df, pd.DataFrame(issues, columns=ISSUE_COLUMNS)
@@ -0,0 +1,286 @@
+import json
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+from metrics import METRICS
+from schema import ISSUE_COLUMNS
+from snapshot import SHEETS, SheetEntry, Snapshot, SnapshotCache
+from snapshot_store import map_frame, write_frame, write_json
+from sync import ChangeLog, ChangeSet
+
+log = logging.getLogger(__name__)
+
+# Manifest naming the current file of every sheet; replaced atomically
+MANIFEST = "CURRENT"
+
+# Published versions kept per sheet, so workers still mapping an older file
+# (or about to open the one they just read from the manifest) find it
+KEEP_VERSIONS = 3
+
+# How often the loader looks for refresh requests, and how often a worker
+# re-checks the manifest
+POLL_SECONDS = 1.0
+
+# How long a worker waits for the loader after invalidating a sheet (or
+# before the first publish) before using what is there
+REFRESH_WAIT = 10.0
+
+
+def _touch(path):
+    with open(path, "a", encoding="utf-8"):
+        pass
+    os.utime(path)
+
+
+# ---------------- LOADER ----------------
+class SnapshotPublisher:
+    # Loader side: owns the only SnapshotCache (and so the only Sheets
+    # client reading data) and writes every new sheet version to `directory`.
+    # Workers ask for a refresh by dropping a "refresh-<sheet>" file there.
+    def __init__(self, cache: SnapshotCache, directory, keep=KEEP_VERSIONS):
+        self.cache = cache
+        self.directory = directory
+        self.keep = keep
+        # file names are unique per loader run, so a restarted loader never
+        # overwrites a file a worker still has mapped
+        self.tag = f"{os.getpid()}-{int(time.time())}"
+        self.sheets = {}
+        self._changes = {}
+        self._files = {name: [] for name in SHEETS}
+        os.makedirs(directory, exist_ok=True)
+        cache.changelog.subscribe(self._on_change)
+
+    def _on_change(self, changes: ChangeSet):
+        self._changes[changes.sheet] = changes
+
+    def path(self, name) -> str:
+        return os.path.join(self.directory, name)
+
+    def _requests(self) -> list:
+        # sheets some worker asked to refresh; each request file is consumed
+        names = []
+        for name in SHEETS:
+            try:
+                os.remove(self.path(f"refresh-{name}"))
+            except FileNotFoundError:
+                continue
+            names.append(name)
+        return names
+
+    def publish(self, *names) -> bool:
+        # refreshes the sheets (per their TTL) and publishes any new version;
+        # `names` are re-fetched right away
+        if names:
+            self.cache.invalidate(*names)
+        entries = self.cache.entries(*SHEETS)
+        refreshed_at = time.time()
+
+        dirty = False
+        for name, entry in entries.items():
+            record = self.sheets.get(name)
+            health = {"fetched_wall": entry.fetched_wall, "source": entry.source, "error": entry.error}
+            if record is not None and record["version"] == entry.version:
+                if name in names:
+                    # nothing changed, but the waiting worker needs to know
+                    record["refreshed_at"] = refreshed_at
+                    dirty = True
+                if any(record.get(k) != v for k, v in health.items()):
+                    record.update(health)
+                    dirty = True
+                continue
+
+            base = f"{name}-{self.tag}-{entry.version}"
+            with METRICS.timer("snapshot_publish_seconds", sheet=name):
+                write_frame(self.path(f"{base}.arrow"), entry.df)
+                write_frame(self.path(f"{base}.issues.arrow"), entry.issues)
+
+            changes = self._changes.get(name)
+            self.sheets[name] = {
+                "file": f"{base}.arrow",
+                "issues": f"{base}.issues.arrow",
+                "previous": record["file"] if record is not None else None,
+                "version": entry.version,
+                "rows": len(entry.df),
+                "refreshed_at": refreshed_at,
+                "changes": changes.as_dict() if changes is not None and changes.version == entry.version else None,
+                **health,
+            }
+            self._files[name].append(base)
+            dirty = True
+
+        if dirty:
+            write_json(self.path(MANIFEST), {"published_at": time.time(), "sheets": self.sheets})
+            self._prune()
+        return dirty
+
+    def _prune(self):
+        for name, bases in self._files.items():
+            while len(bases) > self.keep:
+                base = bases.pop(0)
+                for suffix in (".arrow", ".issues.arrow"):
+                    try:
+                        os.remove(self.path(base + suffix))
+                    except OSError:
+                        pass
+
+    def run(self, poll=POLL_SECONDS, stop: threading.Event = None):
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                self.publish(*self._requests())
+            except Exception:
+                # keep serving the last published version; retry next tick
+                METRICS.inc("snapshot_publish_errors_total")
+                log.exception("Snapshot publish failed")
+            stop.wait(poll)
+
+
+def run_loader(sheets_client, directory, cache_ttl=None, store=None):
+    # blocks; the loader process serves no chat
+    cache = SnapshotCache(sheets_client, ttl=cache_ttl, store=store)
+    cache.warm_start()
+    publisher = SnapshotPublisher(cache, directory)
+    log.info("Publishing snapshots to %s", directory)
+    publisher.run()
+
+
+# ---------------- WORKERS ----------------
+def _change_set(name, data):
+    if not data:
+        return ChangeSet(name, full=True)
+    return ChangeSet(name, data["inserted"], data["updated"], data["deleted"], full=data["full"])
+
+
+class SharedSnapshotCache:
+    # Worker side, a drop-in for SnapshotCache: frames come from the files
+    # the loader published rather than from the Sheets API, so API calls do
+    # not grow with the number of workers. A new version is picked up by
+    # switching to the file the manifest names; commands already running
+    # keep the entries their Snapshot pinned.
+    def __init__(self, directory, poll=POLL_SECONDS, wait=REFRESH_WAIT):
+        self.directory = directory
+        self.poll = poll
+        self.wait = wait
+        self.changelog = ChangeLog()
+
+        self._entries = {}
+        self._files = {}
+        self._version = 0
+        self._lock = threading.Lock()
+        self._map_locks = {name: threading.Lock() for name in SHEETS}
+
+        self._manifest = {"sheets": {}}
+        self._manifest_mtime = None
+        self._checked = 0.0
+        # sheet -> time this worker asked the loader to refresh it
+        self._requested = {}
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _next_version(self) -> int:
+        with self._lock:
+            self._version += 1
+            return self._version
+
+    def path(self, name) -> str:
+        return os.path.join(self.directory, name)
+
+    def _read_manifest(self, force=False) -> dict:
+        now = time.monotonic()
+        if not force and now - self._checked < self.poll:
+            return self._manifest
+        self._checked = now
+        try:
+            mtime = os.stat(self.path(MANIFEST)).st_mtime_ns
+        except FileNotFoundError:
+            return self._manifest
+        if mtime != self._manifest_mtime:
+            with open(self.path(MANIFEST), encoding="utf-8") as f:
+                self._manifest = json.load(f)
+            self._manifest_mtime = mtime
+        return self._manifest
+
+    def _record(self, name) -> dict:
+        # the manifest record for a sheet, waiting for the loader when this
+        # worker asked for a refresh (or nothing is published yet)
+        requested = self._requested.get(name)
+        record = self._read_manifest(force=requested is not None)["sheets"].get(name)
+        deadline = time.monotonic() + self.wait
+        while record is None or (requested is not None and record["refreshed_at"] < requested):
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(0.05)
+            record = self._read_manifest(force=True)["sheets"].get(name)
+
+        if record is None:
+            raise RuntimeError(f"No {name} snapshot published in {self.directory}. Is the loader running?")
+        if self._requested.get(name) == requested:
+            self._requested.pop(name, None)
+        return record
+
+    def entry(self, name) -> SheetEntry:
+        with self._map_locks[name]:
+            record = self._record(name)
+            entry = self._entries.get(name)
+            if entry is not None and self._files.get(name) == record["file"]:
+                return entry
+            return self._map(name, record, entry)
+
+    def _map(self, name, record, old) -> SheetEntry:
+        with METRICS.timer("snapshot_map_seconds", sheet=name):
+            df = map_frame(self.path(record["file"]))
+            issues = map_frame(self.path(record["issues"]))
+        if issues.empty:
+            issues = pd.DataFrame(columns=ISSUE_COLUMNS)
+
+        entry = SheetEntry(name, df, self._next_version(), time.monotonic(), issues)
+        changes = _change_set(name, record.get("changes"))
+        if old is not None and record.get("previous") == self._files.get(name) and not changes.full:
+            # the loader's delta applies to the version this worker holds
+            for key, value in list(old.derived.items()):
+                if hasattr(value, "apply_changes"):
+                    entry.derived[key] = value.apply_changes(df, changes)
+        else:
+            changes = ChangeSet(name, full=True)
+        changes.version = entry.version
+
+        self._entries[name] = entry
+        self._files[name] = record["file"]
+        self.changelog.publish(changes)
+        return entry
+
+    def entries(self, *names) -> dict:
+        # mapping a file is cheap; no need for the fetch pool
+        return {name: self.entry(name) for name in names}
+
+    def cached(self, name) -> bool:
+        # mapping the published file is cheap; no need to look elsewhere
+        return True
+
+    def invalidate(self, *names):
+        # ask the loader to re-fetch; the next read of these sheets waits
+        # (up to `wait` seconds) for it, so a worker sees its own writes
+        now = time.time()
+        for name in names or SHEETS:
+            self._requested[name] = now
+            _touch(self.path(f"refresh-{name}"))
+        self._next_version()
+
+    def degraded(self) -> dict:
+        # what the loader reports for the sheets this worker has mapped
+        sheets = self._read_manifest()["sheets"]
+        out = {}
+        for name in list(self._entries):
+            record = sheets.get(name) or {}
+            if record.get("source", "sheets") != "sheets" or record.get("error"):
+                out[name] = (record.get("fetched_wall"), record.get("source"), record.get("error"))
+        return out
+
+    def snapshot(self):
+        return Snapshot(self)
@@ -1,11 +1,37 @@
 import os
 import json
+import time
+import threading
 import gspread
+import numpy as np
 import pandas as pd
+import requests
+from gspread.utils import numericise_all, rowcol_to_a1
 from google.oauth2.service_account import Credentials
+from pandas.api.types import union_categoricals
 
+from datasource import DataSource, SHEET_KEYS
+from metrics import METRICS
+from scheduler import RequestScheduler, error_code
+from schema import ISSUE_COLUMNS, enforce_schema, parse_dates
 
-class SheetsClient:
+# Rows fetched per range request by the chunked reader
+CHUNK_ROWS = int(os.getenv("SKYLARK_SHEETS_CHUNK_ROWS", "5000"))
+
+# Missions that ended more than this many days ago are not loaded (unset: all).
+# Whole ranges of old missions are skipped when the sheet is sorted by date.
+MISSIONS_SINCE_DAYS = os.getenv("SKYLARK_MISSIONS_SINCE_DAYS")
+
+# Request kinds that are safe to share between concurrent callers
+COALESCED_OPS = ("open", "read", "layout")
+
+# How long a cached header/row layout is used before it is re-read. Every
+# write first checks the id and header cells it is about to address, so rows
+# inserted or re-sorted by hand within this time are caught before writing.
+LAYOUT_TTL = 300
+
+
+class SheetsClient(DataSource):
     def __init__(self, pilot_sheet_id: str, drone_sheet_id: str, missions_sheet_id: str):
         scopes = [
             "https://www.googleapis.com/auth/spreadsheets",
@@ -25,50 +51,330 @@ class SheetsClient:
 
         self.client = gspread.authorize(creds)
 
-        # Open 3 separate spreadsheets
-        self.pilot_spreadsheet = self.client.open_by_key(pilot_sheet_id)
-        self.drone_spreadsheet = self.client.open_by_key(drone_sheet_id)
-        self.missions_spreadsheet = self.client.open_by_key(missions_sheet_id)
+        # single-flight reads, token-bucket rate limit, backoff on 429/5xx
+        self.scheduler = RequestScheduler()
 
-    def read_pilots_df(self) -> pd.DataFrame:
-        ws = self.pilot_spreadsheet.sheet1
-        rows = ws.get_all_records()
+        # request/response sizes, attributed to the sheet named by _call()
+        self._call_local = threading.local()
+        session = getattr(getattr(self.client, "http_client", None), "session", None)
+        if session is not None:
+            session.hooks["response"].append(self._count_bytes)
+
+        # 3 separate spreadsheets, opened lazily on first use so startup does
+        # not wait on sheets a command never touches
+        self._sheet_ids = {
+            "pilots": pilot_sheet_id,
+            "drones": drone_sheet_id,
+            "missions": missions_sheet_id,
+        }
+        self._spreadsheets = {}
+        self._worksheets = {}
+        self._open_locks = {name: threading.Lock() for name in self._sheet_ids}
+
+        # sheet -> (headers, {id: sheet row number}, built_at)
+        self._layouts = {}
+        self._layout_lock = threading.Lock()
+
+    # ---------------- INSTRUMENTATION ----------------
+    def _call(self, sheet, op, fn, *args, **kwargs):
+        # one logical Sheets request: identical concurrent reads share one
+        # call, and every attempt goes through the scheduler's rate limit
+        key = (sheet, op, getattr(fn, "__name__", None), args) if op in COALESCED_OPS else None
+        return self.scheduler.call(key, self._attempt, sheet, op, fn, *args, **kwargs)
+
+    def _attempt(self, sheet, op, fn, *args, **kwargs):
+        # one Sheets API round trip: count, time and classify errors
+        labels = {"sheet": sheet, "op": op}
+        METRICS.inc("sheets_api_calls_total", **labels)
+        outer = getattr(self._call_local, "labels", None)
+        self._call_local.labels = labels
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        except gspread.exceptions.APIError as e:
+            METRICS.inc("sheets_api_errors_total", code=getattr(e, "code", "api"), **labels)
+            raise
+        except Exception:
+            METRICS.inc("sheets_api_errors_total", code="error", **labels)
+            raise
+        finally:
+            self._call_local.labels = outer
+            METRICS.observe("sheets_api_seconds", time.perf_counter() - t0, **labels)
+
+    def _count_bytes(self, response, *args, **kwargs):
+        labels = getattr(self._call_local, "labels", None) or {"sheet": "other", "op": "other"}
+        body = getattr(response.request, "body", None) or b""
+        METRICS.inc("sheets_bytes_sent_total", len(body), **labels)
+        METRICS.inc("sheets_bytes_received_total", len(response.content or b""), **labels)
+        return response
+
+    def spreadsheet(self, name):
+        ss = self._spreadsheets.get(name)
+        if ss is None:
+            if name not in self._sheet_ids:
+                raise ValueError(f"Unknown sheet: {name}")
+            with self._open_locks[name]:
+                ss = self._spreadsheets.get(name)
+                if ss is None:
+                    ss = self._call(name, "open", self.client.open_by_key, self._sheet_ids[name])
+                    self._spreadsheets[name] = ss
+        return ss
+
+    @property
+    def pilot_spreadsheet(self):
+        return self.spreadsheet("pilots")
+
+    @property
+    def drone_spreadsheet(self):
+        return self.spreadsheet("drones")
+
+    @property
+    def missions_spreadsheet(self):
+        return self.spreadsheet("missions")
+
+    def worksheet(self, name):
+        # sheet1 / worksheet() each cost a metadata request, so keep the handle
+        ws = self._worksheets.get(name)
+        if ws is None:
+            if name == "pilots":
+                ws = self._call(name, "open", lambda: self.pilot_spreadsheet.sheet1)
+            elif name == "drones":
+                ws = self._call(name, "open", self.drone_spreadsheet.worksheet, "drone_fleet")  # change here
+            elif name == "missions":
+                ws = self._call(name, "open", lambda: self.missions_spreadsheet.sheet1)
+            else:
+                raise ValueError(f"Unknown sheet: {name}")
+            self._worksheets[name] = ws
+        return ws
+
+    def _read_df(self, name) -> pd.DataFrame:
+        ws = self.worksheet(name)
+        rows = self._call(name, "read", ws.get_all_records)
         df = pd.DataFrame(rows)
+        METRICS.inc("sheets_cells_read_total", df.size, sheet=name)
         if not df.empty:
             df.columns = [c.strip() for c in df.columns]
+            # a full read gives us the row layout for free
+            self._remember_layout(name, list(df.columns), df.get(SHEET_KEYS[name], pd.Series(dtype=str)))
         return df
 
+    def read_pilots_df(self) -> pd.DataFrame:
+        return self._read_df("pilots")
+
     def read_drones_df(self) -> pd.DataFrame:
-        ws = self.drone_spreadsheet.worksheet("drone_fleet")  # change here
-        rows = ws.get_all_records()
-        df = pd.DataFrame(rows)
-        if not df.empty:
-            df.columns = [c.strip() for c in df.columns]
-        return df
+        return self._read_df("drones")
 
     def read_missions_df(self) -> pd.DataFrame:
-        ws = self.missions_spreadsheet.sheet1
-        rows = ws.get_all_records()
-        df = pd.DataFrame(rows)
-        if not df.empty:
-            df.columns = [c.strip() for c in df.columns]
-        return df
+        return self._read_df("missions")
 
-    def update_pilot_status(self, pilot_id: str, new_status: str) -> dict:
-        ws = self.pilot_spreadsheet.sheet1
-        records = ws.get_all_records()
+    # ---------------- CHUNKED READS ----------------
+    def _window(self, name):
+        # (column, earliest date) rows must reach to be loaded, or None
+        if name == "missions" and MISSIONS_SINCE_DAYS:
+            since = pd.Timestamp.today().normalize() - pd.Timedelta(days=int(MISSIONS_SINCE_DAYS))
+            return "end_date", since
+        return None
 
-        headers = ws.row_values(1)
-        headers = [h.strip() for h in headers]
+    def _columns(self, ws, name, headers, columns) -> list:
+        # whole columns (header cell included) in one request; the Values API
+        # drops trailing blanks, so each list ends at the column's last value
+        letters = [rowcol_to_a1(1, headers.index(c) + 1).rstrip("0123456789") for c in columns]
+        ranges = self._call(name, "read", ws.batch_get, tuple(f"{c}:{c}" for c in letters),
+                            major_dimension="COLUMNS")
+        return [list(r[0]) if r else [] for r in ranges]
 
-        if "pilot_id" not in headers or "status" not in headers:
-            return {"success": False, "error": "Pilot sheet must contain pilot_id and status columns"}
+    def _chunks(self, name, chunk_rows):
+        # Yields (headers, typed frame, invalid cells) per range of
+        # `chunk_rows` rows. Cells go straight into column lists (no per-row
+        # dicts), and only one chunk of raw values is held at a time. Frames
+        # are indexed by sheet row - 2.
+        ws = self.worksheet(name)
+        headers = [h.strip() for h in self._call(name, "layout", ws.row_values, 1)]
+        if not headers:
+            return
+        last_col = rowcol_to_a1(1, len(headers)).rstrip("0123456789")
+
+        # the id column ends at the last data row; with a date window its
+        # column comes in the same request and says which rows can be skipped
+        window = self._window(name)
+        wanted = [c for c in (SHEET_KEYS[name], window and window[0]) if c in headers]
+        values = dict(zip(wanted, self._columns(ws, name, headers, wanted))) if wanted else {}
+        last_row = max((len(v) for v in values.values()), default=ws.row_count)
+        keep = None
+        if window and window[0] in values:
+            dates = parse_dates(pd.Series(values.pop(window[0])[1:], dtype=object))
+            keep = (dates.isna() | (dates >= window[1])).to_numpy()
+        del values
+
+        # the Values API drops trailing blank rows from every range, so an
+        # empty range before the last data row is a gap; past it (rows with
+        # a blank id) the first empty range ends the sheet
+        start = 2
+        while True:
+            end = start + chunk_rows - 1
+            # rows past the date column's last value have a blank date and
+            # are kept, so only ranges it covers can be skipped
+            if keep is not None and end - 1 <= len(keep) and not keep[start - 2:end - 1].any():
+                # every row of this range ended before the window
+                METRICS.inc("sheets_chunks_skipped_total", sheet=name)
+                start = end + 1
+                continue
+
+            rows = self._call(name, "read", ws.get, f"A{start}:{last_col}{end}")
+            if not rows:
+                if start > last_row:
+                    return
+                start = end + 1
+                continue
+            METRICS.inc("sheets_cells_read_total", len(rows) * len(headers), sheet=name)
+
+            columns = {
+                h: numericise_all([row[i] if i < len(row) else "" for row in rows], default_blank="")
+                for i, h in enumerate(headers)
+            }
+            df = pd.DataFrame(columns, index=pd.RangeIndex(start - 2, start - 2 + len(rows)))
+            df, issues = enforce_schema(name, df)
+            issues["row"] += start - 2
+
+            if window and window[0] in df.columns:
+                dates = df[window[0]]
+                df = df[dates.isna() | (dates >= window[1])]
+            yield headers, df, issues
+            start = end + 1
+
+    def iter_chunks(self, name, chunk_rows=CHUNK_ROWS):
+        # Yields (typed frame, invalid cells) per range as it is fetched, so a
+        # caller can use the first rows while the rest downloads. Frames are
+        # indexed by sheet row - 2.
+        for _, df, issues in self._chunks(name, chunk_rows):
+            yield df, issues
+
+    def read_typed_df(self, name):
+        # (typed frame, invalid cells) for the sheet. Each chunk is split into
+        # its own column arrays as it arrives and dropped; at the end every
+        # column is merged and its pieces released before the next, so the
+        # read holds about the final frame plus one chunk, never two copies.
+        # The cache only swaps in the whole frame: commands answered from the
+        # first rows alone (conflicts, free resources) would be wrong, and
+        # warm_start() already serves the saved copy while this runs.
+        headers, parts, rows, issues = None, {}, [], []
+        for headers, chunk, chunk_issues in self._chunks(name, CHUNK_ROWS):
+            rows.append(chunk.index.to_numpy() + 2)
+            for col in chunk.columns:
+                parts.setdefault(col, []).append(chunk[col].array.copy())
+            if not chunk_issues.empty:
+                issues.append(chunk_issues)
+            del chunk
+        if headers is None:
+            return pd.DataFrame(), pd.DataFrame(columns=ISSUE_COLUMNS)
+
+        columns = {}
+        for col in list(parts):
+            pieces = parts.pop(col)
+            if isinstance(pieces[0], pd.Categorical):
+                # chunks have their own categories
+                columns[col] = pd.Series(union_categoricals(pieces), copy=False)
+            else:
+                columns[col] = pd.concat([pd.Series(p, copy=False) for p in pieces], ignore_index=True)
+            del pieces
+        # copy=False: no consolidation pass copying the merged columns again
+        df = pd.DataFrame(columns, copy=False)
+        issues = pd.concat(issues, ignore_index=True) if issues else pd.DataFrame(columns=ISSUE_COLUMNS)
+
+        if SHEET_KEYS[name] in df.columns:
+            # row numbers as read, also for rows the date window dropped
+            self._remember_layout(name, headers, df[SHEET_KEYS[name]], rows=np.concatenate(rows))
+        return df, issues
+
+    # ---------------- WRITE-BACK ----------------
+    def _remember_layout(self, name, headers, ids, rows=None):
+        # data rows start at sheet row 2 unless their row numbers are given
+        numbers = rows if rows is not None else range(2, len(ids) + 2)
+        rows = {}
+        for i, rid in zip(numbers, ids):
+            rows.setdefault(str(rid).strip(), int(i))
+        with self._layout_lock:
+            self._layouts[name] = (headers, rows, time.monotonic())
 
-        status_col = headers.index("status") + 1
+    def _layout(self, name, refresh=False):
+        layout = self._layouts.get(name)
+        if layout and not refresh and time.monotonic() - layout[2] < LAYOUT_TTL:
+            return layout
 
-        for i, row in enumerate(records, start=2):
-            if str(row.get("pilot_id", "")).strip() == str(pilot_id).strip():
-                ws.update_cell(i, status_col, new_status)
-                return {"success": True, "pilot_id": pilot_id, "new_status": new_status}
+        # header row + id column only, instead of the whole sheet
+        ws = self.worksheet(name)
+        headers = [h.strip() for h in self._call(name, "layout", ws.row_values, 1)]
+        key = SHEET_KEYS[name]
+        ids = self._call(name, "layout", ws.col_values, headers.index(key) + 1)[1:] if key in headers else []
+        self._remember_layout(name, headers, ids)
+        return self._layouts[name]
+
+    def update_cells(self, name: str, changes) -> dict:
+        try:
+            return self._update_cells(name, changes)
+        except (gspread.exceptions.APIError, requests.RequestException) as e:
+            # still failing after the scheduler's retries
+            return {"success": False, "error": f"Sheets API error ({error_code(e) or 'network'}): {e}"}
+
+    def _layout_matches(self, name, headers, rows, changes) -> bool:
+        # one batch_get of the id cell of every target row and the header of
+        # every target column: True when they still hold what the layout says
+        key = SHEET_KEYS[name]
+        cells = {}
+        for rid, field, _ in changes:
+            if rid in rows and key in headers:
+                cells[rowcol_to_a1(rows[rid], headers.index(key) + 1)] = rid
+            if field in headers:
+                cells[rowcol_to_a1(1, headers.index(field) + 1)] = field
+        if not cells:
+            return True
+
+        ws = self.worksheet(name)
+        found = self._call(name, "layout", ws.batch_get, tuple(cells))
+        for expected, values in zip(cells.values(), found):
+            value = values[0][0] if values and values[0] else ""
+            if str(value).strip() != expected:
+                return False
+        return True
+
+    def _update_cells(self, name, changes) -> dict:
+        # changes: iterable of (row id, column, value); all cells go out in
+        # a single batch_update call
+        changes = [(str(rid).strip(), str(field).strip(), value) for rid, field, value in changes]
+        key = SHEET_KEYS[name]
+
+        cached = self._layouts.get(name)
+        layout = self._layout(name)
+        headers, rows, _ = layout
+        if any(rid not in rows for rid, _, _ in changes) or (
+                layout is cached and not self._layout_matches(name, headers, rows, changes)):
+            # unknown id, or rows/columns moved since the cached layout was read
+            METRICS.inc("sheets_layout_refreshes_total", sheet=name)
+            headers, rows, _ = self._layout(name, refresh=True)
+
+        if key not in headers:
+            return {"success": False, "error": f"{name} sheet must contain a {key} column"}
+
+        cells, updated, errors = [], [], []
+        for rid, field, value in changes:
+            if field not in headers:
+                errors.append(f"Unknown column: {field}")
+            elif rid not in rows:
+                errors.append(f"Not found: {rid}")
+            else:
+                cells.append({"range": rowcol_to_a1(rows[rid], headers.index(field) + 1), "values": [[value]]})
+                updated.append({key: rid, field: value})
+
+        if cells:
+            ws = self.worksheet(name)
+            self._call(name, "write", ws.batch_update, cells, value_input_option="USER_ENTERED")
+            METRICS.inc("sheets_cells_written_total", len(cells), sheet=name)
+
+        return {"success": bool(updated) and not errors, "updated": updated, "errors": errors}
+
+    def update_pilot_status(self, pilot_id: str, new_status: str) -> dict:
+        headers, _, _ = self._layout("pilots")
+        if "pilot_id" not in headers or "status" not in headers:
+            return {"success": False, "error": "Pilot sheet must contain pilot_id and status columns"}
 
-        return {"success": False, "error": f"Pilot not found: {pilot_id}"}
\ No newline at end of file
+        return super().update_pilot_status(pilot_id, new_status)
\ No newline at end of file
@@ -0,0 +1,345 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from metrics import METRICS
+from schema import ISSUE_COLUMNS, enforce_schema
+from sync import ChangeLog, ChangeSet, diff_frames
+
+log = logging.getLogger(__name__)
+
+SHEETS = ("pilots", "drones", "missions")
+
+# Upper bound on concurrent sheet downloads (shared by all commands)
+FETCH_WORKERS = 4
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _fetch_pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="sheet-fetch")
+    return _executor
+
+
+_saver = None
+
+
+def _save_pool() -> ThreadPoolExecutor:
+    global _saver
+    if _saver is None:
+        with _executor_lock:
+            if _saver is None:
+                _saver = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot-save")
+    return _saver
+
+# Seconds a fetched sheet stays fresh. None means "keep until invalidated".
+DEFAULT_TTL = {
+    "pilots": 30,
+    "drones": 60,
+    "missions": 60,
+}
+
+# After a failed fetch the old data is kept and the sheet is retried after
+# this many seconds instead of on every command
+RETRY_SECONDS = 15
+
+
+class SheetEntry:
+    def __init__(self, name, df, version, fetched_at, issues=None):
+        self.name = name
+        self.df = df
+        self.version = version
+        self.fetched_at = fetched_at
+        self.stale = False
+        # wall-clock time the data was fetched from the source; "disk" when
+        # it was restored from a SnapshotStore, and the last fetch error when
+        # a refresh failed and this copy is being served instead
+        self.fetched_wall = time.time()
+        self.source = "sheets"
+        self.error = None
+        # invalid cells found by enforce_schema()
+        self.issues = issues if issues is not None else pd.DataFrame(columns=ISSUE_COLUMNS)
+        # per-version derived structures (indexes etc.), built on demand
+        self.derived = {}
+        self._derived_lock = threading.Lock()
+
+    def derive(self, key, builder):
+        value = self.derived.get(key)
+        if value is not None:
+            return value
+        with self._derived_lock:
+            value = self.derived.get(key)
+            if value is None:
+                value = builder(self.df)
+                self.derived[key] = value
+        return value
+
+
+class SnapshotCache:
+    # With sync=True a refresh diffs the fetched rows against the cached
+    # frame: an unchanged sheet keeps its version and derived indexes, and a
+    # changed one updates indexes that support apply_changes() from the
+    # delta instead of rebuilding them. Every applied delta is published on
+    # `changelog`.
+    # With typed=True each fetched sheet goes through enforce_schema() once,
+    # so cached frames hold parsed dates, numeric rates and categoricals.
+    # With a `store` (SnapshotStore) every fetched version is saved to disk,
+    # warm_start() serves that copy while fresh data downloads, and a failed
+    # fetch falls back to the last good copy instead of failing the command.
+    def __init__(self, sheets_client, ttl=None, sync=True, typed=True, store=None):
+        self.sheets = sheets_client
+        self.ttl = dict(DEFAULT_TTL)
+        if ttl:
+            self.ttl.update(ttl)
+        self.sync = sync
+        self.typed = typed
+        self.store = store
+        self.changelog = ChangeLog()
+
+        self._entries = {}
+        self._version = 0
+        self._lock = threading.Lock()
+        self._fetch_locks = {name: threading.Lock() for name in SHEETS}
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _read(self, name):
+        return getattr(self.sheets, f"read_{name}_df")()
+
+    def _is_fresh(self, entry) -> bool:
+        if entry.stale:
+            return False
+        ttl = self.ttl.get(entry.name)
+        if ttl is None:
+            return True
+        return time.monotonic() - entry.fetched_at < ttl
+
+    def _next_version(self) -> int:
+        with self._lock:
+            self._version += 1
+            return self._version
+
+    def entry(self, name) -> SheetEntry:
+        entry = self._entries.get(name)
+        if entry is not None and self._is_fresh(entry):
+            return entry
+
+        # one fetch per sheet at a time; concurrent callers wait and reuse it
+        with self._fetch_locks[name]:
+            entry = self._entries.get(name)
+            if entry is not None and self._is_fresh(entry):
+                return entry
+
+            return self._refresh(name, entry)
+
+    def _refresh(self, name, old) -> SheetEntry:
+        # sources with read_typed_df() type the sheet chunk by chunk as it
+        # downloads; otherwise the whole frame is typed after the fetch
+        chunked = self.typed and hasattr(self.sheets, "read_typed_df")
+        try:
+            with METRICS.timer("sheet_fetch_seconds", sheet=name):
+                if chunked:
+                    df, issues = self.sheets.read_typed_df(name)
+                else:
+                    df = self._read(name)
+        except Exception as e:
+            return self._fallback(name, old, e)
+        if not chunked:
+            issues = None
+            if self.typed:
+                with METRICS.timer("sheet_schema_seconds", sheet=name):
+                    df, issues = enforce_schema(name, df)
+
+        if self.sync and old is not None:
+            changes = diff_frames(name, old.df, df)
+            if changes.empty:
+                old.fetched_at = time.monotonic()
+                old.fetched_wall = time.time()
+                old.source = "sheets"
+                old.error = None
+                old.stale = False
+                self._save(old, changed=False)
+                return old
+        else:
+            changes = ChangeSet(name, full=True)
+
+        entry = SheetEntry(name, df, self._next_version(), time.monotonic(), issues)
+        changes.version = entry.version
+
+        if not changes.full:
+            for key, value in list(old.derived.items()):
+                if hasattr(value, "apply_changes"):
+                    entry.derived[key] = value.apply_changes(df, changes)
+
+        self._entries[name] = entry
+        self.changelog.publish(changes)
+        self._save(entry)
+        return entry
+
+    # ---------------- PERSISTENCE ----------------
+    def _fallback(self, name, old, error) -> SheetEntry:
+        # keep answering from the cached (or saved) copy and retry later
+        METRICS.inc("sheet_fetch_fallbacks_total", sheet=name)
+        if old is None:
+            old = self._restore(name)
+            if old is None:
+                raise error
+        ttl = self.ttl.get(name)
+        old.fetched_at = time.monotonic() - max(0, (ttl or 0) - RETRY_SECONDS)
+        old.stale = False
+        old.error = f"{type(error).__name__}: {error}"
+        return old
+
+    def _save(self, entry, changed=True):
+        if self.store is None:
+            return
+
+        def save():
+            try:
+                with METRICS.timer("snapshot_save_seconds", sheet=entry.name):
+                    if changed:
+                        self.store.save(entry.name, entry.df, entry.issues, entry.fetched_wall, self.typed)
+                    else:
+                        self.store.touch(entry.name, entry.fetched_wall)
+            except Exception:
+                METRICS.inc("snapshot_save_errors_total", sheet=entry.name)
+                log.exception("Saving %s snapshot failed", entry.name)
+
+        # off the command path; one writer so saves land in order
+        _save_pool().submit(save)
+
+    def _restore(self, name):
+        if self.store is None:
+            return None
+        saved = self.store.load(name, typed=self.typed)
+        if saved is None:
+            return None
+        df, issues, fetched_wall = saved
+        entry = SheetEntry(name, df, self._next_version(), time.monotonic(), issues)
+        entry.fetched_wall = fetched_wall
+        entry.source = "disk"
+        self._entries[name] = entry
+        return entry
+
+    def warm_start(self) -> list:
+        # serve the saved copy of every sheet right away and fetch fresh
+        # data in the background; returns the sheets restored from disk
+        restored = [name for name in SHEETS if name not in self._entries and self._restore(name) is not None]
+        for name in restored:
+            _fetch_pool().submit(self._background_refresh, name)
+        return restored
+
+    def _background_refresh(self, name):
+        with self._fetch_locks[name]:
+            try:
+                self._refresh(name, self._entries.get(name))
+            except Exception:
+                log.exception("Background refresh of %s failed", name)
+
+    def degraded(self) -> dict:
+        # sheets not currently backed by a successful fetch:
+        # name -> (fetched_wall, source, error)
+        return {
+            name: (e.fetched_wall, e.source, e.error)
+            for name, e in list(self._entries.items())
+            if e.source != "sheets" or e.error is not None
+        }
+
+    def entries(self, *names) -> dict:
+        # fetch several sheets in parallel; wall time ~ the slowest sheet
+        missing = [n for n in names if not (n in self._entries and self._is_fresh(self._entries[n]))]
+        if len(missing) <= 1:
+            return {name: self.entry(name) for name in names}
+
+        futures = {name: _fetch_pool().submit(self.entry, name) for name in missing}
+        return {name: futures[name].result() if name in futures else self.entry(name) for name in names}
+
+    def cached(self, name) -> bool:
+        # a fresh copy is held, so reading the sheet costs nothing
+        entry = self._entries.get(name)
+        return entry is not None and self._is_fresh(entry)
+
+    def invalidate(self, *names):
+        for name in names or SHEETS:
+            entry = self._entries.get(name)
+            if entry is None:
+                continue
+            if self.sync:
+                # keep the frame around so the next fetch can be diffed
+                entry.stale = True
+            else:
+                self._entries.pop(name, None)
+        self._next_version()
+
+    def snapshot(self):
+        return Snapshot(self)
+
+
+# A consistent view of the sheets for one command. Sheets are fetched lazily
+# on first access and then pinned, so every method running under the same
+# snapshot sees the same data.
+class Snapshot:
+    def __init__(self, cache):
+        self.cache = cache
+        self._entries = {}
+        # time spent pinning sheets (fetches included), for stage metrics
+        self.load_seconds = 0.0
+
+    def entry(self, name) -> SheetEntry:
+        entry = self._entries.get(name)
+        if entry is None:
+            t0 = time.perf_counter()
+            entry = self.cache.entry(name)
+            self._entries[name] = entry
+            self.load_seconds += time.perf_counter() - t0
+        return entry
+
+    def load(self, *names):
+        # pin several sheets at once, fetching the missing ones concurrently
+        missing = [n for n in (names or SHEETS) if n not in self._entries]
+        if missing:
+            t0 = time.perf_counter()
+            self._entries.update(self.cache.entries(*missing))
+            self.load_seconds += time.perf_counter() - t0
+        return self
+
+    def pinned(self, name) -> bool:
+        return name in self._entries
+
+    def frame(self, name):
+        return self.entry(name).df
+
+    def derive(self, name, key, builder):
+        return self.entry(name).derive(key, builder)
+
+    @property
+    def pilots(self):
+        return self.frame("pilots")
+
+    @property
+    def drones(self):
+        return self.frame("drones")
+
+    @property
+    def missions(self):
+        return self.frame("missions")
+
+    def issues(self):
+        frames = [e.issues for e in self._entries.values() if not e.issues.empty]
+        if not frames:
+            return pd.DataFrame(columns=ISSUE_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    @property
+    def versions(self) -> dict:
+        return {name: e.version for name, e in self._entries.items()}
@@ -0,0 +1,109 @@
+import json
+import os
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+from schema import ISSUE_COLUMNS
+
+
+# ---------------- ARROW FILES ----------------
+def _arrow_table(df) -> pa.Table:
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # object columns mixing numbers and text (raw sheet cells) go as text
+        df = df.copy()
+        for col in df.columns:
+            if df[col].dtype == object:
+                df[col] = df[col].astype("string")
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def write_frame(path, df):
+    # uncompressed Arrow IPC file, so readers can map it instead of reading it
+    table = _arrow_table(df)
+    tmp = path + ".tmp"
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def map_frame(path) -> pd.DataFrame:
+    # Arrow-backed and null-free numeric columns keep pointing into the
+    # mapping, so every process shares the same pages of the file
+    source = pa.memory_map(path, "r")
+    table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def write_json(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# ---------------- LAST GOOD SNAPSHOT ----------------
+class SnapshotStore:
+    # Last successfully fetched copy of each sheet on local disk, so a
+    # restart can answer before the sheets are downloaded and an API outage
+    # can fall back to it. Per sheet: <sheet>-<n>.arrow (+ .issues.arrow)
+    # and <sheet>.json naming the current file and when it was fetched; the
+    # json is replaced last, so a crash mid-save leaves the previous copy.
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, name) -> str:
+        return os.path.join(self.directory, name)
+
+    def save(self, name, df, issues, fetched_at, typed=True):
+        old = read_json(self.path(f"{name}.json"))
+        base = f"{name}-{time.time_ns()}"
+        write_frame(self.path(f"{base}.arrow"), df)
+        write_frame(self.path(f"{base}.issues.arrow"), issues)
+        write_json(self.path(f"{name}.json"), {
+            "file": f"{base}.arrow",
+            "issues": f"{base}.issues.arrow",
+            "fetched_at": fetched_at,
+            "rows": len(df),
+            "typed": typed,
+        })
+        if old and old.get("file") != f"{base}.arrow":
+            for key in ("file", "issues"):
+                try:
+                    os.remove(self.path(old[key]))
+                except (KeyError, OSError):
+                    pass
+
+    def touch(self, name, fetched_at):
+        # the sheet was re-fetched unchanged; only the timestamp moves
+        meta = read_json(self.path(f"{name}.json"))
+        if meta is not None:
+            meta["fetched_at"] = fetched_at
+            write_json(self.path(f"{name}.json"), meta)
+
+    def load(self, name, typed=True):
+        # (df, issues, fetched_at) or None when there is no usable copy
+        meta = read_json(self.path(f"{name}.json"))
+        if not meta or meta.get("typed", True) != typed:
+            return None
+        try:
+            df = map_frame(self.path(meta["file"]))
+            issues = map_frame(self.path(meta["issues"]))
+        except (KeyError, OSError, pa.ArrowInvalid):
+            return None
+        if issues.empty:
+            issues = pd.DataFrame(columns=ISSUE_COLUMNS)
+        return df, issues, meta["fetched_at"]
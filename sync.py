@@ -0,0 +1,84 @@
+import time
+
+import pandas as pd
+
+from datasource import SHEET_KEYS
+from events import EventBus
+
+
+class ChangeSet:
+    # Row-level delta between two fetches of one sheet, keyed by its id
+    # column. full=True means the rows could not be matched (first load,
+    # changed headers, duplicate ids) and everything should be rebuilt.
+    def __init__(self, sheet, inserted=(), updated=(), deleted=(), full=False, version=None):
+        self.sheet = sheet
+        self.inserted = list(inserted)
+        self.updated = list(updated)
+        self.deleted = list(deleted)
+        self.full = full
+        self.version = version
+        self.at = time.time()
+
+    @property
+    def empty(self) -> bool:
+        return not self.full and not (self.inserted or self.updated or self.deleted)
+
+    @property
+    def touched(self) -> set:
+        return set(self.inserted) | set(self.updated) | set(self.deleted)
+
+    def as_dict(self) -> dict:
+        return {
+            "sheet": self.sheet,
+            "version": self.version,
+            "full": self.full,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "deleted": self.deleted,
+        }
+
+    def __repr__(self):
+        if self.full:
+            return f"ChangeSet({self.sheet}, full)"
+        return (f"ChangeSet({self.sheet}, +{len(self.inserted)} ~{len(self.updated)} "
+                f"-{len(self.deleted)})")
+
+
+def row_hashes(df, key) -> pd.Series:
+    # one 64-bit hash per row, indexed by the stripped id
+    ids = df[key].astype(str).str.strip()
+    hashes = pd.util.hash_pandas_object(df.astype(str), index=False)
+    return pd.Series(hashes.to_numpy(), index=ids.to_numpy())
+
+
+def diff_frames(sheet, old, new) -> ChangeSet:
+    key = SHEET_KEYS[sheet]
+    if (
+        old is None
+        or key not in new.columns
+        or key not in old.columns
+        or list(old.columns) != list(new.columns)
+    ):
+        return ChangeSet(sheet, full=True)
+
+    old_h = row_hashes(old, key)
+    new_h = row_hashes(new, key)
+    if old_h.index.has_duplicates or new_h.index.has_duplicates:
+        return ChangeSet(sheet, full=True)
+
+    common = new_h.index.intersection(old_h.index)
+    changed = new_h.loc[common].to_numpy() != old_h.loc[common].to_numpy()
+
+    return ChangeSet(
+        sheet,
+        inserted=new_h.index.difference(old_h.index, sort=False).tolist(),
+        updated=common[changed].tolist(),
+        deleted=old_h.index.difference(new_h.index, sort=False).tolist(),
+    )
+
+
+class ChangeLog(EventBus):
+    # Applied ChangeSets, published to downstream caches right after a
+    # change is applied
+    def since(self, version) -> list:
+        return [c for c in list(self.entries) if c.version is not None and c.version > version]
@@ -0,0 +1,83 @@
+import random
+from datetime import date, timedelta
+
+import pandas as pd
+
+from availability import WINDOW_FUTURE_DAYS, WINDOW_PAST_DAYS, AvailabilityCalendar
+from indexes import BookingIndex
+
+TODAY = date(2026, 3, 1)
+
+
+def _missions():
+    rows = [
+        ("M1", "2026-02-20", "2026-03-05", "P1, P2", "D1"),
+        ("M2", "2026-03-04", "2026-03-10", "P2", "D2"),
+        ("M3", "2025-01-01", "2025-01-31", "P1", "D1"),    # before the window
+        ("M4", "2026-04-01", "2206-04-01", "P3", "D3"),    # mistyped year
+        ("M5", "2027-06-01", "2027-06-10", "P1", ""),      # after the window
+        ("M6", "", "2026-03-03", "P3", "D2"),              # no start date
+    ]
+    return pd.DataFrame(rows, columns=["project_id", "start_date", "end_date", "assigned_pilots", "assigned_drones"])
+
+
+def _ranges():
+    rng = random.Random(7)
+    fixed = [
+        (date(2026, 3, 1), date(2026, 3, 3)),
+        (date(2025, 1, 10), date(2025, 1, 12)),     # outside, in the past
+        (date(2100, 1, 1), date(2100, 1, 5)),       # outside, far future
+        (date(2025, 11, 1), date(2026, 3, 2)),      # straddles the start
+        (date(2027, 1, 1), date(2027, 12, 31)),     # straddles the end
+    ]
+    random_ranges = []
+    for _ in range(200):
+        start = date(2024, 6, 1) + timedelta(days=rng.randrange(1400))
+        random_ranges.append((start, start + timedelta(days=rng.randrange(60))))
+    return fixed + random_ranges
+
+
+def _days(bookings, kind, rid, start, end):
+    # days of [start, end] with a booking, counted the slow way
+    booked = set()
+    for s, e, *_ in bookings.by_resource[kind].get(rid, ([], [], []))[2]:
+        day = max(s, start)
+        while day <= min(e, end):
+            booked.add(day)
+            day += timedelta(days=1)
+    return len(booked)
+
+
+def test_window_does_not_follow_the_data():
+    calendar = AvailabilityCalendar(BookingIndex(_missions()), today=TODAY)
+    assert calendar.days <= WINDOW_PAST_DAYS + WINDOW_FUTURE_DAYS + 1
+    assert calendar.first == TODAY - timedelta(days=WINDOW_PAST_DAYS)
+    assert calendar.last == TODAY + timedelta(days=WINDOW_FUTURE_DAYS)
+
+
+def test_calendar_matches_bookings_inside_and_outside_the_window():
+    bookings = BookingIndex(_missions())
+    calendar = AvailabilityCalendar(bookings, today=TODAY)
+    for start, end in _ranges():
+        for kind, ids in (("pilot", ["p1", "p2", "p3", "p9"]), ("drone", ["d1", "d2", "d3"])):
+            expected = {rid for rid in ids if bookings.booked(kind, rid, start, end)}
+            assert calendar.busy(kind, start, end) & set(ids) == expected
+            for rid in ids:
+                assert calendar.busy_days(kind, rid, start, end) == _days(bookings, kind, rid, start, end)
+                assert calendar.is_free(kind, rid, start, end) == (rid not in expected)
+
+
+def test_exclude_ignores_one_mission():
+    bookings = BookingIndex(_missions())
+    calendar = AvailabilityCalendar(bookings, today=TODAY)
+    start, end = date(2026, 3, 4), date(2026, 3, 5)
+    assert calendar.busy("pilot", start, end) == {"p1", "p2"}
+    assert calendar.busy("pilot", start, end, exclude="M1") == {"p2"}
+    assert calendar.is_free("pilot", "p1", start, end, exclude="M1")
+    assert not calendar.is_free("pilot", "p2", start, end, exclude="M1")
+
+
+def test_empty_calendar():
+    calendar = AvailabilityCalendar(BookingIndex(_missions().iloc[:0]), today=TODAY)
+    assert calendar.busy("pilot", date(2026, 3, 1), date(2026, 3, 5)) == set()
+    assert calendar.is_free("drone", "d1", date(2026, 3, 1), date(2026, 3, 5))
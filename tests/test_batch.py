@@ -0,0 +1,57 @@
+from bench import generate_dataset
+from datasource import InMemoryDataSource
+from ops_agent import OpsAgent
+
+DATA = generate_dataset(40, seed=8)
+P1, P2 = DATA["pilots"]["pilot_id"].iloc[[0, 1]]
+
+
+class RecordingSource(InMemoryDataSource):
+    def __init__(self, **frames):
+        super().__init__(**frames)
+        self.writes = []
+
+    def update_cells(self, name, changes):
+        changes = list(changes)
+        self.writes.append((name, changes))
+        return super().update_cells(name, changes)
+
+
+def _status(agent, pilot_id):
+    pilots = agent.snapshot().pilots
+    return pilots.loc[pilots["pilot_id"] == pilot_id, "status"].item()
+
+
+def test_batch_queues_writes_and_sends_one_call_per_sheet():
+    source = RecordingSource(**DATA)
+    agent = OpsAgent(source)
+    with agent.batch() as writes:
+        before = _status(agent, P1)
+        assert agent.update_pilot_status(P1, "Unavailable") == {"success": True, "queued": 1}
+        agent.update_pilot_status(P2, "On Leave")
+        agent.update_pilot_status(P1, "On Leave")         # replaces the first update of P1
+        agent.update_cells("drones", [(DATA["drones"]["drone_id"].iloc[0], "status", "Maintenance")])
+        # nothing is written until the block exits; reads see the batch's snapshot
+        assert source.writes == [] and _status(agent, P1) == before
+        assert writes.count() == 3
+
+    # cells go out in the order of their last update
+    assert source.writes == [("pilots", [(P2, "status", "On Leave"), (P1, "status", "On Leave")]),
+                             ("drones", [(DATA["drones"]["drone_id"].iloc[0], "status", "Maintenance")])]
+    assert writes.results["pilots"]["success"] and writes.results["drones"]["success"]
+    assert _status(agent, P1) == "On Leave"
+
+
+def test_batch_commands_share_one_snapshot():
+    source = RecordingSource(**DATA)
+    agent = OpsAgent(source)
+    with agent.batch():
+        pinned = agent.snapshot()
+        first = _status(agent, P1)
+        # written behind the agent's back, and the cache told so
+        source.update_pilot_status(P1, "Unavailable" if first != "Unavailable" else "Available")
+        agent.cache.invalidate("pilots")
+        with agent.batch():                                # nested: same batch
+            assert agent.snapshot() is pinned
+            assert _status(agent, P1) == first
+    assert _status(agent, P1) != first
@@ -0,0 +1,63 @@
+import pandas as pd
+
+from bench import generate_dataset
+from conflicts import detect_conflicts_all, detect_conflicts_for_mission
+from utils import overlaps, safe_date
+
+PILOTS = pd.DataFrame([
+    dict(pilot_id="P1", skills="Mapping", certifications="DGCA", location="Mumbai", status="Available", daily_rate_inr=2000),
+    dict(pilot_id="P2", skills="Survey", certifications="", location="Thane", status="On Leave", daily_rate_inr=1000),
+])
+DRONES = pd.DataFrame([
+    dict(drone_id="D1", capabilities="RGB", location="Pune", status="Maintenance", weather_resistance="None"),
+])
+MISSIONS = pd.DataFrame([
+    dict(project_id="A", location="Mumbai", required_skills="Mapping", required_certs="DGCA", start_date="2026-03-01",
+         end_date="2026-03-05", assigned_pilots="P1", assigned_drones="D1", weather_forecast="Rainy",
+         mission_budget_inr=5000),
+    dict(project_id="B", location="Mumbai", required_skills="Mapping", required_certs="DGCA", start_date="2026-03-04",
+         end_date="2026-03-06", assigned_pilots="P1, P2, P9", assigned_drones="", weather_forecast="Clear",
+         mission_budget_inr=""),
+    dict(project_id="C", location="Mumbai", required_skills="", required_certs="", start_date="2026-04-01",
+         end_date="2026-04-02", assigned_pilots="", assigned_drones="", weather_forecast="Clear",
+         mission_budget_inr=""),
+])
+
+
+def test_scan_finds_each_conflict_type():
+    table = detect_conflicts_all(PILOTS, DRONES, MISSIONS)
+    # resources as listed in the assignment columns, lower-cased
+    found = set(zip(table["mission"], table["resource"].str.upper(), table["conflict_type"]))
+    assert found == {
+        ("A", "P1", "double_booking"), ("A", "D1", "maintenance"), ("A", "D1", "location"),
+        ("A", "D1", "weather"), ("A", "", "budget"),
+        ("B", "P1", "double_booking"), ("B", "P2", "status"), ("B", "P2", "skills"), ("B", "P2", "certs"),
+        ("B", "P9", "not_found"),
+    }
+    # Thane is within NEARBY_KM of Mumbai, Pune is not
+    assert "~" in table.loc[(table["resource"] == "d1") & (table["conflict_type"] == "location"), "detail"].item()
+
+
+def test_window_limits_the_scan():
+    start, end = safe_date("2026-03-06"), safe_date("2026-04-30")
+    table = detect_conflicts_all(PILOTS, DRONES, MISSIONS, start=start, end=end)
+    assert set(table["mission"]) == {"B"}
+    assert detect_conflicts_all(PILOTS, DRONES, MISSIONS, start=safe_date("2026-05-01")).empty
+
+
+def test_scan_agrees_with_single_mission_checks():
+    data = generate_dataset(200, 100, 150, seed=2)
+    pilots, drones, missions = data["pilots"], data["drones"], data["missions"]
+    start, end = safe_date("2026-03-10"), safe_date("2026-03-20")
+    table = detect_conflicts_all(pilots, drones, missions, start=start, end=end)
+
+    checked = set()
+    for m in missions.to_dict(orient="records"):
+        key = str(m["project_id"]).strip()
+        if not overlaps(safe_date(m["start_date"]), safe_date(m["end_date"]), start, end):
+            assert key not in set(table["mission"])
+            continue
+        details = [d for d in detect_conflicts_for_mission(m, pilots, drones, missions) if not d.startswith("Note:")]
+        assert table.loc[table["mission"] == key, "detail"].tolist() == details
+        checked.add(key)
+    assert len(checked) > 10 and not table.empty
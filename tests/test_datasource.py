@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+
+from bench import generate_dataset
+from datasource import FileDataSource, InMemoryDataSource, SQLiteDataSource
+from ops_agent import OpsAgent
+
+DATA = generate_dataset(400, seed=4)
+
+QUERIES = [
+    ("pilots", dict(status="available", location="Pune")),
+    ("pilots", dict(status="Available", skill="mapping", free_from="2026-03-10", free_to="2026-03-14")),
+    ("drones", dict(location="mumbai ", capability="thermal")),
+    ("drones", dict(status="available", free_from="2026-03-05", free_to="2026-03-06")),
+]
+
+
+@pytest.fixture
+def sqlite_source(tmp_path):
+    return SQLiteDataSource.export(InMemoryDataSource(**DATA), str(tmp_path / "ops.db"))
+
+
+def _page(agent, kind, filters):
+    search = agent.search_pilots if kind == "pilots" else agent.search_drones
+    results = search(page_size=500, **filters)
+    return results.page(1)
+
+
+@pytest.mark.parametrize("kind, filters", QUERIES)
+def test_pushdown_matches_cached_path(sqlite_source, kind, filters):
+    cached = OpsAgent(InMemoryDataSource(**DATA))
+    expected = _page(cached, kind, filters)
+
+    pushed = OpsAgent(sqlite_source)
+    got = _page(pushed, kind, filters)
+    assert not pushed.cache.cached(kind)            # answered without loading the sheet
+    assert len(got) > 0
+    pd.testing.assert_frame_equal(got, expected, check_categorical=False)
+    assert list(got.dtypes.astype(str)) == list(expected.dtypes.astype(str))
+
+
+def test_pinned_sheet_is_not_pushed_down(sqlite_source, monkeypatch):
+    agent = OpsAgent(sqlite_source)
+    agent.load_all()
+    monkeypatch.setattr(sqlite_source, "query_pilots_df", lambda **kw: pytest.fail("pushed down"))
+    assert agent.search_pilots(status="available").total > 0
+
+
+def test_sqlite_write_back(sqlite_source):
+    pilot_id = DATA["pilots"]["pilot_id"].iloc[5]
+    result = sqlite_source.update_cells("pilots", [(pilot_id, "status", "On Leave"), ("P-none", "status", "x")])
+    assert result["updated"] == [{"pilot_id": pilot_id, "status": "On Leave"}]
+    assert result["errors"] == ["Not found: P-none"]
+    on_leave = sqlite_source.query_pilots_df(status="on leave")
+    assert pilot_id in set(on_leave["pilot_id"]) and on_leave.index.min() >= 0
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_file_source_round_trip(tmp_path, fmt):
+    source = FileDataSource.export(InMemoryDataSource(**DATA), str(tmp_path), fmt)
+    pilots = source.read_pilots_df()
+    assert list(pilots["pilot_id"]) == list(DATA["pilots"]["pilot_id"])
+    drone_id = DATA["drones"]["drone_id"].iloc[0]
+    assert not source.update_drones_status([drone_id], "Maintenance")["errors"]
+    assert drone_id in set(source.query_drones_df(status="maintenance")["drone_id"])
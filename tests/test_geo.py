@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+from bench import generate_dataset
+from geo import GAZETTEER, Gazetteer, haversine_km, ids_within, k_nearest, location_term
+from indexes import RosterIndex
+
+ROSTER = RosterIndex(generate_dataset(400, seed=9)["pilots"])
+
+
+def _distances(place):
+    # resource id -> km for every resource in a known place, by brute force
+    origin = GAZETTEER.locate(place)
+    out = {}
+    for rid, loc in ROSTER.keys["location"].items():
+        if loc == place.lower():
+            out[rid] = 0.0
+        elif GAZETTEER.locate(loc) is not None:
+            out[rid] = haversine_km(origin, GAZETTEER.locate(loc))
+    return out
+
+
+@pytest.mark.parametrize("place, radius", [("Mumbai", 100), ("pune", 250), ("Delhi", 400), ("Guwahati", 50)])
+def test_within_matches_brute_force(place, radius):
+    expected = {name for name, ll in GAZETTEER.coords.items()
+                if haversine_km(GAZETTEER.locate(place), ll) <= radius}
+    found = GAZETTEER.within(place, radius)
+    assert {name for name, _ in found} == expected
+    assert [d for _, d in found] == sorted(d for _, d in found)
+
+    near = {rid: d for rid, d in _distances(place).items() if d <= radius}
+    assert ids_within(ROSTER, place, radius) == pytest.approx(near)
+
+
+def test_grid_cells_cover_the_radius():
+    # places just inside the radius but several cells away in longitude
+    gazetteer = Gazetteer({"a": (30.0, 70.0), "b": (30.0, 72.5), "c": (32.5, 70.0), "d": (30.0, 73.0)})
+    km_ab = haversine_km((30.0, 70.0), (30.0, 72.5))
+    assert [name for name, _ in gazetteer.within("a", km_ab + 1)] == ["a", "b"]
+    assert gazetteer.within("atlantis", 500) == [("atlantis", 0.0)]
+
+
+@pytest.mark.parametrize("place, k", [("Mumbai", 5), ("Lucknow", 12), ("Kochi", 30)])
+def test_k_nearest_matches_brute_force(place, k):
+    ranked = sorted(_distances(place).items(), key=lambda x: (x[1], x[0]))
+    assert k_nearest(ROSTER, place, k) == pytest.approx(ranked[:k])
+
+    eligible = set(ROSTER.candidates(status="available"))
+    ranked = [(rid, d) for rid, d in ranked if rid in eligible]
+    assert k_nearest(ROSTER, place, k, eligible=eligible) == pytest.approx(ranked[:k])
+
+
+def test_k_nearest_stops_at_the_cap():
+    found = k_nearest(ROSTER, "Mumbai", 10_000, max_km=200)
+    assert found and max(d for _, d in found) <= 200
+    assert len(found) == sum(d <= 200 for d in _distances("Mumbai").values())
+
+
+def test_location_term_scales_with_distance():
+    assert location_term("Mumbai", "mumbai ", 25, -10) == 25
+    assert location_term("Atlantis", "Mumbai", 25, -10) == -10
+    near, far = location_term("Thane", "Mumbai", 25, -10), location_term("Pune", "Mumbai", 25, -10)
+    assert 25 > near > far >= -10
+    assert location_term("Delhi", "Mumbai", 25, -10) == -10
@@ -0,0 +1,108 @@
+import pandas as pd
+import pytest
+
+from bench import generate_dataset
+from indexes import BookingIndex, FleetIndex, RosterIndex
+from schema import enforce_schema
+from sync import diff_frames
+from utils import normalize_list, overlaps, safe_date
+
+
+def _state(index):
+    # everything a lookup can observe; apply_changes() may leave empty buckets
+    inverted = {col: {v: rids for v, rids in buckets.items() if rids} for col, buckets in index.inverted.items()}
+    return index.sets, index.keys, inverted, index.ids.tolist()
+
+
+def _edit(df, id_col):
+    # one insert, one update and one delete
+    new = df.drop(index=df.index[3]).copy()
+    row = new.index[5]
+    new.loc[row, "location"] = "Pune"
+    new.loc[row, "status"] = "On Leave"
+    if "skills" in new.columns:
+        new.loc[row, "skills"] = "LiDAR, Thermal"
+    if "capabilities" in new.columns:
+        new.loc[row, "capabilities"] = "Thermal"
+    added = df.iloc[[0]].copy()
+    added[id_col] = added[id_col] + "X"
+    added.index = [len(df) + 100]
+    return pd.concat([new, added])
+
+
+@pytest.mark.parametrize("typed", [False, True])
+@pytest.mark.parametrize("sheet, index_cls", [("pilots", RosterIndex), ("drones", FleetIndex)])
+def test_apply_changes_matches_rebuild(sheet, index_cls, typed):
+    old = generate_dataset(60)[sheet]
+    new = _edit(old, index_cls.id_col)
+    if typed:
+        old, _ = enforce_schema(sheet, old)
+        new, _ = enforce_schema(sheet, new)
+
+    changes = diff_frames(sheet, old, new)
+    assert len(changes.inserted) == 1 and len(changes.updated) == 1 and len(changes.deleted) == 1
+
+    before = index_cls(old)
+    updated = before.apply_changes(new, changes)
+    assert _state(updated) == _state(index_cls(new))
+    # the old index still answers for the old frame
+    assert _state(before) == _state(index_cls(old))
+
+
+def test_diff_frames():
+    old = generate_dataset(20)["pilots"]
+    assert diff_frames("pilots", old, old.copy()).empty
+
+    new = old.copy()
+    new.loc[2, "status"] = "On Leave"
+    new = new.drop(index=4)
+    changes = diff_frames("pilots", old, new)
+    assert changes.updated == [old.loc[2, "pilot_id"]]
+    assert changes.deleted == [old.loc[4, "pilot_id"]]
+    assert changes.inserted == []
+
+    assert diff_frames("pilots", old, new.rename(columns={"name": "full_name"})).full
+    assert diff_frames("pilots", old, pd.concat([new, new.iloc[[0]]])).full
+
+
+def _booked_by_scan(missions, kind, rid, start, end, exclude=None):
+    col = BookingIndex.kinds[kind]
+    return [m["project_id"] for m in missions.to_dict(orient="records")
+            if rid.lower() in normalize_list(m[col]) and str(m["project_id"]).strip() != exclude
+            and safe_date(m["start_date"]) and safe_date(m["end_date"])
+            and overlaps(safe_date(m["start_date"]), safe_date(m["end_date"]), start, end)]
+
+
+def test_booked_matches_a_scan():
+    missions = generate_dataset(100, 60, 300, seed=5)["missions"]
+    index = BookingIndex(missions)
+    windows = [("2026-03-01", "2026-03-01"), ("2026-03-10", "2026-03-20"), ("2026-01-01", "2026-12-31")]
+    checked = 0
+    for kind, col in BookingIndex.kinds.items():
+        for rid in sorted({r for v in missions[col] for r in normalize_list(v)})[:40]:
+            for start, end in windows:
+                start, end = safe_date(start), safe_date(end)
+                expected = _booked_by_scan(missions, kind, rid, start, end)
+                assert index.booked(kind, rid.upper(), start, end) == expected
+                if expected:
+                    # the mission being checked does not conflict with itself
+                    exclude = str(expected[0]).strip()
+                    assert index.booked(kind, rid, start, end, exclude=f" {exclude} ") == \
+                        _booked_by_scan(missions, kind, rid, start, end, exclude)
+                    checked += 1
+    assert checked > 0
+
+
+def test_booked_ignores_undated_missions():
+    missions = pd.DataFrame([
+        dict(project_id="A", start_date="2026-03-01", end_date="2026-03-05", assigned_pilots="P1", assigned_drones=""),
+        dict(project_id="B", start_date="", end_date="2026-03-05", assigned_pilots="P1, P2", assigned_drones="D1"),
+        dict(project_id="C", start_date="2026-03-05", end_date="2026-03-09", assigned_pilots="p1", assigned_drones="D1"),
+    ])
+    index = BookingIndex(missions)
+    window = safe_date("2026-03-04"), safe_date("2026-03-06")
+    assert index.booked("pilot", "P1", *window) == ["A", "C"]
+    assert index.booked("pilot", "P1", *window, exclude="C") == ["A"]
+    assert index.booked("pilot", "P2", *window) == []
+    assert index.booked("drone", "D1", None, window[1]) == []
+    assert index.missions_for("pilot", "P2") == ["B"]
@@ -0,0 +1,52 @@
+import pytest
+
+from bench import generate_dataset
+from indexes import RosterIndex
+from matcher import score_drone, score_drones_frame, score_pilot, score_pilots_frame
+from schema import enforce_schema
+
+DATA = generate_dataset(200, seed=5)
+
+
+def _frames(sheet, typed):
+    df = DATA[sheet].copy()
+    if sheet == "pilots":
+        # blank and invalid rates are neutral in both paths
+        df["daily_rate_inr"] = df["daily_rate_inr"].astype(str)
+        df.loc[df.index[:3], "daily_rate_inr"] = ["", "n/a", "2000.5"]
+    if typed:
+        df, _ = enforce_schema(sheet, df)
+    missions = DATA["missions"].head(15)
+    if typed:
+        missions, _ = enforce_schema("missions", missions)
+    return df, missions
+
+
+@pytest.mark.parametrize("typed", [False, True])
+@pytest.mark.parametrize("indexed", [False, True])
+def test_pilot_frame_scores_match_rows(typed, indexed):
+    pilots, missions = _frames("pilots", typed)
+    index = RosterIndex(pilots) if indexed else None
+    for _, mission in missions.iterrows():
+        expected = [score_pilot(row, mission) for _, row in pilots.iterrows()]
+        assert score_pilots_frame(pilots, mission, index).tolist() == expected
+
+
+@pytest.mark.parametrize("typed", [False, True])
+def test_qualified_scores_match_rows(typed):
+    pilots, missions = _frames("pilots", typed)
+    roster = RosterIndex(pilots)
+    for _, mission in missions.iterrows():
+        ids = roster.candidates(skills=mission["required_skills"].split(","),
+                                certifications=mission["required_certs"].split(","))
+        frame = roster.frame(ids)
+        expected = [score_pilot(row, mission) for _, row in frame.iterrows()]
+        assert score_pilots_frame(frame, mission, roster, qualified=True).tolist() == expected
+
+
+@pytest.mark.parametrize("typed", [False, True])
+def test_drone_frame_scores_match_rows(typed):
+    drones, missions = _frames("drones", typed)
+    for _, mission in missions.iterrows():
+        expected = [score_drone(row, mission) for _, row in drones.iterrows()]
+        assert score_drones_frame(drones, mission).tolist() == expected
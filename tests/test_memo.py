@@ -0,0 +1,52 @@
+import time
+
+from bench import generate_dataset
+from datasource import InMemoryDataSource
+from memo import LRUCache, Prewarmer
+from ops_agent import OpsAgent
+
+
+def test_lru_eviction():
+    cache = LRUCache(maxlen=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1          # "a" is now the most recent
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c"), len(cache)) == (1, 3, 2)
+
+
+def test_memoized_results_are_copies():
+    agent = OpsAgent(InMemoryDataSource(**generate_dataset(300, seed=2)))
+    mission_id = agent.snapshot().missions["project_id"].iloc[0]
+
+    first = agent.recommend_assignment(mission_id)
+    expected = [dict(p) for p in first["recommended_pilots"]]
+    first["recommended_pilots"].clear()
+    second = agent.recommend_assignment(mission_id)
+    assert second["recommended_pilots"] == expected
+    second["recommended_pilots"][0]["score"] = -1
+    assert agent.recommend_assignment(mission_id)["recommended_pilots"] == expected
+    assert len(agent.memo) == 1
+
+
+def test_memo_follows_sheet_versions():
+    agent = OpsAgent(InMemoryDataSource(**generate_dataset(300, seed=2)))
+    mission_id = agent.snapshot().missions["project_id"].iloc[0]
+    best = agent.recommend_assignment(mission_id)["recommended_pilots"][0]["pilot_id"]
+
+    agent.update_pilot_status(best, "On Leave")
+    after = agent.recommend_assignment(mission_id)
+    assert best not in str(after)
+
+
+def test_prewarmer_collapses_triggers():
+    runs = []
+    warmer = Prewarmer(lambda: runs.append(1) or len(runs), delay=0.05)
+    for _ in range(5):
+        warmer.trigger()
+    deadline = time.monotonic() + 5
+    while warmer.runs < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.2)
+    assert warmer.runs == 1 and warmer.last_result == 1
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from paging import Cursor, CursorStore, ResultPages
+from snapshot import SheetEntry
+
+DF = pd.DataFrame({"pilot_id": [f"P{i:03d}" for i in range(50)], "status": ["Available", "On Leave"] * 25,
+                   "notes": "x"})
+MATCHES = np.flatnonzero(DF["status"] == "Available")
+
+
+def test_pages_slice_the_matching_rows():
+    results = ResultPages(DF, MATCHES, ["pilot_id", "missing", "status"], page_size=10, version=3)
+    assert (results.total, results.pages, results.columns) == (25, 3, ["pilot_id", "status"])
+    assert list(results.page(1)["pilot_id"]) == [f"P{i:03d}" for i in range(0, 20, 2)]
+    assert list(results.page(3)["pilot_id"]) == ["P040", "P042", "P044", "P046", "P048"]
+    assert results.page(4).empty
+    pages = list(results.iter_pages(start=2))
+    assert [n for n, _ in pages] == [2, 3]
+    assert pd.concat([p for _, p in results.iter_pages()])["pilot_id"].tolist() == DF["pilot_id"].iloc[MATCHES].tolist()
+
+
+def test_empty_result_has_one_page():
+    results = ResultPages(DF, MATCHES[:0], ["pilot_id"], page_size=0)
+    assert (results.total, results.pages, results.page_size) == (0, 1, 1)
+
+
+def test_cursor_resumes_only_on_the_same_version():
+    cursor = Cursor("pilots", {"status": "available"}, ResultPages(DF, MATCHES, ["pilot_id"], 10, version=3))
+    cursor.page = 2
+    resumed = cursor.resume(SheetEntry("pilots", DF, 3, 0.0, []))
+    pd.testing.assert_frame_equal(resumed.page(cursor.page), ResultPages(DF, MATCHES, ["pilot_id"], 10).page(2))
+    assert cursor.resume(SheetEntry("pilots", DF, 4, 0.0, [])) is None
+
+    # pushdown results have no version and always run again
+    unversioned = Cursor("pilots", {}, ResultPages(DF, MATCHES, ["pilot_id"]))
+    assert unversioned.resume(SheetEntry("pilots", DF, 3, 0.0, [])) is None
+
+
+def test_cursor_store_drops_least_recently_used():
+    store = CursorStore(maxlen=2)
+    store.put("a", 1)
+    store.put("b", 2)
+    assert store.get("a") == 1
+    store.put("c", 3)
+    assert (store.get("a"), store.get("b"), store.get("c")) == (1, None, 3)
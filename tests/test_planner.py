@@ -0,0 +1,125 @@
+from collections import defaultdict
+
+import pandas as pd
+import pytest
+
+from bench import generate_dataset
+from indexes import BookingIndex, FleetIndex, RosterIndex
+from planner import MinCostFlow, plan_missions
+from utils import overlaps, safe_date
+
+
+def test_min_cost_flow():
+    # two units from 0 to 3: the cheap path 0-1-3 takes one, 0-2-3 the other
+    net = MinCostFlow(4)
+    net.add_edge(0, 1, 1, 1)
+    net.add_edge(0, 2, 2, 2)
+    net.add_edge(1, 3, 2, 1)
+    net.add_edge(2, 3, 1, 3)
+    assert net.flow(0, 3) == (2, 7)
+
+
+def test_min_cost_flow_reroutes():
+    # the cheapest first path (0-1-2-3) has to be undone to reach flow 2
+    net = MinCostFlow(4)
+    net.add_edge(0, 1, 1, 1)
+    net.add_edge(0, 2, 1, 5)
+    net.add_edge(1, 2, 1, 1)
+    net.add_edge(1, 3, 1, 5)
+    net.add_edge(2, 3, 1, 1)
+    assert net.flow(0, 3) == (2, 12)
+
+
+def _plan(data):
+    pilots, drones, missions = data["pilots"], data["drones"], data["missions"]
+    return plan_missions(pilots, drones, missions, RosterIndex(pilots), FleetIndex(drones), BookingIndex(missions))
+
+
+def _dates(missions):
+    return {str(m["project_id"]).strip(): (safe_date(m["start_date"]), safe_date(m["end_date"]))
+            for m in missions.to_dict(orient="records")}
+
+
+def _double_bookings(missions, plan):
+    dates = _dates(missions)
+    held = defaultdict(list)
+    for a in plan["assignments"]:
+        for rid in a["pilots"] + a["drones"]:
+            held[rid].append(dates[a["project_id"]])
+    return [rid for rid, spans in held.items()
+            for i, (s, e) in enumerate(spans) for s2, e2 in spans[i + 1:] if overlaps(s, e, s2, e2)]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_plan_never_double_books(seed):
+    data = generate_dataset(600, 300, 150, seed=seed)
+    plan = _plan(data)
+    assert plan["missions_planned"] > 0
+    assert _double_bookings(data["missions"], plan) == []
+
+
+def test_chained_overlaps_share_one_group():
+    # A overlaps B and B overlaps C, but A and C do not: with two pilots,
+    # A and C can share one and B gets the other
+    pilots = pd.DataFrame([
+        dict(pilot_id=f"P{i}", skills="Mapping", certifications="DGCA", location="Pune",
+             status="Available", daily_rate_inr=rate)
+        for i, rate in enumerate((1500, 5000), start=1)
+    ])
+    drones = pd.DataFrame([
+        dict(drone_id=f"D{i}", capabilities="RGB", location="Pune", status="Available", weather_resistance="IP67")
+        for i in range(3)
+    ])
+    missions = pd.DataFrame([
+        dict(project_id=key, location="Pune", required_skills="Mapping", required_certs="DGCA",
+             start_date=start, end_date=end, required_pilots=1, required_drones=1,
+             assigned_pilots="", assigned_drones="", weather_forecast="Clear", mission_budget_inr="")
+        for key, start, end in (("A", "2026-03-01", "2026-03-05"),
+                                ("B", "2026-03-04", "2026-03-10"),
+                                ("C", "2026-03-06", "2026-03-08"))
+    ])
+    plan = _plan({"pilots": pilots, "drones": drones, "missions": missions})
+    assert plan["unfilled"] == []
+    assert _double_bookings(missions, plan) == []
+
+
+def test_existing_bookings_block_resources():
+    # only missions overlapping the window are planned; the others keep
+    # their crews and still block them
+    data = generate_dataset(300, 150, 60, seed=3)
+    missions = data["missions"]
+    start, end = safe_date("2026-03-20"), safe_date("2026-04-05")
+    plan = plan_missions(data["pilots"], data["drones"], missions, RosterIndex(data["pilots"]),
+                         FleetIndex(data["drones"]), BookingIndex(missions), start=start, end=end)
+
+    dates = _dates(missions)
+    planned = {a["project_id"] for a in plan["assignments"]}
+    assert 0 < len(planned) < len(missions)
+    kept = BookingIndex(missions[~missions["project_id"].isin(planned)])
+    for a in plan["assignments"]:
+        m_start, m_end = dates[a["project_id"]]
+        for kind in ("pilot", "drone"):
+            for rid in a[kind + "s"]:
+                assert kept.booked(kind, rid, m_start, m_end) == []
+    assert _double_bookings(missions, plan) == []
+
+
+@pytest.mark.parametrize("budget, expected", [("10000", ["P1"]), (10000.0, ["P1"]), ("", ["P1", "P2"]), ("TBD", ["P1", "P2"])])
+def test_budget_and_exact_city(budget, expected):
+    # an equal budget share per pilot slot caps the rate (no cap without a
+    # numeric budget); the cheaper pilot in Thane, 20 km away, is not eligible
+    pilots = pd.DataFrame([
+        dict(pilot_id=pid, skills="Mapping", certifications="DGCA", location=loc,
+             status="Available", daily_rate_inr=rate)
+        for pid, loc, rate in (("P1", "Mumbai", 1000), ("P2", "Mumbai", 3000), ("P3", "Thane", 500))
+    ])
+    drones = pd.DataFrame([
+        dict(drone_id=f"D{i}", capabilities="RGB", location="Mumbai", status="Available", weather_resistance="IP67")
+        for i in range(2)
+    ])
+    missions = pd.DataFrame([dict(
+        project_id="M", location="Mumbai", required_skills="Mapping", required_certs="DGCA",
+        start_date="2026-03-01", end_date="2026-03-05", required_pilots=2, required_drones=1,
+        assigned_pilots="", assigned_drones="", weather_forecast="Clear", mission_budget_inr=budget)])
+    plan = _plan({"pilots": pilots, "drones": drones, "missions": missions})
+    assert sorted(plan["assignments"][0]["pilots"]) == expected
@@ -0,0 +1,80 @@
+import os
+import threading
+
+import pytest
+
+import profiling
+from profiling import profile
+
+
+def _work():
+    return sum(len(str(i)) for i in range(20000))
+
+
+def test_profile_saves_stacks_and_allocations(tmp_path):
+    with profile("show pilots", directory=tmp_path, keep=5) as report:
+        data = [bytearray(1000) for _ in range(200)]
+        _work()
+    assert report.seconds > 0 and not report.peak_shared
+    assert report.peak_bytes >= 200 * 1000
+    with open(report.paths["stacks"], encoding="utf-8") as f:
+        line = f.readline().rsplit(" ", 1)
+    assert ";" in line[0] and int(line[1]) > 0
+    assert os.path.basename(report.paths["allocations"]).endswith("show_pilots.alloc.txt")
+    del data
+
+
+def test_ring_keeps_newest(tmp_path):
+    for i in range(4):
+        with profile(f"run {i}", directory=tmp_path, keep=2):
+            pass
+    names = sorted(os.listdir(tmp_path))
+    assert len(names) == 4 and all("run_2" in n or "run_3" in n for n in names)
+
+
+def test_failed_report_does_not_block_the_thread(tmp_path, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("disk gone")
+
+    monkeypatch.setattr(profiling, "_save", broken)
+    with pytest.raises(RuntimeError):
+        with profile("first", directory=tmp_path):
+            pass
+    monkeypatch.undo()
+
+    with profile("second", directory=tmp_path) as report:
+        pass
+    assert report is not None and report.paths
+    assert profiling._tracing_users == 0
+
+
+def test_nested_profile_yields_none(tmp_path):
+    with profile("outer", directory=tmp_path) as outer:
+        with profile("inner", directory=tmp_path) as inner:
+            pass
+    assert outer is not None and inner is None
+
+
+def test_overlapping_profiles_report_a_shared_peak(tmp_path):
+    inside, release = threading.Event(), threading.Event()
+    reports = {}
+
+    def other():
+        with profile("other", directory=tmp_path) as report:
+            inside.set()
+            release.wait(5)
+        reports["other"] = report
+
+    thread = threading.Thread(target=other)
+    thread.start()
+    inside.wait(5)
+    with profile("main", directory=tmp_path) as report:
+        pass
+    release.set()
+    thread.join()
+    assert report.peak_shared and reports["other"].peak_shared
+    assert "shared with a concurrent profile" in report.summary()
+
+    with profile("alone", directory=tmp_path) as report:
+        pass
+    assert not report.peak_shared
@@ -0,0 +1,87 @@
+import logging
+import threading
+
+import pandas as pd
+
+from datasource import InMemoryDataSource
+from events import EventBus, StatusChanged, origin
+from ops_agent import OpsAgent
+
+
+def _day(offset):
+    return (pd.Timestamp.today().normalize() + pd.Timedelta(days=offset)).strftime("%Y-%m-%d")
+
+
+def _agent():
+    pilots = pd.DataFrame([
+        dict(pilot_id=pid, name=pid, skills="Mapping", certifications="DGCA", location="Pune", status="Available",
+             daily_rate_inr=1000)
+        for pid in ("P1", "P2", "P3")
+    ])
+    drones = pd.DataFrame([dict(drone_id="D1", model="X", capabilities="RGB", location="Pune", status="Available",
+                                weather_resistance="IP67")])
+    missions = pd.DataFrame([
+        dict(project_id=key, client="c", location="Pune", required_skills="Mapping", required_certs="DGCA",
+             start_date=_day(start), end_date=_day(end), required_pilots=1, required_drones=1,
+             assigned_pilots=pilot, assigned_drones="D1" if key == "NOW" else "", weather_forecast="Clear",
+             mission_budget_inr="")
+        for key, start, end, pilot in (("NOW", 1, 3, "P1"), ("LATER", 10, 12, "P1"),
+                                       ("PAST", -10, -5, "P1"), ("OTHER", 1, 3, "P2"))
+    ])
+    return OpsAgent(InMemoryDataSource(pilots=pilots, drones=drones, missions=missions))
+
+
+def test_status_change_replans_open_missions_of_the_resource():
+    agent = _agent()
+    proposals = []
+    replanner = agent.start_replanner(lambda event, proposal: proposals.append((event, proposal)), workers=2)
+    with origin("chat-1"):
+        assert agent.update_pilot_status("P1", "On Leave")["success"]
+    assert replanner.wait("chat-1", 5)
+
+    # finished missions and missions of other pilots are left alone
+    assert sorted(p["project_id"] for _, p in proposals) == ["LATER", "NOW"]
+    event, proposal = proposals[0]
+    assert event.origin == "chat-1" and event.resource_id == "P1" and event.status == "On Leave"
+    assert any("On Leave" in c for c in proposal["conflicts"])
+    picks = [r["pilot_id"] for r in proposal["replacement_recommendations"]["recommended_pilots"]]
+    assert picks and "P1" not in picks
+
+
+def test_changes_without_conflicts_are_not_proposed():
+    agent = _agent()
+    proposals = []
+    replanner = agent.start_replanner(lambda event, proposal: proposals.append(proposal))
+    with origin("chat-2"):
+        agent.update_pilot_status("P3", "On Leave")         # assigned nowhere
+        agent.update_pilot_status("P2", "Available")        # still fine for OTHER
+    assert replanner.wait("chat-2", 5)
+    assert proposals == []
+
+
+def test_bus_keeps_delivering_past_a_failing_subscriber(caplog):
+    bus = EventBus(maxlen=2)
+    seen = []
+    bus.subscribe(lambda event: 1 / 0)
+    bus.subscribe(seen.append)
+    with caplog.at_level(logging.ERROR, logger="events"):
+        for i in range(3):
+            bus.publish(StatusChanged("pilot", f" P{i} ", "On Leave"))
+    assert [e.resource_id for e in seen] == ["P0", "P1", "P2"]
+    assert [e.resource_id for e in bus.entries] == ["P1", "P2"]
+    assert len([r for r in caplog.records if r.exc_info]) == 3
+
+    bus.unsubscribe(seen.append)
+    bus.publish(StatusChanged("drone", "D1", "Maintenance"))
+    assert len(seen) == 3
+
+
+def test_origin_is_per_thread():
+    tagged = []
+    with origin("chat-3"):
+        tagged.append(StatusChanged("pilot", "P1", "x").origin)
+        thread = threading.Thread(target=lambda: tagged.append(StatusChanged("pilot", "P1", "x").origin))
+        thread.start()
+        thread.join()
+    tagged.append(StatusChanged("pilot", "P1", "x").origin)
+    assert tagged == ["chat-3", None, None]
@@ -0,0 +1,64 @@
+import pandas as pd
+
+from bench import generate_dataset
+from datasource import InMemoryDataSource
+from ops_agent import OpsAgent
+from scenario import ScenarioSnapshot, affected_missions
+
+DATA = generate_dataset(300, seed=3)
+
+
+def _agent():
+    return OpsAgent(InMemoryDataSource(**DATA))
+
+
+def _recommended_not_assigned(agent):
+    # (mission, pilot) where the pilot is picked for, but not assigned to, the mission
+    bookings = agent.booking_index()
+    for mission_id in DATA["missions"]["project_id"]:
+        rec = agent.recommend_assignment(mission_id)
+        if isinstance(rec, dict):
+            for pick in rec["recommended_pilots"]:
+                if mission_id not in bookings.missions_for("pilot", pick["pilot_id"]):
+                    return mission_id, pick["pilot_id"]
+    raise AssertionError("no recommended, unassigned pilot in the dataset")
+
+
+def test_overlay_does_not_leak_into_base():
+    agent = _agent()
+    pilot_id = DATA["pilots"]["pilot_id"].iloc[0]
+    with agent.command() as base:
+        before = base.pilots.copy()
+        overlay = ScenarioSnapshot(base, [("pilots", pilot_id, "status", "On Leave")])
+        changed = overlay.pilots
+        assert changed.loc[changed["pilot_id"] == pilot_id, "status"].item() == "On Leave"
+        assert overlay.entry("drones") is base.entry("drones")
+        pd.testing.assert_frame_equal(base.pilots, before)
+    assert agent.snapshot().pilots.loc[0, "status"] == DATA["pilots"].loc[0, "status"]
+
+
+def test_recommended_missions_are_affected():
+    agent = _agent()
+    mission_id, pilot_id = _recommended_not_assigned(agent)
+    # not reachable through the booking index alone
+    assert mission_id not in affected_missions(agent.booking_index(), [("pilots", pilot_id, "status", "On Leave")])
+
+    result = agent.what_if([(pilot_id, "status", "On Leave")])
+    assert mission_id in result["affected_missions"]
+    impacted = {d["project_id"]: d for d in result["impacted"]}
+    assert pilot_id in impacted[mission_id]["recommended_pilots"]["before"]
+    assert pilot_id not in impacted[mission_id]["recommended_pilots"]["after"]
+
+
+def test_assignment_change_reaches_other_missions_of_the_resource():
+    agent = _agent()
+    pilot_id = DATA["pilots"]["pilot_id"].iloc[1]
+    target = DATA["missions"]["project_id"].iloc[2]
+    own = agent.booking_index().missions_for("pilot", pilot_id)
+    changes = [("missions", target, "assigned_pilots", pilot_id)]
+    affected = affected_missions(agent.booking_index(), changes)
+    assert affected[0] == target and set(own) <= set(affected)
+
+
+def test_unknown_ids_are_rejected():
+    assert _agent().what_if([("NOPE-1", "status", "x")]) == "Unknown id(s): NOPE-1"
@@ -0,0 +1,142 @@
+import threading
+
+import pytest
+import requests
+
+import scheduler
+from scheduler import RequestScheduler, SingleFlight, TokenBucket, error_code
+
+
+class APIError(Exception):
+    # shaped like gspread's APIError: an HTTP code and a response
+    def __init__(self, code, retry_after=None):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+        self.response = requests.Response()
+        self.response.status_code = code
+        if retry_after is not None:
+            self.response.headers["Retry-After"] = str(retry_after)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(scheduler.time, "sleep", slept.append)
+    return slept
+
+
+def _failing(*errors, result="ok"):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return fn, calls
+
+
+def _scheduler(**kwargs):
+    return RequestScheduler(rate_per_minute=1e9, burst=1000, **kwargs)
+
+
+def test_retries_transient_errors_with_backoff(sleeps):
+    fn, calls = _failing(APIError(429), APIError(503), requests.ConnectionError())
+    assert _scheduler(base_delay=1.0).call(None, fn) == "ok"
+    assert len(calls) == 4 and len(sleeps) == 3
+    assert all(0 <= s <= 2 ** i for i, s in enumerate(sleeps))
+
+
+def test_honours_retry_after(sleeps):
+    fn, _ = _failing(APIError(429, retry_after=7))
+    _scheduler(base_delay=0.01).call("k", fn)
+    assert sleeps == [7.0]
+
+
+def test_other_errors_are_not_retried(sleeps):
+    fn, calls = _failing(APIError(400))
+    with pytest.raises(APIError):
+        _scheduler().call(None, fn)
+    assert len(calls) == 1 and sleeps == []
+    assert error_code(APIError(404)) == 404 and error_code(ValueError()) is None
+
+
+def test_gives_up_after_max_retries(sleeps):
+    fn, calls = _failing(*[APIError(500)] * 10)
+    with pytest.raises(APIError):
+        _scheduler(retries=3).call(None, fn)
+    assert len(calls) == 4 and len(sleeps) == 3
+
+
+def test_concurrent_calls_share_one_request(monkeypatch):
+    # followers count themselves just before they wait for the leader
+    joined = threading.Semaphore(0)
+    monkeypatch.setattr(scheduler.METRICS, "inc", lambda *args, **kwargs: joined.release())
+    flights = SingleFlight()
+    release, started = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flights.do("pilots", fetch))) for _ in range(5)]
+    threads[0].start()
+    started.wait(5)
+    for t in threads[1:]:
+        t.start()
+    assert all(joined.acquire(timeout=5) for _ in threads[1:])
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert len(calls) == 1 and len(results) == 5 and len({id(r) for r in results}) == 1
+    # once done, the next call makes a new request
+    flights.do("pilots", fetch)
+    assert len(calls) == 2
+
+
+def test_followers_get_the_leaders_error(monkeypatch):
+    joined = threading.Semaphore(0)
+    monkeypatch.setattr(scheduler.METRICS, "inc", lambda *args, **kwargs: joined.release())
+    flights = SingleFlight()
+    release, started = threading.Event(), threading.Event()
+
+    def fetch():
+        started.set()
+        release.wait(5)
+        raise APIError(500)
+
+    errors = []
+
+    def run():
+        try:
+            flights.do("drones", fetch)
+        except APIError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=run)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=run)
+    follower.start()
+    assert joined.acquire(timeout=5)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert len(errors) == 2
+
+
+def test_token_bucket_allows_a_burst_then_waits(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(scheduler.time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=2.0, burst=3)
+    assert [bucket._take() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket._take() == pytest.approx(0.5)
+    now[0] += 0.5
+    assert bucket._take() == 0.0
+    now[0] += 60
+    assert [bucket._take() for _ in range(4)][-1] == pytest.approx(0.5)   # refills to the burst only
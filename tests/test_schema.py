@@ -0,0 +1,45 @@
+import pandas as pd
+
+from schema import enforce_schema
+
+
+def test_types_and_issues():
+    pilots = pd.DataFrame({
+        "pilot_id": ["P1", "P2", "P3"],
+        "location": [" Pune", "Delhi ", "Pune"],
+        "status": ["Available", "On Leave", "Available"],
+        "available_from": ["2026-03-01", "03/05/2026", "soon"],
+        "daily_rate_inr": ["6000", "", "x"],
+    })
+    typed, issues = enforce_schema("pilots", pilots)
+    assert str(typed["available_from"].dtype).startswith("datetime64")
+    assert typed["available_from"].iloc[1] == pd.Timestamp("2026-03-05")
+    assert typed["location_key"].tolist() == ["pune", "delhi", "pune"]
+    assert typed["location"].dtype == "category"
+    assert issues[["row", "id", "column", "problem"]].values.tolist() == [
+        [4, "P3", "available_from", "invalid date"],
+        [4, "P3", "daily_rate_inr", "not a number"],
+    ]
+
+
+def test_whole_numbers_stay_integers():
+    pilots = pd.DataFrame({"pilot_id": ["P1", "P2"], "daily_rate_inr": ["6000", ""]})
+    typed, _ = enforce_schema("pilots", pilots)
+    assert typed["daily_rate_inr"].dtype == "Int64"
+    assert typed[["daily_rate_inr"]].to_string(index=False).split()[1] == "6000"
+
+    pilots["daily_rate_inr"] = ["2500.5", "3000"]
+    typed, _ = enforce_schema("pilots", pilots)
+    assert typed["daily_rate_inr"].dtype == "float64"
+
+
+def test_out_of_range_dates_are_invalid():
+    missions = pd.DataFrame({
+        "project_id": ["M1", "M2", "M3"],
+        "start_date": ["2026-04-01", "1926-01-01", ""],
+        "end_date": ["2206-04-01", "2026-01-10", "2026-03-03"],
+    })
+    typed, issues = enforce_schema("missions", missions)
+    assert typed["start_date"].isna().tolist() == [False, True, True]
+    assert typed["end_date"].isna().tolist() == [True, False, False]
+    assert sorted(issues[issues["problem"] == "invalid date"]["value"]) == ["1926-01-01", "2206-04-01"]
@@ -0,0 +1,83 @@
+import os
+
+import pandas as pd
+import pytest
+
+from bench import generate_dataset
+from datasource import InMemoryDataSource
+from indexes import RosterIndex
+from shared_snapshot import MANIFEST, SharedSnapshotCache, SnapshotPublisher
+from snapshot import SnapshotCache
+
+DATA = generate_dataset(80, seed=10)
+
+
+@pytest.fixture
+def loader(tmp_path):
+    source = InMemoryDataSource(**DATA)
+    publisher = SnapshotPublisher(SnapshotCache(source), str(tmp_path), keep=2)
+    assert publisher.publish()
+    return source, publisher
+
+
+def _worker(publisher, wait=2.0):
+    return SharedSnapshotCache(publisher.directory, poll=0, wait=wait)
+
+
+def test_workers_read_the_published_frames(loader):
+    _, publisher = loader
+    worker = _worker(publisher)
+    for name in ("pilots", "drones", "missions"):
+        published, cached = worker.entry(name), publisher.cache.entry(name)
+        pd.testing.assert_frame_equal(published.df, cached.df)
+        assert worker.entry(name) is published              # same file: same entry
+    assert not publisher.publish()                          # nothing new to publish
+
+
+def test_new_versions_carry_their_delta(loader):
+    source, publisher = loader
+    worker = _worker(publisher)
+    old = worker.entry("pilots")
+    old.derive("roster_index", RosterIndex)
+    seen = []
+    worker.changelog.subscribe(seen.append)
+
+    pilot_id = DATA["pilots"]["pilot_id"].iloc[3]
+    source.update_pilot_status(pilot_id, "On Leave")
+    assert publisher.publish("pilots")
+    new = worker.entry("pilots")
+    assert new is not old and new.version > old.version
+    assert seen[-1].updated == [pilot_id] and not seen[-1].full
+    # the index was updated from the delta, not rebuilt, and matches a rebuild
+    index, rebuilt = new.derived["roster_index"], RosterIndex(new.df)
+    assert index.keys == rebuilt.keys and index.values("skills", pilot_id) == rebuilt.values("skills", pilot_id)
+    assert pilot_id in index.lookup("status", "on leave")
+
+
+def test_invalidate_waits_for_the_loader(loader):
+    _, publisher = loader
+    worker = _worker(publisher)
+    before = worker.entry("drones")
+    worker.invalidate("drones")
+    assert os.path.exists(publisher.path("refresh-drones"))
+
+    assert publisher._requests() == ["drones"] and not os.path.exists(publisher.path("refresh-drones"))
+    assert publisher.publish("drones")                      # unchanged, but marked refreshed
+    assert worker.entry("drones") is before
+
+
+def test_old_versions_are_pruned(loader):
+    source, publisher = loader
+    pilot_id = DATA["pilots"]["pilot_id"].iloc[0]
+    for status in ("On Leave", "Available", "Unavailable"):
+        source.update_pilot_status(pilot_id, status)
+        publisher.publish("pilots")
+    files = [f for f in os.listdir(publisher.directory) if f.startswith("pilots-") and not f.endswith("issues.arrow")]
+    assert len(files) == 2 and publisher.sheets["pilots"]["file"] in files
+
+
+def test_missing_loader_is_reported(tmp_path):
+    worker = SharedSnapshotCache(str(tmp_path), poll=0, wait=0)
+    assert not os.path.exists(tmp_path / MANIFEST)
+    with pytest.raises(RuntimeError, match="Is the loader running"):
+        worker.entry("pilots")
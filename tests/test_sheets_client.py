@@ -0,0 +1,217 @@
+import threading
+from collections import Counter
+
+import pandas as pd
+import pytest
+from gspread.utils import a1_to_rowcol, numericise_all
+
+import sheets_client
+from bench import generate_dataset
+from scheduler import RequestScheduler
+from schema import enforce_schema
+from sheets_client import SheetsClient
+
+
+class FakeWorksheet:
+    # the parts of gspread.Worksheet the client uses, over a list of rows;
+    # like the Values API, trailing blank rows and cells are not returned
+    def __init__(self, df, spare_rows=1000):
+        self.rows = [list(df.columns)] + [["" if pd.isna(v) else str(v) for v in row]
+                                         for row in df.itertuples(index=False)]
+        self.row_count = len(self.rows) + spare_rows
+        self.calls = Counter()
+
+    def _cell(self, r, c):
+        row = self.rows[r - 1] if r <= len(self.rows) else []
+        return row[c - 1] if c <= len(row) else ""
+
+    def get_all_records(self):
+        self.calls["get_all_records"] += 1
+        h = self.rows[0]
+        return [dict(zip(h, numericise_all(r + [""] * (len(h) - len(r)), default_blank=""))) for r in self.rows[1:]]
+
+    def row_values(self, r):
+        self.calls["row_values"] += 1
+        return [v for v in self.rows[r - 1]]
+
+    def col_values(self, c):
+        self.calls["col_values"] += 1
+        values = [self._cell(r, c) for r in range(1, len(self.rows) + 1)]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def get(self, a1):
+        self.calls["get"] += 1
+        first, last = a1.split(":")
+        r0, _ = a1_to_rowcol(first)
+        r1, c1 = a1_to_rowcol(last)
+        out = [[self._cell(r, c) for c in range(1, c1 + 1)] for r in range(r0, r1 + 1)]
+        while out and not any(out[-1]):
+            out.pop()
+        return out
+
+    def batch_get(self, ranges, major_dimension=None):
+        self.calls["batch_get"] += 1
+        out = []
+        for a1 in ranges:
+            if ":" in a1:
+                # whole column
+                c = a1_to_rowcol(a1.split(":")[0] + "1")[1]
+                values = [self._cell(r, c) for r in range(1, len(self.rows) + 1)]
+                while values and not values[-1]:
+                    values.pop()
+                out.append([values] if values else [])
+            else:
+                value = self._cell(*a1_to_rowcol(a1))
+                out.append([[value]] if value else [])
+        return out
+
+    def batch_update(self, data, **kwargs):
+        self.calls["batch_update"] += 1
+        for cell in data:
+            r, c = a1_to_rowcol(cell["range"])
+            while len(self.rows) < r:
+                self.rows.append([])
+            row = self.rows[r - 1]
+            row.extend([""] * (c - len(row)))
+            row[c - 1] = cell["values"][0][0]
+
+
+def make_client(frames):
+    client = SheetsClient.__new__(SheetsClient)
+    client.scheduler = RequestScheduler(rate_per_minute=1e9, burst=1000)
+    client._call_local = threading.local()
+    client._sheet_ids = {name: name for name in frames}
+    client._spreadsheets, client._open_locks = {}, {}
+    client._worksheets = {name: FakeWorksheet(df) for name, df in frames.items()}
+    client._layouts, client._layout_lock = {}, threading.Lock()
+    return client
+
+
+@pytest.fixture
+def missions():
+    df = generate_dataset(500, seed=4)["missions"].sort_values("end_date").reset_index(drop=True)
+    df.loc[3, "start_date"] = "not a date"
+    return df
+
+
+def _blank(ws, first, last):
+    for r in range(first, last + 1):
+        ws.rows[r - 1] = [""] * len(ws.rows[0])
+
+
+def test_chunked_read_matches_full_read(missions, monkeypatch):
+    monkeypatch.setattr(sheets_client, "CHUNK_ROWS", 30)
+    client = make_client({"missions": missions})
+    expected, expected_issues = enforce_schema("missions", client._read_df("missions"))
+    client._layouts.clear()
+
+    df, issues = client.read_typed_df("missions")
+    pd.testing.assert_frame_equal(df, expected, check_categorical=False)
+    assert issues.astype(str).values.tolist() == expected_issues.astype(str).values.tolist()
+    layout = client._layouts["missions"][1]
+    assert layout[missions["project_id"].iloc[-1]] == len(missions) + 1
+
+
+def test_reads_past_gaps_and_stops_at_the_data(missions):
+    client = make_client({"missions": missions})
+    ws = client._worksheets["missions"]
+    _blank(ws, 12, 30)                      # a whole range is blank
+    ws.rows.append([""] * len(ws.rows[0]))
+    ws.rows.append(list(ws.rows[1]))        # a row after the last id...
+    ws.rows[-1][0] = ""                     # ...with a blank id
+
+    df = pd.concat([df for _, df, _ in client._chunks("missions", 20)])
+    ids = df["project_id"].astype(str)
+    assert sorted(ids[ids != ""]) == sorted(missions["project_id"].drop(index=range(10, 29)))
+    assert df.index[-1] == len(ws.rows) - 2 and df["client"].iloc[-1] == ws.rows[-1][1]
+    # no reads across the spare grid: the data ranges plus one empty range
+    data_ranges = -(-(len(ws.rows) - 1) // 20)
+    assert ws.calls["get"] == data_ranges + 1
+    assert ws.calls["batch_get"] == 1 and "col_values" not in ws.calls
+
+
+def test_date_window_skips_old_ranges(missions, monkeypatch):
+    monkeypatch.setattr(sheets_client, "MISSIONS_SINCE_DAYS", "0")
+    since = pd.Timestamp("2026-04-15")
+    client = make_client({"missions": missions})
+    monkeypatch.setattr(client, "_window", lambda name: ("end_date", since))
+    ws = client._worksheets["missions"]
+
+    chunks = list(client._chunks("missions", 10))
+    kept = pd.concat([df for _, df, _ in chunks])
+    ends = pd.to_datetime(missions["end_date"])
+    assert sorted(kept["project_id"]) == sorted(missions.loc[ends >= since, "project_id"])
+    # sorted by end date: the ranges before the window are never fetched
+    first_kept = int((ends >= since).idxmax())
+    assert ws.calls["get"] <= -(-len(missions) // 10) - first_kept // 10 + 1
+    assert ws.calls["batch_get"] == 1
+
+
+def test_iter_chunks_yields_rows_as_they_arrive(missions):
+    client = make_client({"missions": missions})
+    ws = client._worksheets["missions"]
+    chunks = client.iter_chunks("missions", 50)
+    first, _ = next(chunks)
+    assert len(first) == 50 and ws.calls["get"] == 1
+    assert first.index[0] == 0 and str(first["start_date"].dtype).startswith("datetime64")
+    assert sum(len(df) for df, _ in chunks) == len(missions) - 50
+
+
+@pytest.fixture
+def pilots():
+    return generate_dataset(60, seed=6)["pilots"]
+
+
+def _sheet_value(ws, rid, field):
+    headers = ws.rows[0]
+    row = next(r for r in ws.rows[1:] if r and r[headers.index("pilot_id")] == rid)
+    return row[headers.index(field)]
+
+
+def test_writes_use_the_cached_layout(pilots):
+    client = make_client({"pilots": pilots})
+    client.read_typed_df("pilots")
+    ws = client._worksheets["pilots"]
+    ws.calls.clear()
+
+    a, b = pilots["pilot_id"].iloc[[4, 40]]
+    result = client.update_cells("pilots", [(a, "status", "On Leave"), (b, "location", "Pune")])
+    assert result["success"] and not result["errors"]
+    assert _sheet_value(ws, a, "status") == "On Leave" and _sheet_value(ws, b, "location") == "Pune"
+    # one read to check the layout, one write; no header/id column reads
+    assert ws.calls == Counter(batch_get=1, batch_update=1)
+
+
+def test_moved_rows_and_columns_refresh_the_layout(pilots):
+    client = make_client({"pilots": pilots})
+    client.read_typed_df("pilots")
+    ws = client._worksheets["pilots"]
+    # rows inserted above the data and two columns swapped since the read
+    ws.rows.insert(1, ["X1"] + [""] * (len(ws.rows[0]) - 1))
+    ws.rows.insert(1, ["X2"] + [""] * (len(ws.rows[0]) - 1))
+    s, l = ws.rows[0].index("status"), ws.rows[0].index("location")
+    for row in ws.rows:
+        row[s], row[l] = row[l], row[s]
+    before = [list(r) for r in ws.rows]
+    ws.calls.clear()
+
+    rid = pilots["pilot_id"].iloc[10]
+    assert client.update_cells("pilots", [(rid, "status", "Unavailable")])["success"]
+    assert _sheet_value(ws, rid, "status") == "Unavailable"
+    changed = [(i, j) for i, (old, new) in enumerate(zip(before, ws.rows)) for j, (x, y) in enumerate(zip(old, new)) if x != y]
+    assert changed == [(13, ws.rows[0].index("status"))]
+    assert ws.calls["row_values"] == 1 and ws.calls["col_values"] == 1
+
+
+def test_unknown_ids_and_columns(pilots):
+    client = make_client({"pilots": pilots})
+    ws = client._worksheets["pilots"]
+    ws.rows.append(["P-NEW"] + [""] * (len(ws.rows[0]) - 1))
+    rid = pilots["pilot_id"].iloc[0]
+    result = client.update_cells("pilots", [("P-NEW", "status", "Available"), ("P-GONE", "status", "x"),
+                                            (rid, "colour", "red")])
+    assert result["updated"] == [{"pilot_id": "P-NEW", "status": "Available"}]
+    assert result["errors"] == ["Not found: P-GONE", "Unknown column: colour"] and not result["success"]
+    assert _sheet_value(ws, "P-NEW", "status") == "Available"
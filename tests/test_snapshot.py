@@ -0,0 +1,97 @@
+from collections import Counter
+
+import pandas as pd
+
+from bench import generate_dataset
+from datasource import InMemoryDataSource
+from snapshot import SnapshotCache
+
+DATA = generate_dataset(50, seed=1)
+
+
+class CountingSource(InMemoryDataSource):
+    def __init__(self, **frames):
+        super().__init__(**frames)
+        self.reads = Counter()
+
+    def read_pilots_df(self):
+        self.reads["pilots"] += 1
+        return super().read_pilots_df()
+
+    def read_drones_df(self):
+        self.reads["drones"] += 1
+        return super().read_drones_df()
+
+    def read_missions_df(self):
+        self.reads["missions"] += 1
+        return super().read_missions_df()
+
+
+def _expire(cache, name):
+    cache._entries[name].fetched_at -= cache.ttl[name] + 1
+
+
+def test_fresh_sheets_are_not_fetched_again():
+    source = CountingSource(**DATA)
+    cache = SnapshotCache(source)
+    first = cache.entry("pilots")
+    assert cache.entry("pilots") is first and source.reads["pilots"] == 1
+
+    _expire(cache, "pilots")
+    assert cache.entry("pilots") is first               # unchanged: same version and indexes
+    assert source.reads["pilots"] == 2
+
+
+def test_changed_sheet_gets_a_new_version():
+    source = CountingSource(**DATA)
+    cache = SnapshotCache(source)
+    seen = []
+    cache.changelog.subscribe(seen.append)
+    first = cache.entry("pilots")
+    first.derive("ids", lambda df: set(df["pilot_id"]))
+
+    pilot_id = DATA["pilots"]["pilot_id"].iloc[0]
+    source.update_pilot_status(pilot_id, "On Leave")
+    _expire(cache, "pilots")
+    second = cache.entry("pilots")
+    assert second.version > first.version
+    assert second.df.loc[0, "status"] == "On Leave" and first.df.loc[0, "status"] != "On Leave"
+    assert [c.updated for c in seen if not c.full] == [[pilot_id]]
+
+
+def test_invalidate_forces_a_fetch_and_bumps_the_version():
+    source = CountingSource(**DATA)
+    cache = SnapshotCache(source, ttl={"drones": None})
+    first = cache.entry("drones")
+    first.fetched_at -= 3600                            # no TTL: kept until invalidated
+    assert cache.entry("drones") is first
+    assert source.reads["drones"] == 1 and cache.cached("drones")
+
+    version = cache.version
+    cache.invalidate("drones")
+    assert cache.version > version and not cache.cached("drones")
+    assert cache.entry("drones") is first               # refetched, but unchanged
+    assert source.reads["drones"] == 2
+
+
+def test_unsynced_cache_drops_invalidated_entries():
+    source = CountingSource(**DATA)
+    cache = SnapshotCache(source, sync=False)
+    first = cache.entry("missions")
+    cache.invalidate()
+    second = cache.entry("missions")
+    assert second is not first and second.version > first.version
+
+
+def test_snapshot_pins_what_it_has_read():
+    source = CountingSource(**DATA)
+    cache = SnapshotCache(source)
+    snap = cache.snapshot().load("pilots")
+    before = snap.pilots
+
+    source.update_pilot_status(DATA["pilots"]["pilot_id"].iloc[0], "On Leave")
+    cache.invalidate("pilots")
+    assert snap.pilots is before
+    assert cache.snapshot().pilots.loc[0, "status"] == "On Leave"
+    assert snap.versions["pilots"] < cache.snapshot().load("pilots").versions["pilots"]
+    pd.testing.assert_frame_equal(snap.pilots, before)
@@ -0,0 +1,99 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+import snapshot
+from bench import generate_dataset
+from datasource import InMemoryDataSource
+from snapshot import RETRY_SECONDS, SnapshotCache
+from snapshot_store import SnapshotStore
+
+DATA = generate_dataset(60, seed=11)
+
+
+class FlakySource(InMemoryDataSource):
+    # reads raise while `down` is set, like the Sheets API during an outage
+    def __init__(self, **frames):
+        super().__init__(**frames)
+        self.down = False
+
+    def _up(self):
+        if self.down:
+            raise ConnectionError("sheets unreachable")
+
+    def read_pilots_df(self):
+        self._up()
+        return super().read_pilots_df()
+
+    def read_drones_df(self):
+        self._up()
+        return super().read_drones_df()
+
+    def read_missions_df(self):
+        self._up()
+        return super().read_missions_df()
+
+
+def _saved():
+    # saves run on a background thread; wait for the queued ones
+    snapshot._save_pool().submit(lambda: None).result()
+
+
+def test_store_round_trip(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    cache = SnapshotCache(InMemoryDataSource(**DATA))
+    entry = cache.entry("missions")
+    store.save("missions", entry.df, entry.issues, 123.0)
+    first = set(os.listdir(tmp_path))
+    store.save("missions", entry.df, entry.issues, 456.0)
+    assert len(set(os.listdir(tmp_path)) - first) == 2 and len(os.listdir(tmp_path)) == 3   # old copy removed
+
+    df, issues, fetched_at = store.load("missions")
+    pd.testing.assert_frame_equal(df, entry.df)
+    assert fetched_at == 456.0 and list(issues.columns) == list(entry.issues.columns)
+    assert store.load("missions", typed=False) is None      # other frame types are not served
+    store.touch("missions", 789.0)
+    assert store.load("missions")[2] == 789.0
+    assert store.load("pilots") is None
+
+
+def test_failed_fetch_serves_the_last_copy(tmp_path):
+    source = FlakySource(**DATA)
+    cache = SnapshotCache(source, store=SnapshotStore(str(tmp_path)))
+    good = cache.entry("pilots")
+    _saved()
+
+    source.down = True
+    good.stale = True
+    entry = cache.entry("pilots")
+    assert entry is good and entry.error == "ConnectionError: sheets unreachable"
+    assert cache.degraded()["pilots"][2] == entry.error
+    # retried after RETRY_SECONDS, not on every command
+    assert cache.cached("pilots")
+    entry.fetched_at -= RETRY_SECONDS + 1
+    assert not cache.cached("pilots")
+
+    # a new process during the outage starts from the copy on disk
+    restarted = SnapshotCache(source, store=SnapshotStore(str(tmp_path)))
+    restored = restarted.entry("pilots")
+    assert restored.source == "disk" and restored.error
+    pd.testing.assert_frame_equal(restored.df, good.df)
+
+    with pytest.raises(ConnectionError):
+        SnapshotCache(source).entry("pilots")
+
+
+def test_warm_start_serves_disk_then_refreshes(tmp_path):
+    source = FlakySource(**DATA)
+    SnapshotCache(source, store=SnapshotStore(str(tmp_path))).entries("pilots", "drones", "missions")
+    _saved()
+
+    cache = SnapshotCache(source, store=SnapshotStore(str(tmp_path)))
+    assert sorted(cache.warm_start()) == ["drones", "missions", "pilots"]
+    deadline = time.monotonic() + 5
+    while cache.degraded() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.degraded() == {}
+    assert all(cache.entry(name).source == "sheets" for name in ("pilots", "drones", "missions"))
@@ -1,3 +1,7 @@
+import math
+from datetime import date, datetime
+
+import pandas as pd
 from dateutil.parser import parse
 
 WEATHER_RANK = {
@@ -15,6 +19,11 @@ WEATHER_MIN_REQUIRED = {
 
 
 def safe_date(x):
+    # typed snapshots already hold Timestamps; only raw text needs parsing
+    if isinstance(x, datetime):
+        return None if pd.isna(x) else x.date()
+    if isinstance(x, date):
+        return x
     if x is None or str(x).strip() == "":
         return None
     try:
@@ -23,6 +32,22 @@ def safe_date(x):
         return None
 
 
+def safe_int(x, default: int = 1) -> int:
+    try:
+        return int(x or default)
+    except (TypeError, ValueError):
+        return default
+
+
+def safe_float(x):
+    # None for blanks, text and NaN cells
+    try:
+        value = float(x)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+
 def normalize_list(x):
     if x is None:
         return []
@@ -49,4 +74,17 @@ def weather_ok(drone_resistance: str, mission_weather: str) -> bool:
     if mission_weather in ["rainy", "rain"]:
         return ("ip" in drone_resistance) or ("rain" in drone_resistance)
 
-    return True
\ No newline at end of file
+    return True
+
+
+def weather_ok_series(drone_resistance: pd.Series, mission_weather: str) -> pd.Series:
+    # column-wise weather_ok for one mission
+    if not mission_weather:
+        return pd.Series(True, index=drone_resistance.index)
+
+    mission_weather = str(mission_weather).strip().lower()
+    if mission_weather in ["rainy", "rain"]:
+        r = drone_resistance.astype(str).str.strip().str.lower()
+        return r.str.contains("ip", regex=False) | r.str.contains("rain", regex=False)
+
+    return pd.Series(True, index=drone_resistance.index)